@@ -0,0 +1,28 @@
+# core/authentication.py
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser, TOKEN_CLAIM_FIELDS
+from .tokens import CLAIMS_AT, claims_are_current
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса к таблице пользователей: request.user
+    собирается из утверждений токена (core.tokens). Права вроде IsCourier
+    проверяются по ним же; БД читается, только если view обращается к
+    другим полям пользователя. Токены без утверждений или выпущенные до
+    изменения пользователя обрабатываются обычным путем — через БД.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        claims_at = validated_token.get(CLAIMS_AT)
+        has_claims = all(name in validated_token for name in TOKEN_CLAIM_FIELDS)
+        if user_id is None or claims_at is None or not has_claims or not claims_are_current(user_id, claims_at):
+            return super().get_user(validated_token)
+
+        if not validated_token['is_active']:
+            raise AuthenticationFailed("Пользователь деактивирован.", code='user_inactive')
+        return ClaimsUser.from_claims(user_id, validated_token)
@@ -0,0 +1,115 @@
+# core/geo.py
+"""
+Общие геоутилиты проекта.
+
+Расстояния считаются векторно через NumPy: одна функция обслуживает и одиночный
+расчет "ресторан → адрес", и пакетный (один ресторан × N адресов,
+N ресторанов × один адрес, матрица N × M).
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088  # Средний радиус Земли (IUGG)
+
+
+def to_float_array(values) -> np.ndarray:
+    """
+    Приводит координаты (Decimal, float, None) к массиву float64.
+    None превращается в NaN, чтобы "дырявые" координаты не ломали расчет.
+    """
+    if not isinstance(values, (list, tuple, np.ndarray)):
+        values = [values]
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Векторная формула гаверсинусов. Аргументы — скаляры или массивы одинаковой
+    (или транслируемой по правилам broadcasting) формы, в градусах.
+    Возвращает расстояния в километрах; там, где координат нет, — NaN.
+    """
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    lon1 = np.radians(np.asarray(lon1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lon2, dtype=np.float64))
+
+    d_lat = lat2 - lat1
+    d_lon = lon2 - lon1
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_km(lat1, lon1, lat2, lon2) -> float:
+    """Скалярная обертка над haversine_km. Если координат нет — возвращает 0."""
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return 0.0
+    return float(haversine_km(float(lat1), float(lon1), float(lat2), float(lon2)))
+
+
+# --- Geohash ---------------------------------------------------------------
+# Ячейки geohash вложены друг в друга: все точки ячейки "v9c" имеют хэши,
+# начинающиеся с "v9c". Поэтому поиск "рядом с точкой" сводится к
+# startswith по индексированной колонке для ячейки точки и 8 соседних.
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LON = 111.320  # на экваторе, умножается на cos(широты)
+
+
+def encode_geohash(latitude, longitude, precision=9) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (interval[0] + interval[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            interval[0] = middle
+        else:
+            bits <<= 1
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision) -> tuple:
+    """Размер ячейки в градусах: (широта, долгота)."""
+    total_bits = 5 * precision
+    lat_bits, lon_bits = total_bits // 2, total_bits - total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def geohash_precision_for_radius(latitude, radius_km, max_precision=9) -> int:
+    """
+    Самая точная длина хэша, при которой ячейка не меньше радиуса:
+    тогда круг поиска целиком покрывается ячейкой точки и ее соседями.
+    """
+    cos_lat = max(np.cos(np.radians(float(latitude))), 0.01)
+    for precision in range(max_precision, 0, -1):
+        lat_size, lon_size = geohash_cell_size(precision)
+        if lat_size * KM_PER_DEGREE_LAT >= radius_km and lon_size * KM_PER_DEGREE_LON * cos_lat >= radius_km:
+            return precision
+    return 1
+
+
+def geohash_cells_around(latitude, longitude, radius_km) -> list:
+    """Префиксы geohash (ячейка точки + соседние), покрывающие круг радиусом radius_km."""
+    precision = geohash_precision_for_radius(latitude, radius_km)
+    lat_size, lon_size = geohash_cell_size(precision)
+    latitude, longitude = float(latitude), float(longitude)
+    # Центр ячейки точки — от него шагаем на размер ячейки в каждую сторону
+    center_lat = (np.floor((latitude + 90.0) / lat_size) + 0.5) * lat_size - 90.0
+    center_lon = (np.floor((longitude + 180.0) / lon_size) + 0.5) * lon_size - 180.0
+    cells = []
+    for d_lat in (-1, 0, 1):
+        lat = center_lat + d_lat * lat_size
+        if not -90.0 <= lat <= 90.0:
+            continue
+        for d_lon in (-1, 0, 1):
+            lon = (center_lon + d_lon * lon_size + 180.0) % 360.0 - 180.0
+            cells.append(encode_geohash(lat, lon, precision))
+    return list(dict.fromkeys(cells))
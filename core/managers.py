@@ -1,8 +1,33 @@
 from django.contrib.auth.models import BaseUserManager
+from django.db import models
+from django.utils import timezone
+
+
+class UserQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        """
+        Массовое изменение роли, активности и т.п. обходит сигналы core.signals,
+        поэтому отметку claims_changed_at (core.tokens) ставим здесь же.
+        """
+        from .models import TOKEN_CLAIM_FIELDS
+        from .tokens import remember_claims_changed
+
+        if 'claims_changed_at' in kwargs or not kwargs.keys() & set(TOKEN_CLAIM_FIELDS):
+            return super().update(**kwargs)
+        user_ids = list(self.values_list('pk', flat=True))
+        changed_at = timezone.now()
+        updated = self.model._base_manager.filter(pk__in=user_ids).update(claims_changed_at=changed_at, **kwargs)
+        remember_claims_changed(user_ids, changed_at)
+        return updated
+
 
 class CustomUserManager(BaseUserManager):
     use_in_migrations = True
 
+    def get_queryset(self):
+        return UserQuerySet(self.model, using=self._db)
+
     def create_user(self, phone, password=None, **extra_fields):
         if not phone:
             raise ValueError("Поле 'phone' обязательно")
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:07
+
+import core.managers
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_remove_address_unique_primary_address_for_user_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimsUser',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('core.user',),
+            managers=[
+                ('objects', core.managers.CustomUserManager()),
+            ],
+        ),
+    ]
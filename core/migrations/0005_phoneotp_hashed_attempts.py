@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def drop_plaintext_codes(apps, schema_editor):
+    # Старые коды хранились открытым текстом; они живут 5 минут, проще запросить заново
+    apps.get_model('core', 'PhoneOTP').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_claimsuser'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_plaintext_codes, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='phoneotp',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Неверных попыток'),
+        ),
+        migrations.AlterField(
+            model_name='phoneotp',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время создания'),
+        ),
+        migrations.AlterField(
+            model_name='phoneotp',
+            name='otp',
+            field=models.CharField(max_length=128, verbose_name='Хэш OTP кода'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_phoneotp_hashed_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='claims_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Утверждения в токенах изменены'),
+        ),
+    ]
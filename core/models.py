@@ -1,7 +1,6 @@
 from django.utils import timezone
-from datetime import timedelta
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
 
 from jetfood_backend import settings
 from .managers import CustomUserManager  # 👈 импорт менеджера
@@ -27,6 +26,10 @@ class User(AbstractUser):
     # 👆👆👆 КОНЕЦ НОВЫХ ПОЛЕЙ 👆👆👆
     latitude = models.FloatField(null=True, blank=True, verbose_name="Широта курьера")
     longitude = models.FloatField(null=True, blank=True, verbose_name="Долгота курьера")
+    # Когда менялись поля из TOKEN_CLAIM_FIELDS: более старым JWT не верим (core.tokens)
+    claims_changed_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name="Утверждения в токенах изменены"
+    )
     
     USERNAME_FIELD = 'phone'       # 👈 логинимся по телефону
     REQUIRED_FIELDS = []           # 👈 другие поля не обязательны
@@ -35,6 +38,54 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.phone} ({self.role})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения из БД: по ним core.signals понимает, что утверждения в токенах устарели
+        instance.loaded_claims = {name: getattr(instance, name) for name in TOKEN_CLAIM_FIELDS if name in field_names}
+        return instance
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding and not self.get_deferred_fields():
+            # claims_changed_at пишет только core.tokens — полное сохранение
+            # устаревшего экземпляра не должно откатывать отметку
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'claims_changed_at'
+            ]
+        super().save(*args, **kwargs)
+
+    def token_claims(self):
+        """Поля пользователя, которые кладутся в JWT (см. core.tokens)."""
+        return {name: getattr(self, name) for name in TOKEN_CLAIM_FIELDS}
+
+
+# Поля пользователя, которые дублируются в JWT и доступны без запроса к БД
+TOKEN_CLAIM_FIELDS = ('role', 'is_active', 'is_approved', 'is_staff')
+
+
+class ClaimsUser(User):
+    """
+    Пользователь, собранный из утверждений JWT (core.authentication) без
+    запроса к БД: загружены только id и TOKEN_CLAIM_FIELDS. Остальные поля
+    подгружаются при первом обращении — все сразу, одним запросом.
+    """
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, claims):
+        values = {'id': user_id, **{name: claims[name] for name in TOKEN_CLAIM_FIELDS}}
+        # from_db ожидает имена полей в порядке их объявления в модели
+        field_names = [f.attname for f in cls._meta.concrete_fields if f.attname in values]
+        return cls.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred & set(fields):
+            fields = list(deferred | set(fields))
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
 class Address(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='addresses')
     
@@ -62,21 +113,17 @@ class Address(models.Model):
         verbose_name_plural = "Адреса"
 class PhoneOTP(models.Model):
     """
-    Модель для хранения временных OTP кодов для верификации номера телефона.
+    Запасное хранилище OTP-кодов (core.otp.DatabaseOTPStore) — на случай,
+    если кэш недоступен. Код хранится только в виде HMAC.
     """
     phone = models.CharField(max_length=20, unique=True, verbose_name="Номер телефона")
-    otp = models.CharField(max_length=4, verbose_name="OTP код")
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Время создания")
-
-    def is_expired(self):
-        """
-        Проверяет, не истек ли срок действия OTP (например, 5 минут).
-        """
-        return self.created_at < timezone.now() - timedelta(minutes=5)
+    otp = models.CharField(max_length=128, verbose_name="Хэш OTP кода")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Неверных попыток")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Время создания")
 
     def __str__(self):
-        return f"OTP {self.otp} для номера {self.phone}"
+        return f"OTP для номера {self.phone}"
 
     class Meta:
         verbose_name = "OTP код"
-        verbose_name_plural = "OTP коды"
\ No newline at end of file
+        verbose_name_plural = "OTP коды"
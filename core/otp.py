@@ -0,0 +1,138 @@
+# core/otp.py
+"""
+Хранилище одноразовых кодов (OTP) для входа по телефону.
+
+Коды хранятся только в виде HMAC (с SECRET_KEY и номером телефона), срок
+жизни задается TTL записи, а не проверкой времени в запросе. По умолчанию
+используется кэш (Redis или локальный кэш процесса); если кэш недоступен,
+CacheOTPStore переключается на таблицу PhoneOTP. Класс хранилища задается
+настройкой OTP_STORE.
+"""
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import PhoneOTP
+
+logger = logging.getLogger(__name__)
+
+# Результаты проверки кода
+VALID = 'valid'
+INVALID = 'invalid'
+MISSING = 'missing'  # не запрашивался, истек или исчерпаны попытки
+
+
+def generate_code():
+    return f"{secrets.randbelow(10 ** settings.OTP_LENGTH):0{settings.OTP_LENGTH}d}"
+
+
+def hash_code(phone, code):
+    key = settings.SECRET_KEY.encode()
+    return hmac.new(key, f"{phone}:{code}".encode(), hashlib.sha256).hexdigest()
+
+
+class DatabaseOTPStore:
+    """Коды в таблице PhoneOTP: одна строка на номер, срок жизни по created_at."""
+
+    def issue(self, phone, code):
+        PhoneOTP.objects.update_or_create(
+            phone=phone, defaults={'otp': hash_code(phone, code), 'attempts': 0, 'created_at': timezone.now()}
+        )
+
+    def verify(self, phone, code):
+        expires_after = timezone.now() - timedelta(seconds=settings.OTP_TTL_SECONDS)
+        entry = PhoneOTP.objects.filter(phone=phone, created_at__gt=expires_after).first()
+        if entry is None:
+            return MISSING
+        # Попытка засчитывается условным UPDATE до сравнения: параллельные
+        # запросы не могут проверить больше OTP_MAX_ATTEMPTS вариантов
+        current = PhoneOTP.objects.filter(pk=entry.pk, otp=entry.otp)
+        if not current.filter(attempts__lt=settings.OTP_MAX_ATTEMPTS).update(attempts=F('attempts') + 1):
+            return MISSING
+        if hmac.compare_digest(entry.otp, hash_code(phone, code)):
+            # Код одноразовый: вход получает только запрос, который удалил строку
+            deleted, _ = current.delete()
+            return VALID if deleted else MISSING
+        current.filter(attempts__gte=settings.OTP_MAX_ATTEMPTS).delete()
+        return INVALID
+
+
+class CacheOTPStore:
+    """Коды в кэше с TTL; при ошибке кэша — DatabaseOTPStore."""
+
+    def __init__(self, cache=cache):
+        self.cache = cache
+        self.fallback = DatabaseOTPStore()
+
+    @staticmethod
+    def key(phone):
+        # В ключе — хэш номера, чтобы номера не светились в Redis
+        return f"otp:{hashlib.sha256(phone.encode()).hexdigest()}"
+
+    @classmethod
+    def attempts_key(cls, phone):
+        return f"{cls.key(phone)}:attempts"
+
+    def issue(self, phone, code):
+        entry = {'hash': hash_code(phone, code), 'expires_at': time.time() + settings.OTP_TTL_SECONDS}
+        try:
+            # Счетчик попыток — отдельный ключ: его меняет атомарный incr, а не get/set записи
+            self.cache.set(self.attempts_key(phone), 0, settings.OTP_TTL_SECONDS)
+            self.cache.set(self.key(phone), entry, settings.OTP_TTL_SECONDS)
+        except Exception:
+            logger.exception("Кэш недоступен, OTP сохраняется в БД")
+            self.fallback.issue(phone, code)
+
+    def verify(self, phone, code):
+        try:
+            entry = self.cache.get(self.key(phone))
+        except Exception:
+            logger.exception("Кэш недоступен, OTP проверяется по БД")
+            return self.fallback.verify(phone, code)
+        if entry is None:
+            return MISSING
+        remaining = int(entry['expires_at'] - time.time())
+        if remaining <= 0:
+            return MISSING
+        attempts_key = self.attempts_key(phone)
+        self.cache.add(attempts_key, 0, remaining)
+        try:
+            attempts = self.cache.incr(attempts_key)
+        except ValueError:
+            # Счетчик истек вместе с кодом
+            return MISSING
+        if attempts > settings.OTP_MAX_ATTEMPTS:
+            self.cache.delete_many([self.key(phone), attempts_key])
+            return MISSING
+        if hmac.compare_digest(entry['hash'], hash_code(phone, code)):
+            # Код одноразовый: вход получает только запрос, который удалил запись
+            if not self.cache.delete(self.key(phone)):
+                return MISSING
+            self.cache.delete(attempts_key)
+            return VALID
+        if attempts >= settings.OTP_MAX_ATTEMPTS:
+            self.cache.delete_many([self.key(phone), attempts_key])
+        return INVALID
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.OTP_STORE)()
+    return _store
@@ -10,4 +10,4 @@ class IsOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Разрешаем доступ, если поле 'user' объекта совпадает с пользователем,
         # который делает запрос.
-        return obj.user == request.user
\ No newline at end of file
+        return obj.user_id == request.user.id
\ No newline at end of file
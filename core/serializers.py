@@ -3,6 +3,7 @@ import uuid
 from rest_framework import serializers
 from django.contrib.auth import get_user_model, password_validation
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .tokens import ClaimsRefreshToken
 from courier.serializers import CourierProfileSerializer
 from .models import User, Address
 
@@ -38,6 +39,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 class PhoneTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = 'phone'
+    token_class = ClaimsRefreshToken
     def validate(self, attrs):
         phone = attrs.get("phone")
         password = attrs.get("password")
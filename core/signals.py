@@ -0,0 +1,28 @@
+# core/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ClaimsUser, User, TOKEN_CLAIM_FIELDS
+from .tokens import mark_claims_changed
+
+
+# Сигналы прокси-модели приходят с sender=ClaimsUser, поэтому подписываемся на обе
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    """Роль, активность или одобрение изменились — утверждения в выданных токенах устарели."""
+    if raw or created:
+        return
+    loaded = getattr(instance, 'loaded_claims', None)
+    if loaded is None or any(
+        name in loaded and loaded[name] != getattr(instance, name) for name in TOKEN_CLAIM_FIELDS
+    ):
+        instance.claims_changed_at = mark_claims_changed(instance.pk)
+    if loaded:
+        instance.loaded_claims = {name: getattr(instance, name) for name in loaded}
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=ClaimsUser)
+def user_deleted(sender, instance, **kwargs):
+    mark_claims_changed(instance.pk)
@@ -0,0 +1,182 @@
+# core/sms.py
+"""
+Отправка SMS (коды входа и т.п.) в фоне.
+
+send_sms() только кладет сообщение в ограниченную очередь процесса и сразу
+возвращается, поэтому время ответа API не зависит от SMS-провайдера. Потоки
+воркера забирают из очереди пачку (до batch_size шлюза) и отправляют ее
+одним вызовом; ошибки повторяются с экспоненциальной задержкой. Если очередь
+переполнена, send_sms() бросает SMSQueueFull — лучше отказать сразу, чем
+копить коды, которые придут уже истекшими.
+
+Шлюз задается настройкой SMS_GATEWAY:
+  * ConsoleGateway — печатает сообщения в консоль (разработка);
+  * LocmemGateway — складывает сообщения в LocmemGateway.outbox (тесты);
+  * HTTPGateway — JSON API провайдера с пакетной отправкой.
+При SMS_WORKER_THREADS = 0 сообщения отправляются сразу, в текущем потоке.
+"""
+import logging
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class SMSQueueFull(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class SMSMessage:
+    phone: str
+    text: str
+
+
+class BaseGateway:
+    # Сколько сообщений шлюз принимает за один вызов send_batch
+    batch_size = 1
+
+    def send_batch(self, messages):
+        """Отправляет сообщения; при ошибке бросает исключение (пачка будет повторена)."""
+        raise NotImplementedError
+
+
+class ConsoleGateway(BaseGateway):
+    batch_size = 100
+
+    def send_batch(self, messages):
+        for message in messages:
+            print(f"--- SMS для номера {message.phone}: {message.text} ---")
+
+
+class LocmemGateway(BaseGateway):
+    batch_size = 100
+    outbox = []
+
+    def send_batch(self, messages):
+        LocmemGateway.outbox.extend(messages)
+
+
+class HTTPGateway(BaseGateway):
+    """Провайдер с JSON API: POST {"messages": [{"to": ..., "text": ...}, ...]}."""
+
+    def __init__(self):
+        self.batch_size = settings.SMS_BATCH_SIZE
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f"Bearer {settings.SMS_API_KEY}"
+
+    def send_batch(self, messages):
+        response = self.session.post(
+            settings.SMS_API_URL,
+            json={'messages': [{'to': message.phone, 'text': message.text} for message in messages]},
+            timeout=settings.SMS_API_TIMEOUT,
+        )
+        response.raise_for_status()
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway() -> BaseGateway:
+    path = settings.SMS_GATEWAY
+    gateway = _gateways.get(path)
+    if gateway is None:
+        with _gateways_lock:
+            gateway = _gateways.get(path)
+            if gateway is None:
+                gateway = _gateways[path] = import_string(path)()
+    return gateway
+
+
+def deliver(messages, gateway=None):
+    """Отправляет пачку с повторами. Возвращает False, если все попытки неудачны."""
+    gateway = gateway or get_gateway()
+    for attempt in range(settings.SMS_MAX_RETRIES + 1):
+        if attempt:
+            # "Полный джиттер", как в payments.client
+            time.sleep(random.uniform(0, settings.SMS_RETRY_BACKOFF * (2 ** attempt)))
+        try:
+            gateway.send_batch(messages)
+            return True
+        except Exception:
+            logger.warning("Не удалось отправить %d SMS (попытка %d)", len(messages), attempt + 1, exc_info=True)
+    logger.error("SMS не отправлены: %s", ', '.join(message.phone for message in messages))
+    return False
+
+
+class SMSQueue:
+    def __init__(self, workers, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.workers = workers
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'sms-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def put(self, message):
+        if len(self._threads) < self.workers:
+            self._start()
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            raise SMSQueueFull()
+
+    def _take_batch(self, size):
+        batch = [self.queue.get()]
+        while len(batch) < size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            gateway = get_gateway()
+            batch = self._take_batch(gateway.batch_size)
+            try:
+                deliver(batch, gateway)
+            except Exception:
+                logger.exception("Ошибка воркера SMS")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def join(self):
+        """Ждет, пока очередь опустеет (тесты, остановка процесса)."""
+        self.queue.join()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_sms_queue() -> SMSQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = SMSQueue(workers=settings.SMS_WORKER_THREADS, maxsize=settings.SMS_QUEUE_SIZE)
+    return _queue
+
+
+def send_sms(phone, text):
+    """Ставит SMS в очередь на отправку. При SMS_WORKER_THREADS = 0 отправляет сразу."""
+    message = SMSMessage(phone=phone, text=text)
+    if settings.SMS_WORKER_THREADS <= 0:
+        deliver([message])
+        return
+    get_sms_queue().put(message)
@@ -1,3 +1,179 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from courier.models import CourierProfile
+from . import otp, sms
+from .models import ClaimsUser, PhoneOTP, User
+
+
+class ClaimsAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courier = User.objects.create_user(phone='+77000000004', password='pass', role='courier')
+        CourierProfile.objects.create(user=cls.courier)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/login/', {'phone': '+77000000004', 'password': 'pass'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+
+    def test_request_does_not_load_user(self):
+        self.login()
+        # Только две строки сводки заработка — без SELECT из core_user
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/courier/profile/stats/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        self.login()
+        self.courier.is_active = False
+        self.courier.save()
+        self.assertEqual(self.client.get('/api/courier/profile/stats/').status_code, 401)
+
+    def test_role_change_falls_back_to_database(self):
+        self.login()
+        self.courier.role = 'client'
+        self.courier.save()
+        self.assertEqual(self.client.get('/api/courier/profile/stats/').status_code, 403)
+
+    def test_claims_marker_survives_cache_loss(self):
+        self.login()
+        self.courier.role = 'client'
+        self.courier.save()
+        cache.clear()
+        self.assertEqual(self.client.get('/api/courier/profile/stats/').status_code, 403)
+
+    def test_queryset_update_marks_claims_changed(self):
+        self.login()
+        User.objects.filter(pk=self.courier.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/courier/profile/stats/').status_code, 401)
+        cache.clear()
+        self.assertEqual(self.client.get('/api/courier/profile/stats/').status_code, 401)
+
+    def test_deferred_fields_load_in_one_query(self):
+        user = ClaimsUser.from_claims(
+            self.courier.id, {'role': 'courier', 'is_active': True, 'is_approved': False, 'is_staff': False}
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(user.role, 'courier')
+        with self.assertNumQueries(1):
+            self.assertEqual((user.phone, user.first_name, user.latitude), ('+77000000004', '', None))
+        self.assertEqual(user, self.courier)
+
+
+@override_settings(SMS_GATEWAY='core.sms.LocmemGateway', SMS_WORKER_THREADS=0)
+class OTPLoginTests(TestCase):
+    phone = '+77000000005'
+
+    def setUp(self):
+        cache.clear()
+        sms.LocmemGateway.outbox.clear()
+        self.client = APIClient()
+
+    def send(self, phone=None):
+        with mock.patch('core.otp.generate_code', return_value='1234'):
+            return self.client.post('/api/auth/send-otp/', {'phone': phone or self.phone}, format='json')
+
+    def verify(self, code):
+        return self.client.post('/api/auth/verify-otp/', {'phone': self.phone, 'otp': code}, format='json')
+
+    def test_login_does_not_touch_otp_table(self):
+        self.assertEqual(self.send().status_code, 200)
+        self.assertEqual(sms.LocmemGateway.outbox, [sms.SMSMessage(self.phone, "Код для входа в JetFood: 1234")])
+        self.assertFalse(PhoneOTP.objects.exists())
+        self.assertNotIn('1234', str(cache.get(otp.CacheOTPStore.key(self.phone))))
+
+        response = self.verify('1234')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        # Код одноразовый
+        self.assertEqual(self.verify('1234').status_code, 400)
+
+    @override_settings(OTP_MAX_ATTEMPTS=2)
+    def test_code_burns_after_max_attempts(self):
+        self.send()
+        self.assertEqual(self.verify('0000').json()['error'], "Неверный код")
+        self.verify('0001')
+        self.assertEqual(self.verify('1234').status_code, 400)
+
+    def test_database_fallback_when_cache_is_down(self):
+        broken = mock.Mock(**{'set.side_effect': ConnectionError, 'get.side_effect': ConnectionError})
+        with mock.patch.object(otp.get_otp_store(), 'cache', broken):
+            self.send()
+            self.assertNotEqual(PhoneOTP.objects.get(phone=self.phone).otp, '1234')
+            self.assertEqual(self.verify('1234').status_code, 200)
+        self.assertFalse(PhoneOTP.objects.exists())
+
+    @override_settings(OTP_MAX_ATTEMPTS=2)
+    def test_attempts_are_counted_before_the_code_is_checked(self):
+        self.send()
+        # Две параллельные проверки уже забрали попытки — правильный код не проходит
+        attempts_key = otp.CacheOTPStore.attempts_key(self.phone)
+        cache.incr(attempts_key)
+        cache.incr(attempts_key)
+        self.assertEqual(self.verify('1234').status_code, 400)
+        self.assertIsNone(cache.get(otp.CacheOTPStore.key(self.phone)))
+
+    @override_settings(OTP_MAX_ATTEMPTS=2)
+    def test_database_store_limits_attempts(self):
+        store = otp.DatabaseOTPStore()
+        store.issue(self.phone, '1234')
+        self.assertEqual(store.verify(self.phone, '0000'), otp.INVALID)
+        self.assertEqual(PhoneOTP.objects.get().attempts, 1)
+        self.assertEqual(store.verify(self.phone, '0001'), otp.INVALID)
+        self.assertEqual(store.verify(self.phone, '1234'), otp.MISSING)
+
+        store.issue(self.phone, '1234')
+        self.assertEqual(store.verify(self.phone, '1234'), otp.VALID)
+        self.assertEqual(store.verify(self.phone, '1234'), otp.MISSING)
+
+    def test_send_is_throttled_per_phone(self):
+        for _ in range(3):
+            self.assertEqual(self.send().status_code, 200)
+        self.assertEqual(self.send().status_code, 429)
+        self.assertEqual(self.send(phone='+77000000006').status_code, 200)
+
+
+class FlakyGateway(sms.LocmemGateway):
+    batch_size = 10
+    failures = 0
+    batches = []
+
+    def send_batch(self, messages):
+        if FlakyGateway.failures:
+            FlakyGateway.failures -= 1
+            raise ConnectionError
+        FlakyGateway.batches.append(len(messages))
+        super().send_batch(messages)
+
+
+@override_settings(SMS_GATEWAY='core.tests.FlakyGateway', SMS_RETRY_BACKOFF=0)
+class SMSQueueTests(TestCase):
+
+    def setUp(self):
+        sms.LocmemGateway.outbox.clear()
+        FlakyGateway.batches = []
+
+    def test_worker_sends_pending_messages_in_batches(self):
+        queue = sms.SMSQueue(workers=1, maxsize=100)
+        for i in range(15):
+            queue.queue.put_nowait(sms.SMSMessage(f'+770000001{i:02d}', 'код'))
+        FlakyGateway.failures = 1  # первая пачка уйдет со второй попытки
+        queue._start()
+        queue.join()
+        self.assertEqual(FlakyGateway.batches, [10, 5])
+        self.assertEqual(len(sms.LocmemGateway.outbox), 15)
+
+    def test_full_queue_rejects_message(self):
+        queue = sms.SMSQueue(workers=0, maxsize=1)
+        queue.put(sms.SMSMessage('+77000000100', 'код'))
+        with self.assertRaises(sms.SMSQueueFull):
+            queue.put(sms.SMSMessage('+77000000101', 'код'))
@@ -0,0 +1,45 @@
+# core/throttling.py
+"""
+Ограничение частоты запросов OTP. SimpleRateThrottle хранит в кэше журнал
+времен запросов по ключу, то есть окно скользящее, а не фиксированное.
+Номер лимитируется отдельно от IP: бот с одного адреса не переберет много
+номеров, а рассылка с многих адресов не "засыплет" один номер SMS.
+Частоты задаются в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+"""
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class PhoneRateThrottle(SimpleRateThrottle):
+    """Лимит по номеру телефона из тела запроса (номер в ключе кэша — хэшем)."""
+
+    def get_cache_key(self, request, view):
+        phone = request.data.get('phone')
+        if not phone:
+            return None
+        ident = hashlib.sha256(str(phone).encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class IPRateThrottle(SimpleRateThrottle):
+    """Лимит по IP-адресу клиента."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class SendOTPPhoneThrottle(PhoneRateThrottle):
+    scope = 'otp_send_phone'
+
+
+class SendOTPIPThrottle(IPRateThrottle):
+    scope = 'otp_send_ip'
+
+
+class VerifyOTPPhoneThrottle(PhoneRateThrottle):
+    scope = 'otp_verify_phone'
+
+
+class VerifyOTPIPThrottle(IPRateThrottle):
+    scope = 'otp_verify_ip'
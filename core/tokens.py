@@ -0,0 +1,77 @@
+# core/tokens.py
+"""
+JWT с утверждениями о пользователе (роль, активность, одобрение, staff).
+
+По ним core.authentication восстанавливает пользователя без запроса к БД.
+Когда эти поля меняются (core.signals, UserQuerySet.update), момент
+изменения пишется в User.claims_changed_at: токены, выпущенные раньше него,
+аутентифицируются по-старому — с загрузкой пользователя из БД (и проверкой
+is_active), пока клиент не получит новые. Кэш — только read-through перед
+этим полем: потеря кэша не возвращает доверие к старым токенам.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Момент, на который утверждения в токене были актуальны (переносится в access-токены)
+CLAIMS_AT = 'claims_at'
+# Пользователь удален: ни одному его токену верить нельзя
+DELETED = float('inf')
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for name, value in user.token_claims().items():
+            token[name] = value
+        token[CLAIMS_AT] = int(time.time())
+        # Пользователь только что прочитан из БД — заодно прогреваем кэш отметки
+        cache.add(_changed_key(user.pk), _timestamp(user.claims_changed_at), _marker_ttl())
+        return token
+
+
+def _changed_key(user_id):
+    return f"auth:claims-changed:{user_id}"
+
+
+def _marker_ttl():
+    # Отметка нужна, пока могут жить выпущенные до нее refresh-токены
+    return int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds())
+
+
+def _timestamp(changed_at):
+    return changed_at.timestamp() if changed_at is not None else 0.0
+
+
+def remember_claims_changed(user_ids, changed_at):
+    """Кладет в кэш отметку, уже записанную в claims_changed_at."""
+    value = _timestamp(changed_at)
+    cache.set_many({_changed_key(user_id): value for user_id in user_ids}, _marker_ttl())
+
+
+def mark_claims_changed(user_id):
+    """Старые токены пользователя больше не считаются источником правды о нем."""
+    changed_at = timezone.now()
+    get_user_model()._base_manager.filter(pk=user_id).update(claims_changed_at=changed_at)
+    remember_claims_changed([user_id], changed_at)
+    return changed_at
+
+
+def _load_changed_at(user_id):
+    rows = list(get_user_model()._base_manager.filter(pk=user_id).values_list('claims_changed_at', flat=True)[:1])
+    return _timestamp(rows[0]) if rows else DELETED
+
+
+def claims_are_current(user_id, claims_at):
+    key = _changed_key(user_id)
+    changed_at = cache.get(key)
+    if changed_at is None:
+        changed_at = _load_changed_at(user_id)
+        # add, а не set: не затираем отметку, записанную параллельно mark_claims_changed
+        cache.add(key, changed_at, _marker_ttl())
+    return claims_at > changed_at
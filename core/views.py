@@ -13,13 +13,19 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-import random
-from .models import PhoneOTP, User
-from rest_framework_simplejwt.tokens import RefreshToken
+from . import otp, sms
+from .models import User
+from .tokens import ClaimsRefreshToken
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .permissions import IsOwner
+from .throttling import (
+    SendOTPIPThrottle,
+    SendOTPPhoneThrottle,
+    VerifyOTPIPThrottle,
+    VerifyOTPPhoneThrottle,
+)
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
@@ -93,26 +99,26 @@ class TogglePushNotificationView(APIView):
 class SendOTPView(APIView):
     """
     View для запроса и отправки OTP кода на номер телефона.
+    Код хранится в core.otp (по умолчанию — в кэше), в БД ничего не пишется.
     """
+    throttle_classes = [SendOTPPhoneThrottle, SendOTPIPThrottle]
+
     def post(self, request, *args, **kwargs):
         phone_number = request.data.get('phone')
 
         if not phone_number:
             return Response({"error": "Номер телефона обязателен"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Генерируем 4-значный код
-        otp_code = str(random.randint(1000, 9999))
-        
-        # Сохраняем или обновляем код для данного номера
-        PhoneOTP.objects.update_or_create(
-            phone=phone_number,
-            defaults={'otp': otp_code}
-        )
+        otp_code = otp.generate_code()
+        otp.get_otp_store().issue(phone_number, otp_code)
 
-        # !!! ВАЖНО: Здесь должна быть интеграция с SMS-сервисом (например, Twilio)
-        # для отправки кода на реальный телефон.
-        # Для тестирования мы просто выводим код в консоль.
-        print(f"--- OTP для номера {phone_number}: {otp_code} ---")
+        # SMS уходит в фоне (core.sms); ответ не ждет провайдера
+        try:
+            sms.send_sms(phone_number, f"Код для входа в JetFood: {otp_code}")
+        except sms.SMSQueueFull:
+            return Response(
+                {"error": "Сервис SMS перегружен, попробуйте позже"}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
 
         return Response({"success": "Код успешно отправлен"}, status=status.HTTP_200_OK)
 
@@ -121,6 +127,8 @@ class VerifyOTPView(APIView):
     """
     View для проверки OTP кода и входа/регистрации пользователя.
     """
+    throttle_classes = [VerifyOTPPhoneThrottle, VerifyOTPIPThrottle]
+
     def post(self, request, *args, **kwargs):
         phone_number = request.data.get('phone')
         otp_code = request.data.get('otp')
@@ -128,30 +136,19 @@ class VerifyOTPView(APIView):
         if not phone_number or not otp_code:
             return Response({"error": "Номер телефона и OTP код обязательны"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            otp_entry = PhoneOTP.objects.get(phone=phone_number)
-        except PhoneOTP.DoesNotExist:
-            return Response({"error": "Пожалуйста, сначала запросите код"}, status=status.HTTP_400_BAD_REQUEST)
-
-        if otp_entry.is_expired():
-            return Response({"error": "Срок действия кода истек"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if otp_entry.otp != otp_code:
+        result = otp.get_otp_store().verify(phone_number, str(otp_code))
+        if result == otp.MISSING:
+            return Response(
+                {"error": "Код истек или не запрашивался, запросите новый"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if result != otp.VALID:
             return Response({"error": "Неверный код"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Код верный. Находим или создаем пользователя
         user, created = User.objects.get_or_create(phone=phone_number)
 
-        if created:
-            # Можно задать поля по умолчанию для нового пользователя, если нужно
-            # user.name = "Новый пользователь"
-            user.save()
-
         # Генерируем JWT токены для пользователя
-        refresh = RefreshToken.for_user(user)
-        
-        # Удаляем использованный OTP
-        otp_entry.delete()
+        refresh = ClaimsRefreshToken.for_user(user)
 
         return Response({
             'refresh': str(refresh),
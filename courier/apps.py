@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CourierConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'courier'
+
+    def ready(self):
+        # Подключаем сигналы живого трекинга заказов
+        import courier.signals
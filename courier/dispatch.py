@@ -0,0 +1,225 @@
+# courier/dispatch.py
+"""
+Автоматическое распределение заказов по курьерам.
+
+Раунд диспетчера (run_dispatch_round, команда run_dispatcher):
+1. истекшие предложения помечаются expired;
+2. берутся свободные заказы ready_for_pickup без активного предложения
+   и свободные курьеры на линии с известной позицией;
+3. строится матрица стоимости: расстояние до ресторана минус "бонус" за
+   время ожидания заказа (старые заказы раздаются в первую очередь);
+   пары дальше DISPATCH_MAX_PICKUP_KM и пары, где курьер уже отказался, запрещены;
+4. задача о назначениях решается венгерским алгоритмом;
+5. курьерам уходят предложения с TTL. Заказ закрепляется за курьером
+   только при принятии — условным UPDATE, без блокировок строк.
+"""
+from datetime import timedelta
+from typing import NamedTuple
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.geo import haversine_km, to_float_array
+from core.models import User
+from orders.models import Order
+from orders.state import transition
+from .locations import get_latest_positions
+from .models import DispatchOffer
+
+# Стоимость запрещенной пары: заведомо больше любой допустимой
+FORBIDDEN_COST = 1e9
+
+
+def hungarian(cost) -> list:
+    """
+    Венгерский алгоритм (с потенциалами, O(n²·m)) для прямоугольной матрицы.
+    Возвращает пары (строка, столбец) с минимальной суммарной стоимостью;
+    назначается min(n, m) пар. Внутренний цикл по столбцам векторизован.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return []
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)    # p[j] — строка, назначенная столбцу j (с 1)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            current = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (current < minv[1:])
+            minv[1:][better] = current[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            used_columns = np.nonzero(used)[0]
+            u[p[used_columns]] += delta
+            v[used_columns] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(column, row) for row, column in pairs]
+    return sorted(pairs)
+
+
+class Assignment(NamedTuple):
+    order_id: int
+    courier_id: int
+    distance_km: float
+
+
+def expire_offers(now) -> int:
+    return DispatchOffer.objects.filter(status='pending', expires_at__lte=now).update(
+        status='expired', responded_at=now
+    )
+
+
+def _dispatchable_orders():
+    busy_orders = DispatchOffer.objects.filter(status='pending').values('order_id')
+    return list(
+        Order.objects.filter(status='ready_for_pickup', courier__isnull=True, restaurant__latitude__isnull=False)
+        .exclude(id__in=busy_orders)
+        .order_by('created_at')
+        .values_list('id', 'created_at', 'restaurant__latitude', 'restaurant__longitude')[:settings.DISPATCH_BATCH_SIZE]
+    )
+
+
+def _available_couriers():
+    """Курьеры на линии без активного заказа и без ожидающего ответа предложения, с позицией."""
+    couriers = list(
+        User.objects.filter(role='courier', courier_profile__is_online=True)
+        .exclude(id__in=DispatchOffer.objects.filter(status='pending').values('courier_id'))
+        # courier__isnull: заказ удаленного курьера (SET_NULL) дал бы NULL, и NOT IN отсеял бы всех
+        .exclude(id__in=Order.objects.filter(status='on_the_way', courier__isnull=False).values('courier_id'))
+        .values_list('id', 'latitude', 'longitude')[:settings.DISPATCH_BATCH_SIZE]
+    )
+    positions = get_latest_positions([courier_id for courier_id, _, _ in couriers])
+    result = []
+    for courier_id, latitude, longitude in couriers:
+        if courier_id in positions:
+            latitude, longitude = positions[courier_id][:2]
+        if latitude is not None and longitude is not None:
+            result.append((courier_id, latitude, longitude))
+    return result
+
+
+def compute_assignments(orders, couriers, refused, now) -> list:
+    """
+    orders: [(id, created_at, lat, lon)], couriers: [(id, lat, lon)],
+    refused: множество пар (order_id, courier_id), которые нельзя предлагать.
+    """
+    if not orders or not couriers:
+        return []
+    order_lat = to_float_array([row[2] for row in orders])[:, None]
+    order_lon = to_float_array([row[3] for row in orders])[:, None]
+    courier_lat = to_float_array([row[1] for row in couriers])[None, :]
+    courier_lon = to_float_array([row[2] for row in couriers])[None, :]
+    distances = haversine_km(order_lat, order_lon, courier_lat, courier_lon)
+
+    age_minutes = np.array([(now - row[1]).total_seconds() / 60 for row in orders])[:, None]
+    cost = distances - settings.DISPATCH_AGE_WEIGHT * np.minimum(age_minutes, settings.DISPATCH_MAX_AGE_BONUS_MINUTES)
+    forbidden = ~(distances <= settings.DISPATCH_MAX_PICKUP_KM)  # NaN тоже запрещен
+    for row, (order_id, *_) in enumerate(orders):
+        for column, (courier_id, *_) in enumerate(couriers):
+            if (order_id, courier_id) in refused:
+                forbidden[row, column] = True
+    cost[forbidden] = FORBIDDEN_COST
+
+    return [
+        Assignment(orders[row][0], couriers[column][0], round(float(distances[row, column]), 3))
+        for row, column in hungarian(cost)
+        if not forbidden[row, column]
+    ]
+
+
+def run_dispatch_round(now=None) -> list:
+    """Один раунд распределения. Возвращает созданные предложения."""
+    now = now or timezone.now()
+    expire_offers(now)
+    orders = _dispatchable_orders()
+    couriers = _available_couriers() if orders else []
+    if not couriers:
+        return []
+
+    refused = set(
+        DispatchOffer.objects.filter(
+            order_id__in=[row[0] for row in orders], status__in=['declined', 'expired']
+        ).values_list('order_id', 'courier_id')
+    )
+    assignments = compute_assignments(orders, couriers, refused, now)
+    expires_at = now + timedelta(seconds=settings.DISPATCH_OFFER_TTL_SECONDS)
+    # Если параллельный раунд успел раньше, уникальные ограничения отбросят дубли
+    DispatchOffer.objects.bulk_create([
+        DispatchOffer(order_id=item.order_id, courier_id=item.courier_id, distance_km=item.distance_km,
+                      expires_at=expires_at)
+        for item in assignments
+    ], ignore_conflicts=True)
+    return list(DispatchOffer.objects.filter(
+        status='pending', expires_at=expires_at, order_id__in=[item.order_id for item in assignments]
+    ))
+
+
+def claim_order(order_id, courier) -> Order:
+    """
+    Закрепляет свободный заказ за курьером одним условным UPDATE (без select_for_update):
+    из конкурирующих курьеров заказ получит ровно один.
+    """
+    claimed = transition(
+        order_id, 'on_the_way', from_statuses={'ready_for_pickup'}, actor=courier,
+        fields={'courier': courier}, courier__isnull=True,
+    )
+    order = Order.objects.get(id=order_id)
+    if not claimed:
+        raise ValidationError("Этот заказ уже недоступен или взят другим курьером.")
+    # Предложения этого заказа другим курьерам больше не актуальны
+    DispatchOffer.objects.filter(order_id=order_id, status='pending').exclude(courier=courier).update(
+        status='cancelled', responded_at=timezone.now()
+    )
+    return order
+
+
+def accept_offer(offer_id, courier) -> Order:
+    now = timezone.now()
+    accepted = DispatchOffer.objects.filter(
+        id=offer_id, courier=courier, status='pending', expires_at__gt=now
+    ).update(status='accepted', responded_at=now)
+    if not accepted:
+        raise ValidationError("Предложение уже неактуально.")
+    order_id = DispatchOffer.objects.values_list('order_id', flat=True).get(id=offer_id)
+    try:
+        return claim_order(order_id, courier)
+    except ValidationError:
+        # Заказ успели забрать вручную — предложение аннулируется
+        DispatchOffer.objects.filter(id=offer_id).update(status='cancelled')
+        raise
+
+
+def decline_offer(offer_id, courier):
+    """Отказ: в следующем раунде заказ уйдет другому курьеру."""
+    declined = DispatchOffer.objects.filter(id=offer_id, courier=courier, status='pending').update(
+        status='declined', responded_at=timezone.now()
+    )
+    if not declined:
+        raise ValidationError("Предложение уже неактуально.")
@@ -0,0 +1,114 @@
+# courier/earnings.py
+"""
+Сводка заработка курьеров.
+
+При доставке заказа (переход в delivered) одной транзакцией с переходом
+увеличиваются строка CourierDailyEarnings за текущий день и итоги в
+CourierProfile (если профиль есть: сводка его не создает — у профиля есть
+обязательные документы и статус проверки). Статистика курьера читает эти две маленькие строки вместо
+агрегатов по всей истории заказов; недельные и месячные разбивки считаются
+по дневным строкам.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from orders.models import Order, OrderStatusEvent
+from .models import CourierDailyEarnings, CourierProfile
+
+PERIODS = {'day': None, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def _increment(model, lookup, **increments):
+    """UPDATE ... SET поле = поле + N; если строки нет — создает ее (с защитой от гонки)."""
+    updates = {field: F(field) + value for field, value in increments.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_delivery(courier_id, fee, day=None):
+    """Учитывает доставленный заказ в дневной сводке и итогах курьера."""
+    day = day or timezone.localdate()
+    fee = fee or Decimal('0')
+    with transaction.atomic():
+        _increment(CourierDailyEarnings, {'courier_id': courier_id, 'day': day}, orders_count=1, earnings=fee)
+        CourierProfile.objects.filter(user_id=courier_id).update(
+            delivered_orders_total=F('delivered_orders_total') + 1, earnings_total=F('earnings_total') + fee
+        )
+
+
+def earnings_summary(courier_id, day=None):
+    """Заработок за день и за все время — два чтения по первичному/уникальному ключу."""
+    day = day or timezone.localdate()
+    today = (
+        CourierDailyEarnings.objects.filter(courier_id=courier_id, day=day)
+        .values('orders_count', 'earnings').first()
+    ) or {}
+    total = (
+        CourierProfile.objects.filter(user_id=courier_id)
+        .values('delivered_orders_total', 'earnings_total').first()
+    )
+    if total is None:
+        # Курьер без профиля: итоги считаем по дневным строкам
+        total = CourierDailyEarnings.objects.filter(courier_id=courier_id).aggregate(
+            delivered_orders_total=Sum('orders_count'), earnings_total=Sum('earnings')
+        )
+    return {
+        'earnings_today': today.get('earnings') or 0,
+        'orders_today': today.get('orders_count') or 0,
+        'earnings_total': total.get('earnings_total') or 0,
+        'orders_total': total.get('delivered_orders_total') or 0,
+    }
+
+
+def earnings_breakdown(courier_id, period='week', limit=12):
+    """Заработок по дням, неделям или месяцам (последние limit периодов, новые первыми)."""
+    trunc = PERIODS[period]
+    rows = (
+        CourierDailyEarnings.objects.filter(courier_id=courier_id)
+        .values(period_start=trunc('day') if trunc else F('day'))
+        .annotate(orders=Sum('orders_count'), earnings=Sum('earnings'))
+    )
+    return list(rows.order_by('-period_start')[:limit])
+
+
+def rebuild_earnings():
+    """
+    Пересобирает сводку с нуля по доставленным заказам. День доставки берется
+    из журнала статусов, для старых заказов без записи в журнале — дата создания.
+    Возвращает число строк сводки.
+    """
+    delivered_at = OrderStatusEvent.objects.filter(
+        order=OuterRef('pk'), to_status='delivered'
+    ).order_by('-created_at').values('created_at')[:1]
+    rows = list(
+        Order.objects.filter(status='delivered', courier__isnull=False)
+        .annotate(day=TruncDate(Coalesce(Subquery(delivered_at), 'created_at')))
+        .values('courier_id', 'day')
+        .annotate(orders_count=Count('id'), earnings=Coalesce(Sum('delivery_fee'), Decimal('0')))
+        .order_by()
+    )
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for row in rows:
+        totals[row['courier_id']][0] += row['orders_count']
+        totals[row['courier_id']][1] += row['earnings']
+
+    with transaction.atomic():
+        CourierDailyEarnings.objects.all().delete()
+        CourierDailyEarnings.objects.bulk_create([CourierDailyEarnings(**row) for row in rows], batch_size=1000)
+        CourierProfile.objects.update(delivered_orders_total=0, earnings_total=0)
+        for courier_id, (count, earnings) in totals.items():
+            CourierProfile.objects.filter(user_id=courier_id).update(
+                delivered_orders_total=count, earnings_total=earnings
+            )
+    return len(rows)
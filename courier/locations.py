@@ -0,0 +1,125 @@
+# courier/locations.py
+"""
+Прием GPS-точек курьеров.
+
+* Последняя позиция курьера хранится в кэше (courier:position:<id>) —
+  строка пользователя в core_user на каждую точку больше не обновляется.
+* Все точки копятся в буфере процесса и пачкой (bulk_create) пишутся
+  в CourierLocationPing, когда буфер заполнился или устарел, а также при
+  завершении процесса.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import CourierLocationPing
+from .tracking import publish_courier_location
+
+logger = logging.getLogger(__name__)
+
+_buffer = []
+_buffer_started = 0.0
+_buffer_lock = threading.Lock()
+
+
+def _position_key(courier_id):
+    return f"courier:position:{courier_id}"
+
+
+def record_pings(courier_id, pings) -> int:
+    """
+    Принимает точки курьера: [{'latitude', 'longitude', 'recorded_at', 'accuracy'}].
+    Обновляет последнюю позицию (если среди точек есть более свежая) и ставит
+    точки в очередь на запись. Возвращает число принятых точек.
+    """
+    if not pings:
+        return 0
+    now = timezone.now()
+    rows = []
+    for ping in pings:
+        # Допустимое расхождение часов телефона прижимаем к времени сервера
+        recorded_at = min(ping.get('recorded_at') or now, now)
+        rows.append(CourierLocationPing(
+            courier_id=courier_id, latitude=ping['latitude'], longitude=ping['longitude'],
+            accuracy=ping.get('accuracy'), recorded_at=recorded_at, day=recorded_at.astimezone(dt_timezone.utc).date(),
+        ))
+
+    latest = max(rows, key=lambda row: row.recorded_at)
+    current = get_latest_position(courier_id, fallback=False)
+    if current is None or current[2] <= latest.recorded_at.timestamp():
+        position = (latest.latitude, latest.longitude, latest.recorded_at.timestamp())
+        cache.set(_position_key(courier_id), position, timeout=settings.COURIER_POSITION_TTL_SECONDS)
+        publish_courier_location(courier_id, *position)
+
+    _enqueue(rows)
+    return len(rows)
+
+
+def get_latest_position(courier_id, fallback=True):
+    """
+    (широта, долгота, unix-время) последней точки или None.
+    Если в кэше позиции нет (истекла или кэш сброшен), берется последняя
+    записанная точка трека.
+    """
+    position = cache.get(_position_key(courier_id))
+    if position is not None or not fallback:
+        return position
+    ping = (
+        CourierLocationPing.objects.filter(courier_id=courier_id)
+        .order_by('-recorded_at').values_list('latitude', 'longitude', 'recorded_at').first()
+    )
+    if ping is None:
+        return None
+    return ping[0], ping[1], ping[2].timestamp()
+
+
+def get_latest_positions(courier_ids) -> dict:
+    """{courier_id: (широта, долгота, unix-время)} из кэша — один запрос к кэшу на всех."""
+    keys = {_position_key(courier_id): courier_id for courier_id in courier_ids}
+    return {keys[key]: position for key, position in cache.get_many(list(keys)).items()}
+
+
+def _enqueue(rows):
+    global _buffer_started
+    with _buffer_lock:
+        if not _buffer:
+            _buffer_started = time.monotonic()
+        _buffer.extend(rows)
+        due = (
+            len(_buffer) >= settings.COURIER_PING_FLUSH_SIZE
+            or time.monotonic() - _buffer_started >= settings.COURIER_PING_FLUSH_SECONDS
+        )
+    if due:
+        flush_pings()
+
+
+def flush_pings() -> int:
+    """Записывает накопленные точки одним bulk_create. Возвращает число строк."""
+    global _buffer
+    with _buffer_lock:
+        rows, _buffer = _buffer, []
+    if not rows:
+        return 0
+    try:
+        CourierLocationPing.objects.bulk_create(rows, batch_size=1000)
+    except Exception:
+        # История треков не должна ломать прием координат: теряем пачку, но пишем в лог
+        logger.exception("Не удалось записать %s точек трека курьеров", len(rows))
+        return 0
+    return len(rows)
+
+
+def prune_pings(keep_days) -> int:
+    """Удаляет дни трека старше keep_days. Возвращает число удаленных строк."""
+    oldest_day = timezone.now().date() - timedelta(days=keep_days)
+    deleted, _ = CourierLocationPing.objects.filter(day__lt=oldest_day).delete()
+    return deleted
+
+
+atexit.register(flush_pings)
@@ -0,0 +1,17 @@
+# courier/management/commands/prune_location_pings.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courier.locations import prune_pings
+
+
+class Command(BaseCommand):
+    help = "Удаляет точки треков курьеров старше заданного числа дней."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.COURIER_PING_RETENTION_DAYS,
+                            help="Сколько последних дней хранить.")
+
+    def handle(self, *args, **options):
+        deleted = prune_pings(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Удалено точек: {deleted}"))
@@ -0,0 +1,12 @@
+# courier/management/commands/rebuild_courier_earnings.py
+from django.core.management.base import BaseCommand
+
+from courier.earnings import rebuild_earnings
+
+
+class Command(BaseCommand):
+    help = "Пересобирает дневную сводку заработка курьеров и итоги в профилях по доставленным заказам."
+
+    def handle(self, *args, **options):
+        count = rebuild_earnings()
+        self.stdout.write(self.style.SUCCESS(f"Строк сводки: {count}"))
@@ -0,0 +1,23 @@
+# courier/management/commands/run_dispatcher.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from courier.dispatch import run_dispatch_round
+
+
+class Command(BaseCommand):
+    help = "Распределяет готовые заказы по свободным курьерам (раунды пакетного назначения)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Работать постоянно (режим воркера).")
+        parser.add_argument('--interval', type=float, default=5.0, help="Пауза между раундами, сек.")
+
+    def handle(self, *args, **options):
+        while True:
+            offers = run_dispatch_round()
+            if offers:
+                self.stdout.write(f"Отправлено предложений: {len(offers)}")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
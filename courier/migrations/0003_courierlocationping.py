@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courier', '0002_remove_courierprofile_paylink_account_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourierLocationPing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('accuracy', models.FloatField(blank=True, null=True, verbose_name='Точность, м')),
+                ('recorded_at', models.DateTimeField(verbose_name='Время на устройстве')),
+                ('day', models.DateField(verbose_name='День (партиция)')),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_pings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Точка трека курьера',
+                'verbose_name_plural': 'Треки курьеров',
+                'indexes': [models.Index(fields=['courier', 'recorded_at'], name='courier_ping_track_idx'), models.Index(fields=['day'], name='courier_ping_day_idx')],
+            },
+        ),
+    ]
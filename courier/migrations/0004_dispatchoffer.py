@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courier', '0003_courierlocationping'),
+        ('orders', '0005_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispatchOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает ответа'), ('accepted', 'Принято'), ('declined', 'Отклонено'), ('expired', 'Истекло'), ('cancelled', 'Отменено')], default='pending', max_length=20)),
+                ('distance_km', models.FloatField(verbose_name='Расстояние до ресторана, км')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('responded_at', models.DateTimeField(blank=True, null=True)),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatch_offers', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatch_offers', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'Предложение заказа',
+                'verbose_name_plural': 'Предложения заказов',
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='dispatch_offer_due_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('order',), name='one_pending_offer_per_order'), models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('courier',), name='one_pending_offer_per_courier')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courier', '0004_dispatchoffer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courierprofile',
+            name='delivered_orders_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Доставлено заказов всего'),
+        ),
+        migrations.AddField(
+            model_name='courierprofile',
+            name='earnings_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Заработано всего'),
+        ),
+        migrations.CreateModel(
+            name='CourierDailyEarnings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Доставлено заказов')),
+                ('earnings', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Заработок')),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Заработок курьера за день',
+                'verbose_name_plural': 'Заработок курьеров по дням',
+                'constraints': [models.UniqueConstraint(fields=('courier', 'day'), name='unique_courier_earnings_day')],
+            },
+        ),
+    ]
@@ -30,6 +30,10 @@ class CourierProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_online = models.BooleanField(default=False, verbose_name="На линии")
 
+    # Итоги по доставленным заказам (ведутся courier.earnings вместе с CourierDailyEarnings)
+    delivered_orders_total = models.PositiveIntegerField(default=0, verbose_name="Доставлено заказов всего")
+    earnings_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Заработано всего")
+
     # 👇 НОВОЕ ПОЛЕ: ID дополнительного магазина этого курьера в Robokassa
     robokassa_shop_code = models.CharField(
         max_length=255,
@@ -45,3 +49,89 @@ class CourierProfile(models.Model):
         verbose_name = "Профиль курьера"
         verbose_name_plural = "Профили курьеров"
         ordering = ['-created_at']
+
+
+class CourierLocationPing(models.Model):
+    """
+    История GPS-точек курьера (только добавление). Строки пишутся пачками
+    из буфера courier.locations; day — "партиция": старые дни удаляются
+    целиком командой prune_location_pings.
+    """
+    courier = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='location_pings')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    accuracy = models.FloatField(null=True, blank=True, verbose_name="Точность, м")
+    recorded_at = models.DateTimeField(verbose_name="Время на устройстве")
+    day = models.DateField(verbose_name="День (партиция)")
+
+    def __str__(self):
+        return f"{self.courier_id}: {self.latitude}, {self.longitude} @ {self.recorded_at}"
+
+    class Meta:
+        verbose_name = "Точка трека курьера"
+        verbose_name_plural = "Треки курьеров"
+        indexes = [
+            models.Index(fields=['courier', 'recorded_at'], name='courier_ping_track_idx'),
+            models.Index(fields=['day'], name='courier_ping_day_idx'),
+        ]
+
+
+class DispatchOffer(models.Model):
+    """
+    Предложение заказа курьеру от диспетчера (courier.dispatch).
+    Живет до expires_at; отказ или истечение передают заказ следующему курьеру.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает ответа'),
+        ('accepted', 'Принято'),
+        ('declined', 'Отклонено'),
+        ('expired', 'Истекло'),
+        ('cancelled', 'Отменено'),
+    ]
+
+    order = models.ForeignKey('orders.Order', on_delete=models.CASCADE, related_name='dispatch_offers')
+    courier = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dispatch_offers')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    distance_km = models.FloatField(verbose_name="Расстояние до ресторана, км")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    responded_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Заказ {self.order_id} → курьер {self.courier_id} ({self.status})"
+
+    class Meta:
+        verbose_name = "Предложение заказа"
+        verbose_name_plural = "Предложения заказов"
+        constraints = [
+            # Одновременно заказ предлагается одному курьеру, а курьеру — один заказ
+            models.UniqueConstraint(fields=['order'], condition=models.Q(status='pending'),
+                                    name='one_pending_offer_per_order'),
+            models.UniqueConstraint(fields=['courier'], condition=models.Q(status='pending'),
+                                    name='one_pending_offer_per_courier'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='dispatch_offer_due_idx'),
+        ]
+
+
+class CourierDailyEarnings(models.Model):
+    """
+    Дневная сводка заработка курьера. Обновляется инкрементально при переходе
+    заказа в статус delivered (courier.earnings); пересобирается командой
+    rebuild_courier_earnings.
+    """
+    courier = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_earnings')
+    day = models.DateField(verbose_name="День")
+    orders_count = models.PositiveIntegerField(default=0, verbose_name="Доставлено заказов")
+    earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Заработок")
+
+    def __str__(self):
+        return f"{self.courier_id} {self.day}: {self.earnings} ({self.orders_count})"
+
+    class Meta:
+        verbose_name = "Заработок курьера за день"
+        verbose_name_plural = "Заработок курьеров по дням"
+        constraints = [
+            models.UniqueConstraint(fields=['courier', 'day'], name='unique_courier_earnings_day'),
+        ]
@@ -0,0 +1,66 @@
+# courier/pagination.py
+import base64
+import json
+from bisect import bisect_right
+
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class DistanceCursorPagination(BasePagination):
+    """
+    Курсорная пагинация по ключу (расстояние, id) для списка, уже
+    отсортированного по этому ключу (см. services.nearby_available_orders).
+    Курсор — последний ключ предыдущей страницы, поэтому новые заказы
+    не сдвигают уже просмотренные страницы.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def __init__(self):
+        self.page_size = settings.COURIER_AVAILABLE_ORDERS_PAGE_SIZE
+        self.next_cursor = None
+        self.request = None
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            distance, order_id = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return float(distance), int(order_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item):
+        raw = json.dumps([item.distance_km, item.order_id]).encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def paginate_nearby(self, nearby, request):
+        self.request = request
+        cursor = self.decode_cursor(request)
+        start = bisect_right(nearby, cursor, key=lambda item: (item.distance_km, item.order_id)) if cursor else 0
+        page = nearby[start:start + self.page_size]
+        has_more = start + self.page_size < len(nearby)
+        self.next_cursor = self.encode_cursor(page[-1]) if page and has_more else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -21,4 +21,4 @@ class IsOrderCourier(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # obj здесь - это экземпляр Order
-        return obj.courier == request.user
\ No newline at end of file
+        return obj.courier_id == request.user.id
\ No newline at end of file
@@ -1,11 +1,17 @@
 # courier/serializers.py (ПОЛНЫЙ КОД)
+import math
 from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import CourierProfile
+from .models import CourierProfile, DispatchOffer
 from orders.models import Order
 from core.models import User
 from restaurants.serializers import RestaurantSerializer
 from orders.serializers import OrderItemSerializer # Этот импорт теперь безопасен
+from orders.eta import estimate_order_delivery, get_eta_table
+from .services import get_courier_position
 
 class CourierProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,10 +20,60 @@ class CourierProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ('verification_status',)
 
 class PublicCourierSerializer(serializers.ModelSerializer):
+    # Координаты берутся из хранилища последних позиций (courier.locations)
+    latitude = serializers.SerializerMethodField()
+    longitude = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = ('id', 'first_name', 'phone', 'latitude', 'longitude')
 
+    def _position(self, obj):
+        if not hasattr(obj, '_courier_position'):
+            obj._courier_position = get_courier_position(obj)
+        return obj._courier_position
+
+    def get_latitude(self, obj):
+        position = self._position(obj)
+        return position[0] if position else None
+
+    def get_longitude(self, obj):
+        position = self._position(obj)
+        return position[1] if position else None
+
+
+class LocationPingSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    recorded_at = serializers.DateTimeField(required=False)
+    accuracy = serializers.FloatField(required=False, min_value=0)
+
+    def validate_recorded_at(self, value):
+        # Точка "из будущего" стала бы последней позицией и блокировала бы настоящие
+        if value > timezone.now() + timedelta(seconds=settings.COURIER_PING_MAX_CLOCK_SKEW_SECONDS):
+            raise serializers.ValidationError('Время точки опережает время сервера')
+        return value
+
+
+class LocationBatchSerializer(serializers.Serializer):
+    """
+    Пачка точек от приложения курьера. Старый формат — одна точка
+    в полях latitude/longitude — тоже принимается.
+    """
+    pings = LocationPingSerializer(many=True, required=False)
+    latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(required=False, min_value=-180, max_value=180)
+
+    def validate(self, attrs):
+        pings = attrs.get('pings') or []
+        if attrs.get('latitude') is not None and attrs.get('longitude') is not None:
+            pings.append({'latitude': attrs['latitude'], 'longitude': attrs['longitude']})
+        if not pings:
+            raise serializers.ValidationError('Не предоставлены координаты')
+        if len(pings) > settings.COURIER_PING_MAX_BATCH:
+            raise serializers.ValidationError(f'Не больше {settings.COURIER_PING_MAX_BATCH} точек за запрос')
+        return {'pings': pings}
+
 class OrderTrackingSerializer(serializers.ModelSerializer):
     courier = PublicCourierSerializer(read_only=True)
     restaurant_lat = serializers.FloatField(source='restaurant.latitude', read_only=True)
@@ -38,20 +94,52 @@ class OrderTrackingSerializer(serializers.ModelSerializer):
         )
 
     def get_preparation_time(self, obj):
-        # Примерная логика — можешь заменить своей
+        # Типичное время приготовления этого ресторана (orders.eta, из таблицы в памяти)
         if obj.status in ['preparing', 'ready_for_pickup']:
-            return "15 минут"
+            return f"{math.ceil(get_eta_table().preparation_minutes(obj.restaurant_id))} минут"
         return None
 
     def get_estimated_delivery_time(self, obj):
-        # Пример: считаем доставку 30 минут от времени создания
         if obj.created_at:
-            estimate = obj.created_at + timedelta(minutes=30)
-            return estimate.isoformat()
+            return estimate_order_delivery(obj).isoformat()
         return None
+
+
 class CourierOrderSerializer(serializers.ModelSerializer):
     restaurant = RestaurantSerializer(read_only=True)
     items = OrderItemSerializer(many=True, read_only=True)
     class Meta:
         model = Order
-        fields = [ 'id', 'code', 'address_text', 'comment', 'total_price', 'delivery_fee', 'status', 'created_at', 'restaurant', 'items', 'delivery_lat', 'delivery_lon' ]
\ No newline at end of file
+        fields = [ 'id', 'code', 'address_text', 'comment', 'total_price', 'delivery_fee', 'status', 'created_at', 'restaurant', 'items', 'delivery_lat', 'delivery_lon' ]
+
+
+class CourierOrderListSerializer(serializers.ModelSerializer):
+    """Краткая карточка заказа в истории курьера; подробности — CourierOrderDetailView."""
+    restaurant_name = serializers.CharField(source='restaurant.name', default=None, read_only=True)
+    restaurant_address = serializers.CharField(source='restaurant.address', default=None, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'code', 'status', 'created_at', 'delivery_fee', 'address_text',
+            'restaurant_name', 'restaurant_address',
+        ]
+
+
+class AvailableOrderSerializer(CourierOrderSerializer):
+    """Заказ в списке доступных: плюс расстояние от курьера до ресторана."""
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(CourierOrderSerializer.Meta):
+        fields = CourierOrderSerializer.Meta.fields + ['distance_km']
+
+    def get_distance_km(self, obj):
+        return self.context.get('distances', {}).get(obj.id)
+
+
+class DispatchOfferSerializer(serializers.ModelSerializer):
+    order = CourierOrderSerializer(read_only=True)
+
+    class Meta:
+        model = DispatchOffer
+        fields = ('id', 'order', 'distance_km', 'expires_at')
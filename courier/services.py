@@ -1,26 +1,73 @@
 # courier/services.py (НОВЫЙ ФАЙЛ)
+from functools import reduce
+from operator import or_
+from typing import NamedTuple
+
 from django.db import transaction
-from rest_framework.exceptions import ValidationError
+from django.db.models import Q
+
+from core.geo import geohash_cells_around, haversine_km, to_float_array
 from orders.models import Order
+from .dispatch import claim_order
+from .locations import get_latest_position
 
 @transaction.atomic
 def accept_order_for_courier(order_id, courier):
     """
     Сервисная функция для безопасного назначения заказа на курьера.
-    Предотвращает гонку состояний.
+    Предотвращает гонку состояний: заказ закрепляется условным UPDATE
+    (см. dispatch.claim_order), без блокировки строки на время транзакции.
     """
-    # Блокируем строку заказа в БД до конца транзакции.
-    # Если другой курьер попытается принять этот же заказ, его запрос будет ждать,
-    # а затем получит ошибку, так как статус заказа уже изменится.
-    order = Order.objects.select_for_update().get(id=order_id)
-
-    if order.status != 'ready_for_pickup' or order.courier is not None:
-        raise ValidationError("Этот заказ уже недоступен или взят другим курьером.")
-
-    order.courier = courier
-    order.status = 'on_the_way'
-    order.save(update_fields=['courier', 'status'])
-    
+    order = claim_order(order_id, courier)
+
     # TODO: Отправить push-уведомление клиенту, что курьер выехал
-    
-    return order
\ No newline at end of file
+
+    return order
+
+
+class NearbyOrder(NamedTuple):
+    order_id: int
+    distance_km: float
+
+
+def get_courier_position(courier):
+    """
+    Последние известные координаты курьера (широта, долгота) или None.
+    Источник — хранилище courier.locations; поля User.latitude/longitude
+    остались только для курьеров, не присылавших точки после перехода.
+    """
+    position = get_latest_position(courier.pk)
+    if position is not None:
+        return position[0], position[1]
+    if courier.latitude is None or courier.longitude is None:
+        return None
+    return courier.latitude, courier.longitude
+
+
+def nearby_available_orders(latitude, longitude, radius_km) -> list:
+    """
+    Свободные заказы, готовые к выдаче, в радиусе radius_km от точки —
+    от ближайшего ресторана к дальнему (при равенстве — по id).
+
+    Кандидаты отбираются по geohash ресторана (startswith по индексу для
+    ячейки точки и соседних), точное расстояние считается векторно.
+    Из БД читаются только id и координаты, а не заказы целиком.
+    """
+    cells = geohash_cells_around(latitude, longitude, radius_km)
+    in_cells = reduce(or_, (Q(restaurant__geo_cell__startswith=cell) for cell in cells))
+    rows = list(
+        Order.objects.filter(status='ready_for_pickup', courier__isnull=True).filter(in_cells)
+        .values_list('id', 'restaurant__latitude', 'restaurant__longitude')
+    )
+    if not rows:
+        return []
+
+    order_ids, latitudes, longitudes = zip(*rows)
+    distances = haversine_km(latitude, longitude, to_float_array(latitudes), to_float_array(longitudes))
+    nearby = [
+        NearbyOrder(order_id, round(float(distance), 3))
+        for order_id, distance in zip(order_ids, distances)
+        if distance <= radius_km
+    ]
+    nearby.sort(key=lambda item: (item.distance_km, item.order_id))
+    return nearby
@@ -0,0 +1,43 @@
+# courier/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from orders.models import Order
+from orders.state import COURIER_UNKNOWN, order_status_changed
+from .earnings import record_delivery
+from .tracking import order_channel, order_status_event, publish
+
+
+@receiver(post_save, sender=Order)
+def order_status_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Сообщает подписчикам живого трекинга о смене статуса или курьера (после коммита)."""
+    if raw or created or (update_fields is not None and not {'status', 'courier'} & set(update_fields)):
+        return
+    event = order_status_event(instance)
+    transaction.on_commit(lambda: publish(order_channel(instance.pk), event))
+
+
+@receiver(order_status_changed)
+def order_transitioned(sender, order_id, to_status, courier_id=COURIER_UNKNOWN, **kwargs):
+    """То же для переходов через orders.state.transition (UPDATE не вызывает post_save)."""
+    def send():
+        current = courier_id
+        if current == COURIER_UNKNOWN:
+            # Уже после коммита, чтобы не удлинять транзакцию перехода
+            current = Order.objects.filter(id=order_id).values_list('courier_id', flat=True).first()
+        publish(order_channel(order_id), {
+            'type': 'status', 'order_id': order_id, 'status': to_status, 'courier_id': current,
+        })
+
+    transaction.on_commit(send)
+
+
+@receiver(order_status_changed)
+def order_delivered(sender, order_id, to_status, **kwargs):
+    """Учитывает доставку в сводке заработка курьера — в той же транзакции, что и переход."""
+    if to_status != 'delivered':
+        return
+    courier_id, fee = Order.objects.filter(id=order_id).values_list('courier_id', 'delivery_fee').get()
+    if courier_id:
+        record_delivery(courier_id, fee)
@@ -0,0 +1,78 @@
+# courier/streams.py
+"""
+SSE-поток живого трекинга заказа (text/event-stream).
+
+Вместо опроса OrderTrackingView клиент держит одно соединение:
+сначала приходит снимок (event: snapshot — как ответ OrderTrackingView),
+затем события status и location (см. courier.tracking). Поток закрывается,
+когда заказ доставлен или отменен. Работает под ASGI (jetfood_backend.asgi).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+
+from core.sse import authenticate, event_stream_response, format_event
+from orders.models import Order
+from .serializers import OrderTrackingSerializer
+from .tracking import courier_channel, get_broker, order_channel
+
+FINAL_STATUSES = frozenset({'delivered', 'cancelled'})
+
+
+def _load_snapshot(order_id, user):
+    order = Order.objects.select_related('courier', 'restaurant').filter(id=order_id, user=user).first()
+    if order is None:
+        return None
+    return order, OrderTrackingSerializer(order).data
+
+
+async def order_tracking_stream(request, order_id):
+    user = await sync_to_async(authenticate)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Учетные данные не были предоставлены.'}, status=401)
+    # Подписка до чтения снимка: статус, опубликованный между чтением и
+    # подпиской, иначе потерялся бы (а вместе с ним и новый курьер)
+    subscription = get_broker().subscribe()
+    try:
+        await subscription.add(order_channel(order_id))
+        loaded = await sync_to_async(_load_snapshot)(order_id, user)
+        if loaded is None:
+            await subscription.close()
+            return JsonResponse({'detail': 'Заказ не найден.'}, status=404)
+        order, snapshot = loaded
+        courier_id = order.courier_id
+        if courier_id:
+            await subscription.add(courier_channel(courier_id))
+    except BaseException:
+        await subscription.close()
+        raise
+
+    async def events():
+        nonlocal courier_id
+        try:
+            yield format_event('snapshot', snapshot)
+            if order.status in FINAL_STATUSES:
+                return
+
+            while True:
+                message = await subscription.get(timeout=settings.ORDER_TRACKING_HEARTBEAT_SECONDS)
+                if message is None:
+                    # Комментарий-пинг держит соединение открытым через прокси
+                    yield b": ping\n\n"
+                    continue
+                channel, event = message
+                if event['type'] == 'status':
+                    # На нового курьера подписываемся до отправки события клиенту
+                    if event['courier_id'] and event['courier_id'] != courier_id:
+                        courier_id = event['courier_id']
+                        await subscription.add(courier_channel(courier_id))
+                    yield format_event('status', event)
+                    if event['status'] in FINAL_STATUSES:
+                        return
+                elif channel == courier_channel(courier_id):
+                    # События прежнего курьера (если заказ переназначили) пропускаем
+                    yield format_event(event['type'], event)
+        finally:
+            await subscription.close()
+
+    return event_stream_response(events())
@@ -1,3 +1,423 @@
-from django.test import TestCase
+import itertools
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.geo import encode_geohash, geohash_cells_around
+from core.models import User
+from orders.models import Order
+from orders.state import transition, transition_many
+from restaurants.models import Restaurant
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import streams
+from .earnings import rebuild_earnings
+from .dispatch import accept_offer, decline_offer, hungarian, run_dispatch_round
+from .locations import flush_pings, get_latest_position, record_pings
+from .models import CourierDailyEarnings, CourierLocationPing, CourierProfile
+from .tracking import get_broker, order_channel
+
+record_pings_async = sync_to_async(record_pings)
+
+
+class GeohashTests(TestCase):
+
+    def test_cells_cover_radius(self):
+        # Точка в 4 км от центра должна попасть в одну из ячеек вокруг центра
+        cells = geohash_cells_around(43.238949, 76.889709, 5)
+        point = encode_geohash(43.238949 + 0.036, 76.889709, 9)
+        self.assertTrue(any(point.startswith(cell) for cell in cells))
+
+
+@override_settings(COURIER_AVAILABLE_ORDERS_PAGE_SIZE=2)
+class AvailableOrdersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.courier = User.objects.create_user(phone='+77000000002', password='pass', role='courier',
+                                               latitude=43.238949, longitude=76.889709)
+        cls.orders = []
+        # Рестораны примерно в 0, 1, 2, 3 км к северу и один в 50 км
+        for offset in (Decimal('0.027'), Decimal('0'), Decimal('0.009'), Decimal('0.018'), Decimal('0.45')):
+            restaurant = Restaurant.objects.create(
+                owner=owner, name=f'Ресторан {offset}', description='', address='Алматы',
+                latitude=Decimal('43.238949') + offset, longitude=Decimal('76.889709'),
+            )
+            cls.orders.append(Order.objects.create(restaurant=restaurant, status='ready_for_pickup'))
+        Order.objects.create(restaurant=restaurant, status='preparing')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier)
+
+    def test_orders_ranked_by_distance_with_cursor(self):
+        first = self.client.get('/api/courier/orders/available/').json()
+        self.assertEqual([item['id'] for item in first['results']], [self.orders[1].id, self.orders[2].id])
+        self.assertEqual(first['results'][0]['distance_km'], 0.0)
+
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['id'] for item in second['results']], [self.orders[3].id, self.orders[0].id])
+        self.assertIsNone(second['next'])
+
+    def test_radius_limits_results(self):
+        response = self.client.get('/api/courier/orders/available/', {'radius': 1.5})
+        self.assertEqual([item['id'] for item in response.json()['results']], [self.orders[1].id, self.orders[2].id])
+        self.assertLess(response.json()['results'][1]['distance_km'], 1.5)
+
+        self.assertEqual(self.client.get('/api/courier/orders/available/', {'radius': 100}).status_code, 400)
+
+    def test_courier_without_position_gets_error(self):
+        self.courier.latitude = None
+        self.courier.save()
+        self.assertEqual(self.client.get('/api/courier/orders/available/').status_code, 400)
+
+
+@override_settings(COURIER_PING_FLUSH_SIZE=3, COURIER_PING_FLUSH_SECONDS=60)
+class LocationIngestionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courier = User.objects.create_user(phone='+77000000002', password='pass', role='courier')
+
+    def setUp(self):
+        cache.clear()
+        flush_pings()
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier)
+
+    def post(self, data):
+        return self.client.post('/api/courier/profile/location/update/', data, format='json')
+
+    def test_batch_updates_latest_position_without_touching_user(self):
+        now = timezone.now()
+        pings = [
+            {'latitude': 43.25, 'longitude': 76.95, 'recorded_at': (now - timedelta(seconds=10)).isoformat()},
+            {'latitude': 43.26, 'longitude': 76.96, 'recorded_at': now.isoformat(), 'accuracy': 5},
+        ]
+        # Только чтение текущей позиции из кэша — без запросов к БД
+        with self.assertNumQueries(0):
+            response = self.post({'pings': pings})
+        self.assertEqual(response.json()['accepted'], 2)
+        self.assertEqual(get_latest_position(self.courier.pk)[:2], (43.26, 76.96))
+
+        self.courier.refresh_from_db()
+        self.assertIsNone(self.courier.latitude)
+        self.assertEqual(CourierLocationPing.objects.count(), 0)
+
+        # Старая точка, пришедшая с опозданием, не перетирает позицию; буфер заполнился
+        self.post({'pings': [{'latitude': 1, 'longitude': 1, 'recorded_at': (now - timedelta(minutes=1)).isoformat()}]})
+        self.assertEqual(get_latest_position(self.courier.pk)[:2], (43.26, 76.96))
+        self.assertEqual(CourierLocationPing.objects.filter(courier=self.courier).count(), 3)
+
+    def test_future_pings_do_not_block_position_updates(self):
+        now = timezone.now()
+        far = {'latitude': 1, 'longitude': 1, 'recorded_at': (now + timedelta(hours=1)).isoformat()}
+        self.assertEqual(self.post({'pings': [far]}).status_code, 400)
+
+        # В пределах допуска точка принимается, но ее время прижимается к серверному
+        skewed = {'latitude': 2, 'longitude': 2, 'recorded_at': (now + timedelta(seconds=30)).isoformat()}
+        self.assertEqual(self.post({'pings': [skewed]}).status_code, 200)
+        self.assertLessEqual(get_latest_position(self.courier.pk)[2], timezone.now().timestamp())
+        self.post({'latitude': 43.25, 'longitude': 76.95})
+        self.assertEqual(get_latest_position(self.courier.pk)[:2], (43.25, 76.95))
+
+    def test_single_point_format_and_fallback_to_track(self):
+        self.assertEqual(self.post({'latitude': 43.25, 'longitude': 76.95}).status_code, 200)
+        flush_pings()
+        cache.clear()
+
+        self.assertEqual(get_latest_position(self.courier.pk)[:2], (43.25, 76.95))
+        self.assertEqual(self.post({'latitude': 143.25, 'longitude': 76.95}).status_code, 400)
+        self.assertEqual(self.post({}).status_code, 400)
+
+
+@override_settings(ORDER_TRACKING_LOCATION_INTERVAL=2, ORDER_TRACKING_MIN_MOVE_METERS=10,
+                   COURIER_PING_FLUSH_SIZE=1000, COURIER_PING_FLUSH_SECONDS=60)
+class OrderTrackingStreamTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.user = User.objects.create_user(phone='+77000000003', password='pass')
+        cls.courier = User.objects.create_user(phone='+77000000004', password='pass', role='courier')
+        cls.late_courier = User.objects.create_user(phone='+77000000005', password='pass', role='courier')
+        restaurant = Restaurant.objects.create(owner=owner, name='Ресторан', description='', address='Алматы')
+        cls.order = Order.objects.create(user=cls.user, restaurant=restaurant, status='ready_for_pickup')
+        cls.url = f'/api/courier/track/{cls.order.id}/stream/'
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        flush_pings()
+
+    async def read_event(self, stream):
+        event, data = (await anext(stream)).decode().strip().split('\n')
+        return event.removeprefix('event: '), data.removeprefix('data: ')
+
+    async def test_stream_pushes_status_and_throttled_locations(self):
+        token = AccessToken.for_user(self.user)
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        event, data = await self.read_event(stream)
+        self.assertEqual(event, 'snapshot')
+        self.assertIn('"status": "ready_for_pickup"', data)
+
+        # Курьер взял заказ: поток подписывается на его координаты
+        get_broker().publish(order_channel(self.order.id), {
+            'type': 'status', 'order_id': self.order.id, 'status': 'on_the_way', 'courier_id': self.courier.id,
+        })
+        self.assertEqual((await self.read_event(stream))[0], 'status')
+
+        start = timezone.now() - timedelta(seconds=10)
+        pings = [
+            {'latitude': 43.25, 'longitude': 76.95, 'recorded_at': start},
+            {'latitude': 43.2501, 'longitude': 76.95, 'recorded_at': start + timedelta(seconds=1)},  # рано
+            {'latitude': 43.25001, 'longitude': 76.95, 'recorded_at': start + timedelta(seconds=5)},  # ~1 м
+            {'latitude': 43.26, 'longitude': 76.95, 'recorded_at': start + timedelta(seconds=6)},
+        ]
+        for ping in pings:
+            await record_pings_async(self.courier.id, [ping])
+
+        event, first = await self.read_event(stream)
+        self.assertEqual(event, 'location')
+        self.assertIn('"latitude": 43.25,', first)
+        event, second = await self.read_event(stream)
+        self.assertIn('"latitude": 43.26,', second)
+
+        get_broker().publish(order_channel(self.order.id), {
+            'type': 'status', 'order_id': self.order.id, 'status': 'delivered', 'courier_id': self.courier.id,
+        })
+        self.assertIn('"delivered"', (await self.read_event(stream))[1])
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+
+    async def test_status_published_while_loading_snapshot_is_not_lost(self):
+        load_snapshot = streams._load_snapshot
+
+        def load_then_publish(order_id, user):
+            loaded = load_snapshot(order_id, user)
+            # Курьер назначен уже после чтения снимка
+            get_broker().publish(order_channel(order_id), {
+                'type': 'status', 'order_id': order_id, 'status': 'on_the_way', 'courier_id': self.late_courier.id,
+            })
+            return loaded
+
+        token = AccessToken.for_user(self.user)
+        with mock.patch.object(streams, '_load_snapshot', load_then_publish):
+            response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {token}'})
+        stream = aiter(response.streaming_content)
+
+        event, data = await self.read_event(stream)
+        self.assertEqual(event, 'snapshot')
+        self.assertIn('"status": "ready_for_pickup"', data)
+        event, data = await self.read_event(stream)
+        self.assertEqual(event, 'status')
+        self.assertIn('"on_the_way"', data)
+
+        # Координаты нового курьера тоже доходят
+        await record_pings_async(self.late_courier.id, [{'latitude': 43.25, 'longitude': 76.95}])
+        self.assertEqual((await self.read_event(stream))[0], 'location')
+        await stream.aclose()
+
+    async def test_stream_requires_order_owner(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+        token = AccessToken.for_user(self.courier)
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TrackingStatusEventTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.courier = User.objects.create_user(phone='+77000000004', password='pass', role='courier')
+        cls.restaurant = Restaurant.objects.create(owner=owner, name='Ресторан', description='', address='Алматы')
+
+    def published(self, change):
+        with mock.patch('courier.signals.publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            change()
+        return [event['courier_id'] for _, event in (call.args for call in publish.call_args_list)]
+
+    def test_transitions_publish_the_orders_courier(self):
+        delivering = Order.objects.create(restaurant=self.restaurant, status='on_the_way', courier=self.courier)
+        self.assertEqual(
+            self.published(lambda: transition(delivering.id, 'delivered', courier=self.courier)), [self.courier.id]
+        )
+        # Переход, который курьера не трогает и не проверяет
+        ready = Order.objects.create(restaurant=self.restaurant, status='ready_for_pickup', courier=self.courier)
+        self.assertEqual(self.published(lambda: transition(ready.id, 'cancelled')), [self.courier.id])
+
+        pending = Order.objects.create(restaurant=self.restaurant, status='pending', courier=self.courier)
+        self.assertEqual(self.published(lambda: transition_many([pending.id], 'accepted')), [self.courier.id])
+
+
+class HungarianTests(TestCase):
+
+    def brute_force(self, cost):
+        rows, columns = len(cost), len(cost[0])
+        if rows <= columns:
+            return min(sum(cost[r][c] for r, c in zip(range(rows), perm))
+                       for perm in itertools.permutations(range(columns), rows))
+        return min(sum(cost[r][c] for c, r in zip(range(columns), perm))
+                   for perm in itertools.permutations(range(rows), columns))
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        for shape in [(3, 3), (2, 5), (5, 2), (4, 6)]:
+            cost = rng.integers(-5, 20, size=shape).tolist()
+            pairs = hungarian(cost)
+            self.assertEqual(len(pairs), min(shape))
+            self.assertEqual(len({c for _, c in pairs}), min(shape))
+            self.assertEqual(sum(cost[r][c] for r, c in pairs), self.brute_force(cost))
+
+
+class DispatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.near = Restaurant.objects.create(owner=owner, name='Рядом', description='', address='Алматы',
+                                             latitude=Decimal('43.240'), longitude=Decimal('76.890'))
+        cls.far = Restaurant.objects.create(owner=owner, name='Далеко', description='', address='Алматы',
+                                            latitude=Decimal('43.280'), longitude=Decimal('76.890'))
+        cls.couriers = []
+        # Первый курьер у ресторана "Рядом", второй — у ресторана "Далеко"
+        for index, latitude in enumerate((43.240, 43.281)):
+            courier = User.objects.create_user(phone=f'+7700000001{index}', password='pass', role='courier',
+                                               latitude=latitude, longitude=76.890)
+            CourierProfile.objects.create(user=courier, is_online=True)
+            cls.couriers.append(courier)
+
+    def setUp(self):
+        cache.clear()
+        self.near_order = Order.objects.create(restaurant=self.near, status='ready_for_pickup')
+        self.far_order = Order.objects.create(restaurant=self.far, status='ready_for_pickup')
+
+    def test_batch_minimizes_total_pickup_distance(self):
+        offers = {offer.order_id: offer.courier_id for offer in run_dispatch_round()}
+        self.assertEqual(offers, {self.near_order.id: self.couriers[0].id, self.far_order.id: self.couriers[1].id})
+        # Повторный раунд не дублирует предложения
+        self.assertEqual(run_dispatch_round(), [])
+
+    def test_orphaned_order_on_the_way_does_not_block_dispatch(self):
+        # Курьера заказа в пути удалили: courier стал NULL
+        Order.objects.create(restaurant=self.near, status='on_the_way')
+        self.assertEqual(len(run_dispatch_round()), 2)
+
+    def test_accept_assigns_order_and_decline_passes_it_on(self):
+        self.far_order.delete()
+        offer = run_dispatch_round()[0]
+        self.assertEqual(offer.courier_id, self.couriers[0].id)
+
+        decline_offer(offer.id, self.couriers[0])
+        next_offer = run_dispatch_round()[0]
+        self.assertEqual(next_offer.courier_id, self.couriers[1].id)
+
+        order = accept_offer(next_offer.id, self.couriers[1])
+        self.assertEqual((order.status, order.courier_id), ('on_the_way', self.couriers[1].id))
+        with self.assertRaises(ValidationError):
+            accept_offer(next_offer.id, self.couriers[1])
+
+    def test_expired_offer_goes_to_next_courier(self):
+        self.far_order.delete()
+        offer = run_dispatch_round()[0]
+
+        later = timezone.now() + timedelta(minutes=5)
+        next_offer = run_dispatch_round(now=later)[0]
+        offer.refresh_from_db()
+        self.assertEqual(offer.status, 'expired')
+        self.assertNotEqual(next_offer.courier_id, offer.courier_id)
+
+
+class CourierEarningsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.courier = User.objects.create_user(phone='+77000000004', password='pass', role='courier')
+        CourierProfile.objects.create(user=cls.courier)
+        restaurant = Restaurant.objects.create(owner=owner, name='Ресторан', description='', address='Алматы')
+        cls.orders = [
+            Order.objects.create(restaurant=restaurant, courier=cls.courier, status='on_the_way',
+                                 delivery_fee=Decimal(fee))
+            for fee in ('500.00', '700.00')
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier)
+
+    def deliver(self, order):
+        response = self.client.post(
+            f'/api/courier/orders/{order.id}/update-status/', {'action': 'delivered'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_delivery_updates_ledger_and_stats(self):
+        for order in self.orders:
+            self.deliver(order)
+
+        # Сводка за день и итоги профиля — два запроса, независимо от истории
+        with self.assertNumQueries(2):
+            stats = self.client.get('/api/courier/profile/stats/').json()
+        self.assertEqual(stats['orders_today'], 2)
+        self.assertEqual(Decimal(stats['earnings_today']), Decimal('1200.00'))
+        self.assertEqual(stats['orders_total'], 2)
+
+        month = self.client.get('/api/courier/profile/earnings/', {'period': 'month'}).json()
+        self.assertEqual(len(month), 1)
+        self.assertEqual(month[0]['orders'], 2)
+        self.assertEqual(self.client.get('/api/courier/profile/earnings/', {'period': 'year'}).status_code, 400)
+
+    def test_rebuild_matches_incremental_ledger(self):
+        for order in self.orders:
+            self.deliver(order)
+        incremental = list(CourierDailyEarnings.objects.values('courier_id', 'day', 'orders_count', 'earnings'))
+
+        CourierDailyEarnings.objects.all().delete()
+        CourierProfile.objects.update(delivered_orders_total=0, earnings_total=0)
+        self.assertEqual(rebuild_earnings(), 1)
+
+        self.assertEqual(
+            list(CourierDailyEarnings.objects.values('courier_id', 'day', 'orders_count', 'earnings')), incremental
+        )
+        profile = CourierProfile.objects.get(user=self.courier)
+        self.assertEqual((profile.delivered_orders_total, profile.earnings_total), (2, Decimal('1200.00')))
+
+    def test_courier_without_profile_gets_no_profile_created(self):
+        CourierProfile.objects.all().delete()
+        for order in self.orders:
+            self.deliver(order)
+        self.assertEqual(rebuild_earnings(), 1)
+
+        self.assertFalse(CourierProfile.objects.exists())
+        stats = self.client.get('/api/courier/profile/stats/').json()
+        self.assertEqual(stats['orders_total'], 2)
+        self.assertEqual(Decimal(stats['earnings_total']), Decimal('1200.00'))
+
+    def test_history_is_paginated_summary(self):
+        self.deliver(self.orders[0])
+        page = self.client.get('/api/courier/orders/history/').json()
+        self.assertEqual([order['id'] for order in page['results']], [self.orders[1].id, self.orders[0].id])
+        self.assertEqual(page['results'][0]['restaurant_name'], 'Ресторан')
+        self.assertNotIn('items', page['results'][0])
+
+        detail = self.client.get(f'/api/courier/orders/{self.orders[0].id}/')
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual(detail.json()['status'], 'delivered')
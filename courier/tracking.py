@@ -0,0 +1,196 @@
+# courier/tracking.py
+"""
+Живое отслеживание заказа: события публикуются в брокер, а SSE-поток
+(courier.streams) доставляет их клиентам, подписанным на заказ.
+
+Каналы:
+* order:<id>    — смена статуса заказа (и назначение курьера);
+* courier:<id>  — перемещения курьера, не чаще раза в
+  ORDER_TRACKING_LOCATION_INTERVAL секунд и только при сдвиге хотя бы на
+  ORDER_TRACKING_MIN_MOVE_METERS метров.
+
+Брокер выбирается настройкой ORDER_TRACKING_BROKER: InProcessBroker (один
+процесс — разработка и тесты) или RedisBroker (pub/sub, несколько воркеров).
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+from core.geo import distance_km
+
+logger = logging.getLogger(__name__)
+
+# Сколько событий может ждать отправки одному подписчику; при переполнении
+# выбрасываются самые старые (клиенту важнее свежие координаты)
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+
+def order_channel(order_id):
+    return f"order:{order_id}"
+
+
+def courier_channel(courier_id):
+    return f"courier:{courier_id}"
+
+
+def restaurant_channel(restaurant_id):
+    """Сигнал "в ленте заказов ресторана есть изменения" (restaurants.streams)."""
+    return f"restaurant:{restaurant_id}"
+
+
+class InProcessSubscription:
+    def __init__(self, broker):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+        self.channels = set()
+
+    async def add(self, channel):
+        self.channels.add(channel)
+        self.broker._register(channel, self)
+
+    def deliver(self, message):
+        # Вызывается в потоке цикла событий подписчика
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """(канал, событие) или None, если за timeout секунд ничего не пришло."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        for channel in self.channels:
+            self.broker._unregister(channel, self)
+        self.channels.clear()
+
+
+class InProcessBroker:
+    """Брокер в памяти процесса: публиковать можно из любого потока."""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def _register(self, channel, subscription):
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+
+    def _unregister(self, channel, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, (channel, event))
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт
+                self._unregister(channel, subscription)
+
+    def subscribe(self):
+        return InProcessSubscription(self)
+
+
+class RedisSubscription:
+    def __init__(self, client):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+
+    async def add(self, channel):
+        await self.pubsub.subscribe(channel)
+
+    async def get(self, timeout):
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = await self.pubsub.get_message(timeout=remaining)
+            if message is not None:
+                channel = message['channel']
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                return channel, json.loads(message['data'])
+        return None
+
+    async def close(self):
+        await self.pubsub.aclose()
+
+
+class RedisBroker:
+    """Redis pub/sub: события доходят до подписчиков в любом процессе."""
+
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.REDIS_URL
+        self._client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, event):
+        self._client.publish(channel, json.dumps(event, cls=DjangoJSONEncoder))
+
+    def subscribe(self):
+        import redis.asyncio
+
+        # Асинхронный клиент привязан к циклу событий, поэтому создается по месту
+        return RedisSubscription(redis.asyncio.Redis.from_url(self.url))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.ORDER_TRACKING_BROKER)()
+    return _broker
+
+
+def publish(channel, event):
+    try:
+        get_broker().publish(channel, event)
+    except Exception:
+        # Трекинг — best effort: его сбой не должен ломать смену статуса или прием координат
+        logger.exception("Не удалось опубликовать событие в канал %s", channel)
+
+
+def order_status_event(order):
+    return {'type': 'status', 'order_id': order.pk, 'status': order.status, 'courier_id': order.courier_id}
+
+
+_last_published = {}
+_last_published_lock = threading.Lock()
+
+
+def publish_courier_location(courier_id, latitude, longitude, timestamp):
+    """Публикует позицию курьера с прореживанием по времени и расстоянию."""
+    with _last_published_lock:
+        previous = _last_published.get(courier_id)
+        if previous is not None:
+            prev_latitude, prev_longitude, prev_timestamp = previous
+            if timestamp - prev_timestamp < settings.ORDER_TRACKING_LOCATION_INTERVAL:
+                return False
+            moved_meters = distance_km(prev_latitude, prev_longitude, latitude, longitude) * 1000
+            if moved_meters < settings.ORDER_TRACKING_MIN_MOVE_METERS:
+                return False
+        _last_published[courier_id] = (latitude, longitude, timestamp)
+    publish(courier_channel(courier_id), {
+        'type': 'location', 'courier_id': courier_id, 'latitude': latitude, 'longitude': longitude,
+        'recorded_at': timestamp,
+    })
+    return True
@@ -8,28 +8,40 @@ from .views import (
     CurrentOrderView,
     UpdateDeliveryStatusView, # 👈 Импортируем наш перенесенный view
     CourierOrderHistoryView,
+    CourierOrderDetailView,
     CourierStatsView,
+    CourierEarningsView,
     OrderTrackingView,
+    DispatchOfferListView,
+    DispatchOfferAcceptView,
+    DispatchOfferDeclineView,
 )
+from .streams import order_tracking_stream
 
 profile_urls = [
     path('documents/', DocumentUploadView.as_view(), name='document-upload'),
     path('status/toggle-online/', ToggleOnlineStatusView.as_view(), name='toggle-online'),
     path('location/update/', UpdateCourierLocationView.as_view(), name='update-location'),
     path('stats/', CourierStatsView.as_view(), name='stats'),
+    path('earnings/', CourierEarningsView.as_view(), name='earnings'),
 ]
 
 orders_urls = [
     path('available/', AvailableOrdersView.as_view(), name='available-orders'),
     path('current/', CurrentOrderView.as_view(), name='current-order'),
     path('history/', CourierOrderHistoryView.as_view(), name='order-history'),
+    path('<int:pk>/', CourierOrderDetailView.as_view(), name='courier-order-detail'),
     path('<int:order_id>/accept/', CourierAcceptOrderView.as_view(), name='accept-order'),
+    path('offers/', DispatchOfferListView.as_view(), name='dispatch-offers'),
+    path('offers/<int:offer_id>/accept/', DispatchOfferAcceptView.as_view(), name='accept-dispatch-offer'),
+    path('offers/<int:offer_id>/decline/', DispatchOfferDeclineView.as_view(), name='decline-dispatch-offer'),
     # 👇 ВОТ НАШ НОВЫЙ URL, КОТОРЫЙ БУДЕТ ИСПОЛЬЗОВАТЬ ПРИЛОЖЕНИЕ КУРЬЕРА
     path('<int:order_id>/update-status/', UpdateDeliveryStatusView.as_view(), name='update-delivery-status'),
 ]
 
 client_urls = [
     path('track/<int:order_id>/', OrderTrackingView.as_view(), name='order-tracking'),
+    path('track/<int:order_id>/stream/', order_tracking_stream, name='order-tracking-stream'),
 ]
 
 urlpatterns = [
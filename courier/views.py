@@ -1,19 +1,25 @@
 from rest_framework import generics, status, views, permissions
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Count
 from django.utils import timezone
 from rest_framework.views import APIView
 from django.db import transaction
+from django.conf import settings
 import logging
 
 # Импорты вашего проекта
 from orders.models import Order
-from .models import CourierProfile
-from .serializers import CourierProfileSerializer, CourierOrderSerializer, OrderTrackingSerializer
+from orders.pagination import OrderHistoryPagination
+from orders.state import transition
+from .models import CourierProfile, DispatchOffer
+from .serializers import (
+    CourierProfileSerializer, CourierOrderSerializer, OrderTrackingSerializer, AvailableOrderSerializer,
+    LocationBatchSerializer, DispatchOfferSerializer, CourierOrderListSerializer,
+)
+from .pagination import DistanceCursorPagination
 from .permissions import IsCourier, IsOrderCourier
-from . import services
+from . import services, locations, dispatch, earnings
 # from payments.services import RobokassaService  # 👈 ЭТА СТРОКА УДАЛЕНА
 
 logger = logging.getLogger(__name__)
@@ -44,31 +50,55 @@ class ToggleOnlineStatusView(views.APIView):
 
 
 class UpdateCourierLocationView(views.APIView):
-    """Для курьера: обновить свое текущее местоположение."""
+    """
+    Для курьера: обновить свое текущее местоположение.
+    Принимает одну точку (latitude, longitude) или пачку {"pings": [...]}.
+    """
     permission_classes = [IsCourier]
 
     def post(self, request, *args, **kwargs):
-        latitude = request.data.get('latitude')
-        longitude = request.data.get('longitude')
-        if latitude is not None and longitude is not None:
-            request.user.latitude = latitude
-            request.user.longitude = longitude
-            request.user.save(update_fields=['latitude', 'longitude'])
-            return Response({'status': 'Местоположение обновлено'}, status=status.HTTP_200_OK)
-        return Response({'error': 'Не предоставлены координаты'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = LocationBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        accepted = locations.record_pings(request.user.pk, serializer.validated_data['pings'])
+        return Response({'status': 'Местоположение обновлено', 'accepted': accepted}, status=status.HTTP_200_OK)
 
 
 class AvailableOrdersView(generics.ListAPIView):
-    """Для курьера: список заказов, готовых к выдаче."""
-    serializer_class = CourierOrderSerializer
+    """
+    Для курьера: заказы, готовые к выдаче, в радиусе от его местоположения —
+    от ближайшего к дальнему, постранично (?cursor=). Радиус — ?radius= в км.
+    """
+    serializer_class = AvailableOrderSerializer
     permission_classes = [IsCourier]
+    pagination_class = DistanceCursorPagination
 
-    def get_queryset(self):
-        return Order.objects.filter(status='ready_for_pickup', courier__isnull=True).select_related(
-            'restaurant'
-        ).prefetch_related(
-            'items__dish' # Уточнил до dish
-        ).order_by('-created_at')
+    def get_radius(self):
+        try:
+            radius = float(self.request.query_params.get('radius', settings.COURIER_SEARCH_RADIUS_KM))
+        except ValueError:
+            raise ValidationError({'radius': 'Радиус должен быть числом.'})
+        if not 0 < radius <= settings.COURIER_SEARCH_MAX_RADIUS_KM:
+            raise ValidationError({'radius': f'Радиус должен быть от 0 до {settings.COURIER_SEARCH_MAX_RADIUS_KM} км.'})
+        return radius
+
+    def list(self, request, *args, **kwargs):
+        position = services.get_courier_position(request.user)
+        if position is None:
+            return Response({'error': 'Сначала обновите свое местоположение.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        nearby = services.nearby_available_orders(*position, self.get_radius())
+        page = self.paginator.paginate_nearby(nearby, request)
+
+        # Полные данные загружаем только для заказов текущей страницы
+        orders = Order.objects.select_related('restaurant').prefetch_related(
+            'items__menu', 'restaurant__categories', 'restaurant__tariffs'
+        ).in_bulk([item.order_id for item in page])
+        context = {**self.get_serializer_context(), 'distances': {item.order_id: item.distance_km for item in page}}
+        serializer = self.get_serializer_class()(
+            [orders[item.order_id] for item in page if item.order_id in orders], many=True, context=context
+        )
+        return self.paginator.get_paginated_response(serializer.data)
 
 
 class CourierAcceptOrderView(views.APIView):
@@ -86,6 +116,37 @@ class CourierAcceptOrderView(views.APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class DispatchOfferListView(generics.ListAPIView):
+    """Для курьера: предложения заказов от диспетчера, ожидающие ответа."""
+    serializer_class = DispatchOfferSerializer
+    permission_classes = [IsCourier]
+
+    def get_queryset(self):
+        return DispatchOffer.objects.filter(
+            courier=self.request.user, status='pending', expires_at__gt=timezone.now()
+        ).select_related('order__restaurant').prefetch_related(
+            'order__items__menu', 'order__restaurant__categories', 'order__restaurant__tariffs'
+        )
+
+
+class DispatchOfferAcceptView(views.APIView):
+    """Для курьера: принять предложение — заказ закрепляется за ним."""
+    permission_classes = [IsCourier]
+
+    def post(self, request, offer_id):
+        order = dispatch.accept_offer(offer_id, request.user)
+        return Response(CourierOrderSerializer(order).data, status=status.HTTP_200_OK)
+
+
+class DispatchOfferDeclineView(views.APIView):
+    """Для курьера: отказаться от предложения — заказ уйдет следующему курьеру."""
+    permission_classes = [IsCourier]
+
+    def post(self, request, offer_id):
+        dispatch.decline_offer(offer_id, request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class CurrentOrderView(generics.RetrieveAPIView):
     """Возвращает текущий активный заказ курьера."""
     serializer_class = CourierOrderSerializer
@@ -94,7 +155,9 @@ class CurrentOrderView(generics.RetrieveAPIView):
     def get_object(self):
         order = Order.objects.filter(
             courier=self.request.user, status='on_the_way'
-        ).select_related('restaurant').prefetch_related('items__dish').first()
+        ).select_related('restaurant').prefetch_related(
+            'items__menu', 'restaurant__categories', 'restaurant__tariffs'
+        ).first()
         if not order:
             raise NotFound("Активный заказ не найден.")
         return order
@@ -112,9 +175,7 @@ class UpdateDeliveryStatusView(APIView):
 
         action = request.data.get('action')
 
-        if action == 'delivered' and order.status == 'on_the_way':
-            order.status = 'delivered'
-            order.save(update_fields=['status'])
+        if action == 'delivered' and transition(order.id, 'delivered', actor=request.user, courier=request.user):
             return Response({"success": "Статус заказа обновлен на 'Доставлен'."}, status=status.HTTP_200_OK)
 
         return Response(
@@ -123,14 +184,27 @@ class UpdateDeliveryStatusView(APIView):
 
 
 class CourierOrderHistoryView(generics.ListAPIView):
-    """Для курьера: возвращает всю историю его заказов."""
+    """
+    Для курьера: история его заказов — краткие карточки, постранично
+    (курсор ?cursor=). Подробности — в CourierOrderDetailView.
+    """
+    serializer_class = CourierOrderListSerializer
+    permission_classes = [IsCourier]
+    pagination_class = OrderHistoryPagination
+
+    def get_queryset(self):
+        return Order.objects.filter(courier=self.request.user).select_related('restaurant')
+
+
+class CourierOrderDetailView(generics.RetrieveAPIView):
+    """Для курьера: полные данные одного из его заказов."""
     serializer_class = CourierOrderSerializer
     permission_classes = [IsCourier]
 
     def get_queryset(self):
-        return Order.objects.filter(courier=self.request.user).select_related(
-            'restaurant'
-        ).prefetch_related('items__dish').order_by('-created_at')
+        return Order.objects.filter(courier=self.request.user).select_related('restaurant').prefetch_related(
+            'items__menu', 'restaurant__categories', 'restaurant__tariffs'
+        )
 
 
 class CourierStatsView(views.APIView):
@@ -138,20 +212,23 @@ class CourierStatsView(views.APIView):
     permission_classes = [IsCourier]
 
     def get(self, request, *args, **kwargs):
-        courier = request.user
-        today = timezone.now().date()
-        today_stats = Order.objects.filter(courier=courier, status='delivered', created_at__date=today).aggregate(
-            earnings_today=Sum('delivery_fee'), orders_today=Count('id')
-        )
-        total_stats = Order.objects.filter(courier=courier, status='delivered').aggregate(
-            earnings_total=Sum('delivery_fee'), orders_total=Count('id')
-        )
-        return Response({
-            'earnings_today': today_stats.get('earnings_today') or 0,
-            'orders_today': today_stats.get('orders_today') or 0,
-            'earnings_total': total_stats.get('earnings_total') or 0,
-            'orders_total': total_stats.get('orders_total') or 0,
-        })
+        # Две строки из сводки (courier.earnings) вместо агрегатов по всей истории заказов
+        return Response(earnings.earnings_summary(request.user.id))
+
+
+class CourierEarningsView(views.APIView):
+    """Заработок курьера по дням, неделям или месяцам: ?period=day|week|month&limit=N."""
+    permission_classes = [IsCourier]
+
+    def get(self, request, *args, **kwargs):
+        period = request.query_params.get('period', 'week')
+        if period not in earnings.PERIODS:
+            raise ValidationError({'period': f"Допустимые значения: {', '.join(earnings.PERIODS)}."})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 12)), 1), 366)
+        except ValueError:
+            raise ValidationError({'limit': "Должно быть целым числом."})
+        return Response(earnings.earnings_breakdown(request.user.id, period, limit))
 
 
 class OrderTrackingView(generics.RetrieveAPIView):
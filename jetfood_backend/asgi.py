@@ -2,6 +2,9 @@
 ASGI config for jetfood_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Long-lived streams (e.g. live order tracking over SSE) need an ASGI server
+such as uvicorn; under WSGI they would hold a worker per connection, so the
+Procfile runs gunicorn with uvicorn workers against this module.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -63,8 +63,16 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Пользователь собирается из утверждений токена, без запроса к БД (см. core.authentication)
+        'core.authentication.ClaimsJWTAuthentication',
     ],
+    # Скользящие окна для входа по OTP (core.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'otp_send_phone': os.getenv('OTP_SEND_PHONE_RATE', '3/min'),
+        'otp_send_ip': os.getenv('OTP_SEND_IP_RATE', '20/hour'),
+        'otp_verify_phone': os.getenv('OTP_VERIFY_PHONE_RATE', '10/min'),
+        'otp_verify_ip': os.getenv('OTP_VERIFY_IP_RATE', '60/hour'),
+    },
 }
 
 SIMPLE_JWT = {
@@ -72,6 +80,43 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
 }
 
+# Общий кэш процессов (снимки меню и т.п.). Без REDIS_URL — локальный кэш процесса,
+# годится только для разработки и тестов.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Одноразовые коды входа: хранилище (core.otp.CacheOTPStore или DatabaseOTPStore),
+# длина кода, срок жизни и число неверных попыток, после которого код сгорает
+OTP_STORE = os.getenv('OTP_STORE', 'core.otp.CacheOTPStore')
+OTP_LENGTH = int(os.getenv('OTP_LENGTH', '4'))
+OTP_TTL_SECONDS = int(os.getenv('OTP_TTL_SECONDS', '300'))
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', '5'))
+
+# Отправка SMS (core.sms): шлюз, размер очереди процесса, число потоков-отправщиков
+# (0 — отправлять сразу, в потоке запроса), повторы с экспоненциальной задержкой
+SMS_GATEWAY = os.getenv('SMS_GATEWAY', 'core.sms.ConsoleGateway')
+SMS_QUEUE_SIZE = int(os.getenv('SMS_QUEUE_SIZE', '1000'))
+SMS_WORKER_THREADS = int(os.getenv('SMS_WORKER_THREADS', '2'))
+SMS_MAX_RETRIES = int(os.getenv('SMS_MAX_RETRIES', '3'))
+SMS_RETRY_BACKOFF = float(os.getenv('SMS_RETRY_BACKOFF', '0.5'))
+# HTTP-провайдер (core.sms.HTTPGateway): адрес API, ключ, таймаут и максимум сообщений в запросе
+SMS_API_URL = os.getenv('SMS_API_URL')
+SMS_API_KEY = os.getenv('SMS_API_KEY')
+SMS_API_TIMEOUT = float(os.getenv('SMS_API_TIMEOUT', '5'))
+SMS_BATCH_SIZE = int(os.getenv('SMS_BATCH_SIZE', '50'))
+
 LANGUAGE_CODE = 'ru-ru'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -98,6 +143,94 @@ CLIENT_SERVICE_FEE_PERCENT = Decimal(os.getenv('CLIENT_SERVICE_FEE_PERCENT', '5.
 MIN_CLIENT_SERVICE_FEE = Decimal(os.getenv('MIN_CLIENT_SERVICE_FEE', '100.0'))
 MAX_CLIENT_SERVICE_FEE = Decimal(os.getenv('MAX_CLIENT_SERVICE_FEE', '300.0'))
 
+# Оценка времени доставки по умолчанию (пока нет накопленной статистики, см. orders/eta.py)
+DEFAULT_PREPARATION_MINUTES = int(os.getenv('DEFAULT_PREPARATION_MINUTES', '15'))
+COURIER_AVERAGE_SPEED_KMH = float(os.getenv('COURIER_AVERAGE_SPEED_KMH', '20'))
+# Статистика ETA по журналу статусов: за сколько дней, минимум заказов на ресторан/диапазон
+# расстояний и как часто процесс перечитывает таблицу из БД (сек)
+ETA_STATS_WINDOW_DAYS = int(os.getenv('ETA_STATS_WINDOW_DAYS', '30'))
+ETA_STATS_MIN_SAMPLES = int(os.getenv('ETA_STATS_MIN_SAMPLES', '10'))
+ETA_TABLE_TTL_SECONDS = float(os.getenv('ETA_TABLE_TTL_SECONDS', '300'))
+# Сколько часов хранится ответ по ключу Idempotency-Key
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+# Через сколько секунд "зависший" (незавершенный) запрос можно выполнить повторно
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT_SECONDS', '300'))
+
+# Сколько секунд хранится готовый JSON меню ресторана (сбрасывается и раньше, при изменении меню)
+MENU_SNAPSHOT_TTL_SECONDS = int(os.getenv('MENU_SNAPSHOT_TTL_SECONDS', '3600'))
+
+# Сколько секунд хранится определение промокода в кэше (сбрасывается и раньше, при изменении промокодов)
+PROMO_CACHE_TTL_SECONDS = int(os.getenv('PROMO_CACHE_TTL_SECONDS', '600'))
+# Сколько использований счетчик шардированного промокода резервирует из max_uses за раз
+# (больше — реже блокируется строка промокода, но дольше "зависает" остаток в счетчиках)
+PROMO_COUNTER_RESERVATION_BATCH = int(os.getenv('PROMO_COUNTER_RESERVATION_BATCH', '20'))
+
+# Поиск доступных заказов для курьера: радиус по умолчанию, максимальный радиус (км) и размер страницы
+COURIER_SEARCH_RADIUS_KM = float(os.getenv('COURIER_SEARCH_RADIUS_KM', '5'))
+COURIER_SEARCH_MAX_RADIUS_KM = float(os.getenv('COURIER_SEARCH_MAX_RADIUS_KM', '30'))
+COURIER_AVAILABLE_ORDERS_PAGE_SIZE = int(os.getenv('COURIER_AVAILABLE_ORDERS_PAGE_SIZE', '20'))
+
+# Прием координат курьеров: сколько живет последняя позиция в кэше, когда сбрасывать
+# буфер точек в БД (по размеру или возрасту), максимум точек в запросе, сколько дней хранить треки
+COURIER_POSITION_TTL_SECONDS = int(os.getenv('COURIER_POSITION_TTL_SECONDS', '3600'))
+COURIER_PING_FLUSH_SIZE = int(os.getenv('COURIER_PING_FLUSH_SIZE', '500'))
+COURIER_PING_FLUSH_SECONDS = float(os.getenv('COURIER_PING_FLUSH_SECONDS', '5'))
+COURIER_PING_MAX_BATCH = int(os.getenv('COURIER_PING_MAX_BATCH', '100'))
+COURIER_PING_RETENTION_DAYS = int(os.getenv('COURIER_PING_RETENTION_DAYS', '30'))
+# Насколько время точки может опережать часы сервера (расхождение часов телефона), сек
+COURIER_PING_MAX_CLOCK_SKEW_SECONDS = int(os.getenv('COURIER_PING_MAX_CLOCK_SKEW_SECONDS', '60'))
+
+# Живой трекинг заказов (SSE): брокер событий, интервал пингов соединения,
+# прореживание координат курьера по времени (сек) и расстоянию (м)
+ORDER_TRACKING_BROKER = os.getenv(
+    'ORDER_TRACKING_BROKER',
+    'courier.tracking.RedisBroker' if REDIS_URL else 'courier.tracking.InProcessBroker'
+)
+ORDER_TRACKING_HEARTBEAT_SECONDS = float(os.getenv('ORDER_TRACKING_HEARTBEAT_SECONDS', '15'))
+ORDER_TRACKING_LOCATION_INTERVAL = float(os.getenv('ORDER_TRACKING_LOCATION_INTERVAL', '2'))
+ORDER_TRACKING_MIN_MOVE_METERS = float(os.getenv('ORDER_TRACKING_MIN_MOVE_METERS', '10'))
+
+# Диспетчер заказов: сколько заказов/курьеров в одном раунде, время на ответ курьера (сек),
+# максимальное расстояние до ресторана (км) и "бонус" за ожидание заказа (км за минуту, не больше N минут)
+DISPATCH_BATCH_SIZE = int(os.getenv('DISPATCH_BATCH_SIZE', '200'))
+DISPATCH_OFFER_TTL_SECONDS = int(os.getenv('DISPATCH_OFFER_TTL_SECONDS', '45'))
+DISPATCH_MAX_PICKUP_KM = float(os.getenv('DISPATCH_MAX_PICKUP_KM', '7'))
+DISPATCH_AGE_WEIGHT = float(os.getenv('DISPATCH_AGE_WEIGHT', '0.2'))
+DISPATCH_MAX_AGE_BONUS_MINUTES = float(os.getenv('DISPATCH_MAX_AGE_BONUS_MINUTES', '30'))
+
+# Доска заказов ресторана: размер страницы ленты изменений, сколько секунд курсор
+# отстает от текущего времени (защита от поздних коммитов), как часто SSE-поток
+# перечитывает ленту без событий и максимум заказов в пакетной смене статуса
+RESTAURANT_BOARD_PAGE_SIZE = int(os.getenv('RESTAURANT_BOARD_PAGE_SIZE', '100'))
+RESTAURANT_BOARD_SETTLE_SECONDS = float(os.getenv('RESTAURANT_BOARD_SETTLE_SECONDS', '2'))
+RESTAURANT_BOARD_POLL_SECONDS = float(os.getenv('RESTAURANT_BOARD_POLL_SECONDS', '5'))
+RESTAURANT_BOARD_MAX_BULK = int(os.getenv('RESTAURANT_BOARD_MAX_BULK', '100'))
+
+# Максимум ресторанов в выдаче поиска
+RESTAURANT_SEARCH_MAX_RESULTS = int(os.getenv('RESTAURANT_SEARCH_MAX_RESULTS', '100'))
+
+# Размер страницы истории заказов (клиента и курьера), если не передан ?page_size=
+ORDER_HISTORY_PAGE_SIZE = int(os.getenv('ORDER_HISTORY_PAGE_SIZE', '20'))
+
+# Максимум ресторанов в одном запросе пакетной оценки доставки
+DELIVERY_QUOTE_MAX_RESTAURANTS = int(os.getenv('DELIVERY_QUOTE_MAX_RESTAURANTS', '200'))
+
+PAYLINK_API_KEY = os.getenv('PAYLINK_API_KEY')
+PAYLINK_API_URL = os.getenv('PAYLINK_API_URL', 'https://api.paylink.kz/v1/payments')
+PAYLINK_CONNECT_TIMEOUT = float(os.getenv('PAYLINK_CONNECT_TIMEOUT', '3'))
+PAYLINK_READ_TIMEOUT = float(os.getenv('PAYLINK_READ_TIMEOUT', '10'))
+PAYLINK_POOL_MAXSIZE = int(os.getenv('PAYLINK_POOL_MAXSIZE', '10'))
+PAYLINK_MAX_RETRIES = int(os.getenv('PAYLINK_MAX_RETRIES', '2'))
+PAYLINK_RETRY_BACKOFF = float(os.getenv('PAYLINK_RETRY_BACKOFF', '0.2'))
+# Circuit breaker: сколько ошибок подряд "размыкают" цепь и на сколько секунд
+PAYLINK_BREAKER_FAILURE_THRESHOLD = int(os.getenv('PAYLINK_BREAKER_FAILURE_THRESHOLD', '5'))
+PAYLINK_BREAKER_RESET_SECONDS = float(os.getenv('PAYLINK_BREAKER_RESET_SECONDS', '30'))
+# Фоновое создание ссылок на оплату (0 потоков — выполнять сразу, в текущем потоке)
+PAYLINK_WORKER_THREADS = int(os.getenv('PAYLINK_WORKER_THREADS', '4'))
+# Сколько секунд API ждет ссылку, прежде чем ответить статусом pending
+PAYLINK_LINK_WAIT_SECONDS = float(os.getenv('PAYLINK_LINK_WAIT_SECONDS', '3'))
+PAYLINK_OUTBOX_MAX_ATTEMPTS = int(os.getenv('PAYLINK_OUTBOX_MAX_ATTEMPTS', '5'))
+
 ROBOKASSA_MERCHANT_LOGIN = os.getenv('ROBOKASSA_MERCHANT_LOGIN')
 ROBOKASSA_PASSWORD_1 = os.getenv('ROBOKASSA_PASSWORD_1')
 ROBOKASSA_PASSWORD_2 = os.getenv('ROBOKASSA_PASSWORD_2')
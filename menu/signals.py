@@ -0,0 +1,44 @@
+# menu/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from restaurants.models import Restaurant
+from .models import Dish, MenuCategory
+from .snapshots import bump_menu_version
+
+
+def invalidate_menus(restaurant_ids):
+    """
+    Версия меню увеличивается после коммита: иначе параллельный запрос мог бы
+    закэшировать еще старые данные под уже новой версией.
+    """
+    restaurant_ids = {pk for pk in restaurant_ids if pk is not None}
+
+    def bump():
+        for restaurant_id in restaurant_ids:
+            bump_menu_version(restaurant_id)
+
+    if restaurant_ids:
+        transaction.on_commit(bump)
+
+
+@receiver([post_save, post_delete], sender=Dish)
+def dish_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_menus([instance.restaurant_id])
+
+
+@receiver(post_save, sender=MenuCategory)
+@receiver(pre_delete, sender=MenuCategory)
+def category_changed(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    invalidate_menus(instance.dishes.values_list('restaurant_id', flat=True).distinct())
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def restaurant_changed(sender, instance, raw=False, **kwargs):
+    # Например, снятие is_approved должно сразу скрыть меню
+    if not raw:
+        invalidate_menus([instance.pk])
@@ -0,0 +1,83 @@
+# menu/snapshots.py
+"""
+Готовые снимки публичного меню ресторана.
+
+Меню меняется редко, а читается при каждом открытии ресторана. Поэтому JSON
+меню рендерится один раз и хранится в кэше под ключом с версией меню.
+Версию увеличивают сигналы menu.signals (после коммита) при изменении блюд,
+категорий и ресторана — старые снимки просто перестают читаться и истекают.
+"""
+import hashlib
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.http import Http404
+from rest_framework.renderers import JSONRenderer
+
+from restaurants.models import Restaurant
+from .models import Dish, MenuCategory
+from .serializers import MenuCategoryWithDishesSerializer
+
+
+class MenuSnapshot(NamedTuple):
+    etag: str
+    content: bytes
+
+
+def _version_key(restaurant_id):
+    return f"menu:version:{restaurant_id}"
+
+
+def _new_version() -> int:
+    # Версия "с нуля" основана на времени: если ключ версии вытеснили из кэша,
+    # новая версия не совпадет ни с одним из старых снимков.
+    return time.time_ns() // 1000
+
+
+def get_menu_version(restaurant_id) -> int:
+    key = _version_key(restaurant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_menu_version(restaurant_id):
+    """Инвалидирует снимки меню ресторана."""
+    try:
+        cache.incr(_version_key(restaurant_id))
+    except ValueError:
+        cache.set(_version_key(restaurant_id), _new_version(), timeout=None)
+
+
+def _snapshot_key(restaurant_id, version, request):
+    # В ответе абсолютные URL картинок — они зависят от схемы и хоста запроса
+    origin = hashlib.sha1(request.build_absolute_uri('/').encode('utf-8')).hexdigest()[:12]
+    return f"menu:snapshot:{restaurant_id}:{version}:{origin}"
+
+
+def render_menu(restaurant_id, request) -> MenuSnapshot:
+    """Строит меню из БД (как раньше делал MenuByRestaurantView) и рендерит его в JSON."""
+    if not Restaurant.objects.filter(id=restaurant_id, is_approved=True).exists():
+        raise Http404("Ресторан не найден.")
+    categories = MenuCategory.objects.prefetch_related(
+        Prefetch('dishes', queryset=Dish.objects.filter(restaurant_id=restaurant_id, is_available=True))
+    ).filter(dishes__restaurant_id=restaurant_id).distinct()
+    data = MenuCategoryWithDishesSerializer(categories, many=True, context={'request': request}).data
+    content = JSONRenderer().render(data)
+    return MenuSnapshot(etag=f'"{hashlib.sha1(content).hexdigest()}"', content=content)
+
+
+def get_menu_snapshot(restaurant_id, request) -> MenuSnapshot:
+    """Снимок меню из кэша; при промахе — рендер и сохранение."""
+    key = _snapshot_key(restaurant_id, get_menu_version(restaurant_id), request)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = render_menu(restaurant_id, request)
+        cache.set(key, tuple(snapshot), timeout=settings.MENU_SNAPSHOT_TTL_SECONDS)
+        return snapshot
+    return MenuSnapshot(*snapshot)
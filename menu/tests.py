@@ -1,3 +1,54 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from core.models import User
+from restaurants.models import Restaurant
+from .models import MenuCategory, Dish
+
+
+class MenuSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.restaurant = Restaurant.objects.create(owner=owner, name='Ресторан', description='', address='Алматы',
+                                                   is_approved=True)
+        cls.category = MenuCategory.objects.create(name='Пицца', image='categories/pizza.png')
+        cls.dish = Dish.objects.create(restaurant=cls.restaurant, category=cls.category, name='Маргарита', price=1000)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f'/api/menus/restaurants/{self.restaurant.id}/'
+
+    def test_repeat_open_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()[0]['dishes'][0]['name'], 'Маргарита')
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+
+    def test_dish_change_invalidates_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Dish.objects.create(restaurant=self.restaurant, category=self.category, name='Пепперони', price=1200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([dish['name'] for dish in response.json()[0]['dishes']], ['Маргарита', 'Пепперони'])
+
+    def test_unapproved_restaurant_menu_disappears(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.is_approved = False
+            self.restaurant.save()
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -1,14 +1,16 @@
 # menu/views.py (ОБНОВЛЕННАЯ ВЕРСИЯ)
 
-from rest_framework import generics, viewsets, permissions
-from django.db.models import Prefetch, Count
-from django.shortcuts import get_object_or_404
+from rest_framework import generics, viewsets, permissions, serializers
+from django.db.models import Count
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 from .models import Dish, MenuCategory
 from .serializers import MenuCategorySerializer, DishSerializer, MenuCategoryWithDishesSerializer, MenuItemSerializer
 from restaurants.models import Restaurant
 from restaurants.serializers import RestaurantSerializer
 from .permissions import IsDishOwner # 👈 1. Импортируем наше новое правило
+from .snapshots import get_menu_snapshot
 
 
 # --- VIEWS ДЛЯ КЛИЕНТОВ (публичные) ---
@@ -46,24 +48,22 @@ class RestaurantsByCategoryView(generics.ListAPIView):
 class MenuByRestaurantView(generics.ListAPIView):
     """
     Отдает полное меню ресторана, сгруппированное по категориям.
+    Ответ — готовый JSON из кэша (см. menu.snapshots) с ETag:
+    повторное открытие с If-None-Match получает 304 без обращения к БД.
     """
     serializer_class = MenuCategoryWithDishesSerializer
     permission_classes = [permissions.AllowAny]
-
-    def get_queryset(self):
-        restaurant_id = self.kwargs.get('restaurant_id')
-        restaurant = get_object_or_404(Restaurant, id=restaurant_id, is_approved=True)
-
-        # 4. ГЛАВНАЯ ОПТИМИЗАЦИЯ:
-        # Мы получаем категории, но сразу же "подгружаем" в них только те блюда,
-        # которые относятся к нужному ресторану и доступны.
-        # Это решает проблему N+1 запросов.
-        return MenuCategory.objects.prefetch_related(
-            Prefetch(
-                'dishes',
-                queryset=Dish.objects.filter(restaurant=restaurant, is_available=True)
-            )
-        ).filter(dishes__restaurant=restaurant).distinct()
+    queryset = MenuCategory.objects.none()  # только для схемы API: данные берутся из снимка
+
+    def get(self, request, *args, **kwargs):
+        snapshot = get_menu_snapshot(self.kwargs['restaurant_id'], request)
+        response = get_conditional_response(request, etag=snapshot.etag)
+        if response is None:
+            response = HttpResponse(snapshot.content, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        # Клиент может хранить меню, но обязан сверять его по ETag
+        patch_cache_control(response, no_cache=True)
+        return response
 
 
 # --- VIEWSET ДЛЯ МЕНЕДЖЕРА РЕСТОРАНА ---
@@ -0,0 +1,177 @@
+# orders/eta.py
+"""
+Оценка времени доставки (ETA).
+
+Статистика считается заранее (refresh_eta_stats, по расписанию) из журнала
+статусов OrderStatusEvent:
+  * время приготовления ресторана — от accepted до ready_for_pickup;
+  * скорость курьера по диапазонам расстояний — от on_the_way до delivered
+    (включает дорогу до ресторана и передачу заказа, поэтому на коротких
+    дистанциях "скорость" ниже).
+Запросы читают таблицу EtaTable в памяти процесса (перечитывается из БД не
+чаще раза в ETA_TABLE_TTL_SECONDS), поэтому оценка стоит O(1) без запросов.
+Пока статистики мало — используются DEFAULT_PREPARATION_MINUTES и
+COURIER_AVERAGE_SPEED_KMH.
+"""
+import math
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core import geo
+from .models import Order, OrderStatusEvent, RestaurantPrepStats, TravelSpeedStats
+
+# Нижние границы диапазонов расстояний, км
+DISTANCE_BUCKETS_KM = (0, 1, 2, 3, 5, 8, 12)
+# Выбросы (забытые заказы, ошибочные статусы) не учитываются
+MAX_PREPARATION_MINUTES = 180
+MAX_TRAVEL_MINUTES = 180
+
+
+def distance_bucket(distance):
+    return DISTANCE_BUCKETS_KM[max(bisect_right(DISTANCE_BUCKETS_KM, distance) - 1, 0)]
+
+
+class EtaTable:
+    def __init__(self, preparation=None, speeds=None):
+        self.preparation = preparation or {}  # restaurant_id -> минуты
+        speeds = speeds or {}                  # нижняя граница диапазона -> км/ч
+        self.speed_bounds = sorted(speeds)
+        self.speeds = [speeds[bound] for bound in self.speed_bounds]
+
+    @classmethod
+    def load(cls):
+        return cls(
+            preparation=dict(RestaurantPrepStats.objects.values_list('restaurant_id', 'median_minutes')),
+            speeds=dict(TravelSpeedStats.objects.values_list('distance_from_km', 'speed_kmh')),
+        )
+
+    def preparation_minutes(self, restaurant_id) -> float:
+        return self.preparation.get(restaurant_id, settings.DEFAULT_PREPARATION_MINUTES)
+
+    def speed_kmh(self, distance) -> float:
+        position = bisect_right(self.speed_bounds, distance) - 1
+        if position < 0:
+            return settings.COURIER_AVERAGE_SPEED_KMH
+        return self.speeds[position]
+
+    def travel_minutes(self, distance) -> float:
+        return distance / self.speed_kmh(distance) * 60
+
+    def delivery_minutes(self, restaurant_id, distance) -> int:
+        preparation = self.preparation_minutes(restaurant_id)
+        if distance is None:
+            return int(math.ceil(preparation))
+        return int(math.ceil(preparation + self.travel_minutes(distance)))
+
+
+_table = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def get_eta_table() -> EtaTable:
+    """Таблица текущего процесса; перечитывается из БД, если устарела."""
+    global _table, _loaded_at
+    if _table is None or time.monotonic() - _loaded_at > settings.ETA_TABLE_TTL_SECONDS:
+        with _lock:
+            if _table is None or time.monotonic() - _loaded_at > settings.ETA_TABLE_TTL_SECONDS:
+                _table = EtaTable.load()
+                _loaded_at = time.monotonic()
+    return _table
+
+
+def reset_eta_table():
+    """Сбрасывает таблицу процесса (после пересчета статистики и в тестах)."""
+    global _table
+    _table = None
+
+
+def estimate_delivery_minutes(restaurant_id, distance_km) -> int:
+    """
+    Ожидаемое время от оформления заказа до доставки, в минутах:
+    время приготовления ресторана + время в пути для этого расстояния.
+    """
+    return get_eta_table().delivery_minutes(restaurant_id, distance_km)
+
+
+def estimate_order_delivery(order):
+    """Ожидаемое время доставки заказа (datetime); ресторан должен быть загружен вместе с заказом."""
+    restaurant = order.restaurant
+    distance = None
+    if restaurant is not None and None not in (order.delivery_lat, order.delivery_lon):
+        distance = geo.distance_km(restaurant.latitude, restaurant.longitude, order.delivery_lat, order.delivery_lon)
+    return order.created_at + timedelta(minutes=estimate_delivery_minutes(order.restaurant_id, distance))
+
+
+def _collect_samples(since):
+    """Длительности этапов по заказам, завершившим этап после since."""
+    finished = OrderStatusEvent.objects.filter(
+        created_at__gte=since, to_status__in=('ready_for_pickup', 'delivered')
+    ).values('order_id')
+    moments = defaultdict(dict)
+    events = OrderStatusEvent.objects.filter(
+        order__in=finished, to_status__in=('accepted', 'ready_for_pickup', 'on_the_way', 'delivered'),
+    ).order_by('created_at').values_list('order_id', 'to_status', 'created_at')
+    for order_id, status, created_at in events.iterator():
+        moments[order_id][status] = created_at  # последний переход в статус
+
+    orders = Order.objects.filter(id__in=finished).distinct().values_list(
+        'id', 'restaurant_id', 'restaurant__latitude', 'restaurant__longitude', 'delivery_lat', 'delivery_lon'
+    )
+    preparation = defaultdict(list)
+    travel = defaultdict(list)  # диапазон -> [(км, минуты)]
+    for order_id, restaurant_id, rest_lat, rest_lon, lat, lon in orders.iterator():
+        seen = moments.get(order_id, {})
+        if restaurant_id and 'accepted' in seen and 'ready_for_pickup' in seen:
+            minutes = (seen['ready_for_pickup'] - seen['accepted']).total_seconds() / 60
+            if 0 < minutes <= MAX_PREPARATION_MINUTES:
+                preparation[restaurant_id].append(minutes)
+        if 'on_the_way' in seen and 'delivered' in seen and None not in (rest_lat, rest_lon, lat, lon):
+            minutes = (seen['delivered'] - seen['on_the_way']).total_seconds() / 60
+            distance = geo.distance_km(rest_lat, rest_lon, lat, lon)
+            if 0 < minutes <= MAX_TRAVEL_MINUTES and distance > 0:
+                travel[distance_bucket(distance)].append((distance, minutes))
+    return preparation, travel
+
+
+def refresh_eta_stats(window_days=None, min_samples=None):
+    """
+    Пересчитывает статистику за последние window_days дней. Ресторанам и
+    диапазонам, у которых меньше min_samples заказов, статистика не пишется
+    (для них действуют значения по умолчанию). Возвращает (ресторанов, диапазонов).
+    """
+    window_days = window_days or settings.ETA_STATS_WINDOW_DAYS
+    min_samples = min_samples or settings.ETA_STATS_MIN_SAMPLES
+    preparation, travel = _collect_samples(timezone.now() - timedelta(days=window_days))
+
+    prep_rows = [
+        RestaurantPrepStats(
+            restaurant_id=restaurant_id, median_minutes=float(np.median(samples)),
+            p90_minutes=float(np.percentile(samples, 90)), sample_size=len(samples),
+        )
+        for restaurant_id, samples in preparation.items() if len(samples) >= min_samples
+    ]
+    speed_rows = []
+    for bucket, samples in travel.items():
+        if len(samples) < min_samples:
+            continue
+        speeds = [distance / (minutes / 60) for distance, minutes in samples]
+        speed_rows.append(TravelSpeedStats(
+            distance_from_km=bucket, speed_kmh=float(np.median(speeds)), sample_size=len(samples),
+        ))
+
+    with transaction.atomic():
+        RestaurantPrepStats.objects.all().delete()
+        RestaurantPrepStats.objects.bulk_create(prep_rows, batch_size=1000)
+        TravelSpeedStats.objects.all().delete()
+        TravelSpeedStats.objects.bulk_create(speed_rows)
+    reset_eta_table()
+    return len(prep_rows), len(speed_rows)
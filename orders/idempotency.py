@@ -0,0 +1,148 @@
+# orders/idempotency.py
+"""
+Поддержка заголовка Idempotency-Key для запросов, создающих заказы.
+
+Первый запрос с ключом "захватывает" его (отдельная короткая транзакция),
+выполняет работу и сохраняет ответ. Повтор с тем же ключом и тем же телом
+получает сохраненный ответ без повторного расчета и без обращения к PayLink.
+Просроченные ключи удаляет purge_expired_keys (команда purge_idempotency_keys).
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request) -> str:
+    """Отпечаток запроса: метод, путь и канонизированное тело."""
+    body = json.dumps(request.data, sort_keys=True, default=str, ensure_ascii=False)
+    raw = f"{request.method}:{request.path}:{body}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """
+    Пытается захватить ключ. Возвращает (запись, захвачен_ли_нами).
+    Просроченные записи и "зависшие" незавершенные запросы перехватываются заново.
+    Запись None — ключ то занимают, то освобождают, и захватить его не удалось.
+    """
+    for _ in range(3):
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=user, key=key, request_fingerprint=fingerprint), True
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            # Владелец ключа только что удалил запись после ошибки — пробуем захватить снова
+            continue
+        expired = record.created_at < now - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        abandoned = (
+            record.response_status is None
+            and record.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS)
+        )
+        if expired or abandoned:
+            # Условный UPDATE: перехватит ключ только один из конкурирующих запросов
+            taken = IdempotencyKey.objects.filter(
+                pk=record.pk, created_at=record.created_at
+            ).update(
+                created_at=now, request_fingerprint=fingerprint, response_status=None, response_body=None
+            )
+            if taken:
+                record.created_at, record.request_fingerprint = now, fingerprint
+                record.response_status = record.response_body = None
+                return record, True
+            record = IdempotencyKey.objects.filter(pk=record.pk).first()
+            if record is None:
+                continue
+        return record, False
+    return None, False
+
+
+def idempotent(view_method):
+    """
+    Декоратор для метода post() APIView. Захват ключа и сохранение ответа идут
+    вне транзакции заказа, поэтому декоратор не должен оборачиваться в atomic.
+    Запросы без заголовка Idempotency-Key выполняются как обычно.
+
+    Если у view есть метод idempotent_replay(request, body, status), повтор
+    строит ответ через него (например, чтобы отдать актуальный статус).
+    """
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"Заголовок {IDEMPOTENCY_HEADER} слишком длинный."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = _claim(request.user, key, fingerprint)
+
+        if not claimed:
+            if record is None:
+                return Response(
+                    {"error": "Запрос с этим Idempotency-Key еще выполняется."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if record.request_fingerprint != fingerprint:
+                return Response(
+                    {"error": "Этот Idempotency-Key уже использован для другого запроса."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.response_status is None:
+                return Response(
+                    {"error": "Запрос с этим Idempotency-Key еще выполняется."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            replay = getattr(view, 'idempotent_replay', None)
+            if replay is not None:
+                response = replay(request, record.response_body, record.response_status)
+            else:
+                response = Response(record.response_body, status=record.response_status)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = view_method(view, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if status.is_success(response.status_code):
+            record.response_status = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=['response_status', 'response_body'])
+        else:
+            # Ошибку не кэшируем: клиент может исправить запрос или повторить его
+            record.delete()
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(ttl_hours=None) -> int:
+    """
+    Удаляет ключи старше ttl_hours (по умолчанию IDEMPOTENCY_KEY_TTL_HOURS):
+    повтор с таким ключом все равно выполнился бы заново. Возвращает число удаленных строк.
+    """
+    ttl_hours = ttl_hours if ttl_hours is not None else settings.IDEMPOTENCY_KEY_TTL_HOURS
+    cutoff = timezone.now() - timedelta(hours=ttl_hours)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,52 @@
+# orders/management/commands/check_query_plans.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from orders.models import Order
+from orders.query_plans import Sample, explain_hot_queries, seed_orders, sequential_scans
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет EXPLAIN для горячих запросов к заказам на большом тестовом наборе данных "
+        "и завершается с ошибкой, если где-то есть полное сканирование таблицы заказов. "
+        "Тестовые данные создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50000, help="Сколько тестовых заказов создать.")
+        parser.add_argument('--no-seed', action='store_true',
+                            help="Не создавать данные, проверять на текущем содержимом базы.")
+        parser.add_argument('--verbose-plans', action='store_true', help="Печатать планы целиком.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['no_seed']:
+                order = (
+                    Order.objects.exclude(courier=None).exclude(user=None).exclude(restaurant=None)
+                    .only('user', 'courier', 'restaurant').first()
+                )
+                if order is None:
+                    raise CommandError(
+                        "В базе нет заказов с клиентом, курьером и рестораном — запустите без --no-seed."
+                    )
+                sample = Sample(user_id=order.user_id, courier_id=order.courier_id, restaurant_id=order.restaurant_id)
+            else:
+                sample = seed_orders(options['orders'])
+            plans = explain_hot_queries(sample)
+            transaction.set_rollback(True)
+
+        failed = []
+        for name, plan in plans.items():
+            scans = sequential_scans(plan)
+            if scans:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: полное сканирование — {'; '.join(scans)}"))
+            else:
+                self.stdout.write(f"{name}: OK")
+            if options['verbose_plans'] or scans:
+                self.stdout.write(plan)
+
+        if failed:
+            raise CommandError(f"Запросы без подходящего индекса: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f"Проверено запросов: {len(plans)}"))
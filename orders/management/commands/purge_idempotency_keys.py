@@ -0,0 +1,17 @@
+# orders/management/commands/purge_idempotency_keys.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Удаляет ключи идемпотентности старше срока их действия."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.IDEMPOTENCY_KEY_TTL_HOURS,
+                            help="Сколько последних часов хранить.")
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Удалено ключей: {deleted}"))
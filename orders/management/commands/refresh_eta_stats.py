@@ -0,0 +1,19 @@
+# orders/management/commands/refresh_eta_stats.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.eta import refresh_eta_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает статистику времени приготовления и скорости доставки для оценки ETA."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ETA_STATS_WINDOW_DAYS,
+                            help="За сколько последних дней брать заказы.")
+
+    def handle(self, *args, **options):
+        restaurants, buckets = refresh_eta_stats(window_days=options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Ресторанов со статистикой: {restaurants}, диапазонов расстояний: {buckets}"
+        ))
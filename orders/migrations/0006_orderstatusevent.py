@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('pending', 'В ожидании'), ('accepted', 'Принят'), ('preparing', 'Готовится'), ('ready_for_pickup', 'Готов к выдаче'), ('on_the_way', 'В пути'), ('delivered', 'Доставлен'), ('cancelled', 'Отменен')], default='', max_length=20)),
+                ('to_status', models.CharField(choices=[('pending', 'В ожидании'), ('accepted', 'Принят'), ('preparing', 'Готовится'), ('ready_for_pickup', 'Готов к выдаче'), ('on_the_way', 'В пути'), ('delivered', 'Доставлен'), ('cancelled', 'Отменен')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_status_events', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'Смена статуса заказа',
+                'verbose_name_plural': 'История статусов заказов',
+                'indexes': [models.Index(fields=['order', 'created_at'], name='order_status_event_order_idx'), models.Index(fields=['to_status', 'created_at'], name='order_status_event_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_updated_at'),
+        ('restaurants', '0006_restaurant_geo_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantPrepStats',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='prep_stats', serialize=False, to='restaurants.restaurant')),
+                ('median_minutes', models.FloatField(verbose_name='Медиана, мин')),
+                ('p90_minutes', models.FloatField(verbose_name='90-й перцентиль, мин')),
+                ('sample_size', models.PositiveIntegerField(verbose_name='Заказов в выборке')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Время приготовления ресторана',
+                'verbose_name_plural': 'Время приготовления ресторанов',
+            },
+        ),
+        migrations.CreateModel(
+            name='TravelSpeedStats',
+            fields=[
+                ('distance_from_km', models.PositiveSmallIntegerField(primary_key=True, serialize=False, verbose_name='Расстояние от, км')),
+                ('speed_kmh', models.FloatField(verbose_name='Медианная скорость, км/ч')),
+                ('sample_size', models.PositiveIntegerField(verbose_name='Заказов в выборке')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Скорость доставки',
+                'verbose_name_plural': 'Скорость доставки по расстояниям',
+                'ordering': ['distance_from_km'],
+            },
+        ),
+    ]
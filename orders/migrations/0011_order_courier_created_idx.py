@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_idempotency_created_idx'),
+        ('promos', '0004_promo_user_usage'),
+        ('restaurants', '0007_drop_hidden_search_documents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['courier', '-created_at'], name='order_courier_created_idx'),
+        ),
+    ]
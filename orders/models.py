@@ -32,8 +32,11 @@ class Order(models.Model):
     items_total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Сумма по товарам")
     delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Стоимость доставки")
     service_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Сервисный сбор")
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Скидка")
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0,
                                       verbose_name="Итоговая сумма к оплате")
+    promo_code = models.ForeignKey('promos.PromoCode', on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='orders', verbose_name="Промокод")
 
     # --- Поля для расчетов выплат ---
     platform_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Прибыль платформы")
@@ -44,6 +47,9 @@ class Order(models.Model):
     # --- Статус и оплата ---
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Время последнего изменения — курсор ленты изменений для ресторана (restaurants.board).
+    # UPDATE в обход save() (orders.state и т.п.) должны выставлять его явно.
+    updated_at = models.DateTimeField(auto_now=True)
     is_paid = models.BooleanField(default=False, verbose_name="Оплачен")
 
     # 👇 ПОЛЯ payment_method и authorization_id УДАЛЕНЫ
@@ -64,6 +70,22 @@ class Order(models.Model):
         ordering = ['-created_at']
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        # Индексы под "горячие" запросы (см. orders/query_plans.py и команду check_query_plans)
+        indexes = [
+            # История заказов клиента: user = X ORDER BY created_at DESC
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            # Текущий заказ и статистика курьера: courier = X AND status = Y [AND created_at в диапазоне]
+            models.Index(fields=['courier', 'status', 'created_at'], name='order_courier_status_idx'),
+            # История заказов курьера: courier = X ORDER BY created_at DESC (курсорная пагинация)
+            models.Index(fields=['courier', '-created_at'], name='order_courier_created_idx'),
+            # Лента свободных заказов и диспетчер: маленький частичный индекс только по ожидающим курьера
+            models.Index(fields=['created_at'], name='order_available_idx',
+                         condition=models.Q(status='ready_for_pickup', courier__isnull=True)),
+            # Занятые курьеры (заказ в пути) для диспетчера
+            models.Index(fields=['courier'], name='order_on_the_way_idx', condition=models.Q(status='on_the_way')),
+            # Лента изменений заказов ресторана: restaurant = X AND updated_at > курсор
+            models.Index(fields=['restaurant', 'updated_at'], name='order_restaurant_updated_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -77,4 +99,95 @@ class OrderItem(models.Model):
 
     class Meta:
         verbose_name = "Позиция в заказе"
-        verbose_name_plural = "Позиции в заказе"
\ No newline at end of file
+        verbose_name_plural = "Позиции в заказе"
+
+class IdempotencyKey(models.Model):
+    """
+    Ключ идемпотентности клиентского запроса (заголовок Idempotency-Key).
+    Хранит отпечаток запроса и закэшированный ответ, чтобы повтор запроса
+    (например, при плохой сети) вернул исходный результат, а не создал дубль заказа.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=64, verbose_name="Отпечаток запроса")
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
+
+    class Meta:
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+        indexes = [
+            # Для удаления просроченных ключей (purge_idempotency_keys)
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+
+class OrderStatusEvent(models.Model):
+    """
+    Журнал переходов статуса заказа (пишется orders.state.transition).
+    Индексы рассчитаны на выборки "история заказа" и "все переходы в статус X за период".
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_events')
+    # Прежний статус известен, если переход разрешен только из одного статуса
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, blank=True, default='')
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='order_status_events')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Заказ {self.order_id}: {self.from_status or '?'} → {self.to_status}"
+
+    class Meta:
+        verbose_name = "Смена статуса заказа"
+        verbose_name_plural = "История статусов заказов"
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='order_status_event_order_idx'),
+            models.Index(fields=['to_status', 'created_at'], name='order_status_event_status_idx'),
+        ]
+
+
+class RestaurantPrepStats(models.Model):
+    """
+    Время приготовления ресторана (от принятия заказа до готовности к выдаче)
+    по журналу статусов за последние дни. Пересчитывается командой refresh_eta_stats.
+    """
+    restaurant = models.OneToOneField('restaurants.Restaurant', on_delete=models.CASCADE, primary_key=True,
+                                      related_name='prep_stats')
+    median_minutes = models.FloatField(verbose_name="Медиана, мин")
+    p90_minutes = models.FloatField(verbose_name="90-й перцентиль, мин")
+    sample_size = models.PositiveIntegerField(verbose_name="Заказов в выборке")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.restaurant_id}: {self.median_minutes:.0f} мин"
+
+    class Meta:
+        verbose_name = "Время приготовления ресторана"
+        verbose_name_plural = "Время приготовления ресторанов"
+
+
+class TravelSpeedStats(models.Model):
+    """
+    Средняя скорость курьера (от взятия заказа до доставки) для диапазона
+    расстояний, начинающегося с distance_from_km. Пересчитывается командой refresh_eta_stats.
+    """
+    distance_from_km = models.PositiveSmallIntegerField(primary_key=True, verbose_name="Расстояние от, км")
+    speed_kmh = models.FloatField(verbose_name="Медианная скорость, км/ч")
+    sample_size = models.PositiveIntegerField(verbose_name="Заказов в выборке")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"от {self.distance_from_km} км: {self.speed_kmh:.1f} км/ч"
+
+    class Meta:
+        verbose_name = "Скорость доставки"
+        verbose_name_plural = "Скорость доставки по расстояниям"
+        ordering = ['distance_from_km']
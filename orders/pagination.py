@@ -0,0 +1,18 @@
+# orders/pagination.py
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class OrderHistoryPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация истории заказов по (-created_at, -id):
+    каждая страница — это WHERE created_at < курсор ... LIMIT N по индексу,
+    без OFFSET, поэтому стоимость не растет с длиной истории, а новые
+    заказы не сдвигают уже просмотренные страницы.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self):
+        self.page_size = settings.ORDER_HISTORY_PAGE_SIZE
@@ -9,7 +9,7 @@ class IsClientOwnerOfOrder(BasePermission):
     message = "У вас нет прав для просмотра или изменения этого заказа."
 
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
+        return obj.user_id == request.user.id
 
 
 class IsRestaurantOwnerOfOrder(BasePermission):
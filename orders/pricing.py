@@ -0,0 +1,196 @@
+# orders/pricing.py
+"""
+Движок расчета стоимости доставки.
+
+Тарифы ресторана один раз компилируются в отсортированный индекс временных
+интервалов (TariffIndex), а расстояния считаются векторно (core.geo.haversine_km).
+Благодаря этому один вызов может оценить доставку:
+  * одного ресторана до N адресов (quote_points),
+  * N ресторанов до одного адреса (quote_restaurants),
+и стоит это один запрос за тарифами и один проход по массиву.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+import numpy as np
+from django.utils import timezone
+
+from core.geo import haversine_km, to_float_array
+from restaurants.models import DeliveryTariff
+
+DEFAULT_DELIVERY_FEE = Decimal('500.00')  # Если у ресторана нет ни одного тарифа
+FEE_ROUNDING_STEP = 50  # Округляем стоимость до ближайших 50 KZT
+
+_DAY_US = 24 * 60 * 60 * 1_000_000
+
+
+def _time_to_us(value) -> int:
+    """Переводит datetime.time в микросекунды от начала суток."""
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+
+class DeliveryQuote(NamedTuple):
+    restaurant_id: Optional[int]
+    fee: Decimal
+    distance_km: Optional[float]
+
+
+class TariffIndex:
+    """
+    Скомпилированные тарифы одного ресторана.
+
+    Интервалы, пересекающие полночь (например, 22:00–06:00), разбиваются на два:
+    [22:00, 24:00) и [00:00, 06:00]. Пересекающиеся тарифы разрешаются так же,
+    как и раньше: выигрывает тариф с меньшим id. В итоге получаем набор
+    непересекающихся отрезков, по которым ищем бинарным поиском.
+    """
+    __slots__ = ('fallback', '_starts', '_segments')
+
+    def __init__(self, tariffs):
+        tariffs = sorted(tariffs, key=lambda t: t.id)
+        # Тариф "по умолчанию" — первый по id (как restaurant.tariffs.first())
+        self.fallback = tariffs[0] if tariffs else None
+
+        intervals = []  # (начало, конец, приоритет, тариф), конец не включается
+        for priority, tariff in enumerate(tariffs):
+            start = _time_to_us(tariff.start_time)
+            end = _time_to_us(tariff.end_time)
+            if start > end:
+                intervals.append((start, _DAY_US, priority, tariff))
+                # Конец ночного тарифа включительный: now <= end_time
+                intervals.append((0, end + 1, priority, tariff))
+            elif start < end:
+                intervals.append((start, end, priority, tariff))
+
+        bounds = sorted({b for start, end, _, _ in intervals for b in (start, end)})
+        starts, segments = [], []
+        for left, right in zip(bounds, bounds[1:]):
+            covering = [i for i in intervals if i[0] <= left and right <= i[1]]
+            tariff = min(covering, key=lambda i: i[2])[3] if covering else None
+            if segments and segments[-1] is tariff:
+                continue  # Склеиваем соседние отрезки с одинаковым тарифом
+            starts.append(left)
+            segments.append(tariff)
+        if starts:
+            starts.append(bounds[-1])
+            segments.append(None)
+
+        self._starts = starts
+        self._segments = segments
+
+    def active_tariff(self, at=None):
+        """Тариф, действующий в момент `at` (datetime.time); иначе — тариф по умолчанию."""
+        if at is None:
+            at = timezone.now().time()
+        position = bisect_right(self._starts, _time_to_us(at)) - 1
+        tariff = self._segments[position] if position >= 0 else None
+        return tariff or self.fallback
+
+
+def get_tariff_index(restaurant) -> TariffIndex:
+    """
+    Возвращает индекс тарифов ресторана, кэшируя его на самом объекте.
+    Если тарифы были подгружены через prefetch_related('tariffs'), запроса не будет.
+    """
+    index = getattr(restaurant, '_tariff_index', None)
+    if index is None:
+        index = TariffIndex(restaurant.tariffs.all())
+        restaurant._tariff_index = index
+    return index
+
+
+def load_tariff_indexes(restaurants) -> None:
+    """
+    Компилирует индексы тарифов для пачки ресторанов одним запросом
+    (для тех, у кого индекса еще нет и тарифы не подгружены заранее).
+    """
+    pending = [
+        r for r in restaurants
+        if getattr(r, '_tariff_index', None) is None
+        and 'tariffs' not in getattr(r, '_prefetched_objects_cache', {})
+    ]
+    if not pending:
+        return
+    grouped = {r.id: [] for r in pending}
+    for tariff in DeliveryTariff.objects.filter(restaurant_id__in=grouped):
+        grouped[tariff.restaurant_id].append(tariff)
+    for restaurant in pending:
+        restaurant._tariff_index = TariffIndex(grouped[restaurant.id])
+
+
+def _price(indexes, distances, at):
+    """
+    Векторный расчет стоимости для пар (индекс тарифов, расстояние).
+    Для пар без координат (NaN) берется базовая стоимость тарифа по умолчанию.
+    """
+    tariffs = [index.active_tariff(at) for index in indexes]
+    fallback_fees = [
+        index.fallback.base_fee if index.fallback else DEFAULT_DELIVERY_FEE for index in indexes
+    ]
+    base = np.array([float(t.base_fee or 0) if t else np.nan for t in tariffs])
+    per_km = np.array([float(t.fee_per_km or 0) if t else np.nan for t in tariffs])
+
+    with np.errstate(invalid='ignore'):
+        fees = np.round((base + distances * per_km) / FEE_ROUNDING_STEP) * FEE_ROUNDING_STEP
+
+    result = []
+    for fee, distance, fallback_fee in zip(fees, distances, fallback_fees):
+        distance = None if np.isnan(distance) else float(distance)
+        result.append((fallback_fee if np.isnan(fee) else Decimal(int(fee)), distance))
+    return result
+
+
+def quote_restaurants(restaurants, latitude, longitude, at=None) -> list:
+    """
+    Стоимость доставки из каждого ресторана в одну точку (N ресторанов × 1 адрес).
+    Возвращает список DeliveryQuote в порядке входных ресторанов.
+    """
+    restaurants = list(restaurants)
+    if not restaurants:
+        return []
+    if at is None:
+        at = timezone.now().time()
+    load_tariff_indexes(restaurants)
+
+    distances = haversine_km(
+        to_float_array([r.latitude for r in restaurants]),
+        to_float_array([r.longitude for r in restaurants]),
+        to_float_array(latitude)[0],
+        to_float_array(longitude)[0],
+    )
+    priced = _price([get_tariff_index(r) for r in restaurants], distances, at)
+    return [
+        DeliveryQuote(restaurant.id, fee, distance)
+        for restaurant, (fee, distance) in zip(restaurants, priced)
+    ]
+
+
+def quote_points(restaurant, points, at=None) -> list:
+    """
+    Стоимость доставки из одного ресторана в N точек (1 ресторан × N адресов).
+    `points` — объекты с полями latitude/longitude (например, Address) или пары (lat, lon).
+    """
+    points = list(points)
+    if not points:
+        return []
+    if at is None:
+        at = timezone.now().time()
+
+    coords = [
+        (p.latitude, p.longitude) if hasattr(p, 'latitude') else tuple(p) for p in points
+    ]
+    distances = haversine_km(
+        to_float_array(restaurant.latitude)[0],
+        to_float_array(restaurant.longitude)[0],
+        to_float_array([lat for lat, _ in coords]),
+        to_float_array([lon for _, lon in coords]),
+    )
+    index = get_tariff_index(restaurant)
+    priced = _price([index] * len(points), distances, at)
+    return [DeliveryQuote(restaurant.id, fee, distance) for fee, distance in priced]
+
+
+def calculate_delivery_fee(restaurant, address, at=None) -> Decimal:
+    """Стоимость доставки из ресторана по одному адресу."""
+    return quote_points(restaurant, [address], at=at)[0].fee
@@ -0,0 +1,168 @@
+# orders/query_plans.py
+"""
+Реестр "горячих" запросов к заказам и проверка их планов выполнения.
+
+Каждый запрос регистрируется декоратором @hot_query и строится по образцу
+реальных запросов из views (история клиента и курьера, лента курьера, доска
+ресторана, статистика и т.д.).
+Команда check_query_plans наполняет базу большим тестовым набором заказов,
+выполняет EXPLAIN для каждого запроса и падает, если где-то появилось
+полное сканирование таблицы заказов.
+"""
+import random
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import User
+from restaurants.board import ACTIVE_STATUSES
+from restaurants.models import Restaurant
+from .models import Order
+
+HOT_QUERIES = {}
+
+
+def hot_query(name):
+    def decorator(func):
+        HOT_QUERIES[name] = func
+        return func
+    return decorator
+
+
+@dataclass
+class Sample:
+    """Параметры, подставляемые в запросы (существующие клиент, курьер и ресторан)."""
+    user_id: int
+    courier_id: int
+    restaurant_id: int
+
+
+def history_cursor():
+    """Позиция курсора OrderHistoryPagination где-то в середине истории."""
+    return timezone.now() - timedelta(days=45)
+
+
+@hot_query('client_order_history')
+def client_order_history(sample):
+    return Order.objects.filter(user_id=sample.user_id).order_by('-created_at')[:20]
+
+
+@hot_query('client_order_history_page')
+def client_order_history_page(sample):
+    # Следующая страница курсорной пагинации (orders.pagination.OrderHistoryPagination)
+    return Order.objects.filter(user_id=sample.user_id, created_at__lt=history_cursor()).order_by(
+        '-created_at', '-id'
+    )[:20]
+
+
+@hot_query('courier_order_history')
+def courier_order_history(sample):
+    return Order.objects.filter(courier_id=sample.courier_id).order_by('-created_at', '-id')[:20]
+
+
+@hot_query('courier_order_history_page')
+def courier_order_history_page(sample):
+    return Order.objects.filter(courier_id=sample.courier_id, created_at__lt=history_cursor()).order_by(
+        '-created_at', '-id'
+    )[:20]
+
+
+@hot_query('restaurant_board')
+def restaurant_board(sample):
+    # Первая загрузка доски (restaurants.board.board_feed без курсора)
+    return Order.objects.filter(restaurant_id=sample.restaurant_id, status__in=ACTIVE_STATUSES).order_by(
+        'updated_at', 'id'
+    )[:51]
+
+
+@hot_query('restaurant_board_changes')
+def restaurant_board_changes(sample):
+    # Лента изменений после курсора (updated_at, id)
+    since = timezone.now() - timedelta(minutes=5)
+    return Order.objects.filter(
+        Q(updated_at__gt=since) | Q(updated_at=since, id__gt=0), restaurant_id=sample.restaurant_id,
+    ).order_by('updated_at', 'id')[:51]
+
+
+@hot_query('available_orders')
+def available_orders(sample):
+    return Order.objects.filter(status='ready_for_pickup', courier__isnull=True).order_by('created_at')[:50]
+
+
+@hot_query('courier_current_order')
+def courier_current_order(sample):
+    return Order.objects.filter(courier_id=sample.courier_id, status='on_the_way')
+
+
+@hot_query('courier_stats_today')
+def courier_stats_today(sample):
+    day_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return Order.objects.filter(
+        courier_id=sample.courier_id, status='delivered',
+        created_at__gte=day_start, created_at__lt=day_start + timedelta(days=1),
+    ).values('delivery_fee')
+
+
+@hot_query('busy_couriers')
+def busy_couriers(sample):
+    return Order.objects.filter(status='on_the_way').values('courier_id')
+
+
+def sequential_scans(plan, table=Order._meta.db_table):
+    """Строки плана с полным сканированием таблицы (PostgreSQL и SQLite)."""
+    patterns = [
+        rf'Seq Scan on "?{table}"?\b',          # PostgreSQL
+        rf'\bSCAN "?{table}"?(?! USING)\b',     # SQLite: SCAN без USING INDEX
+    ]
+    return [line.strip() for line in plan.splitlines() if any(re.search(p, line) for p in patterns)]
+
+
+def seed_orders(count, users=200, couriers=50, restaurants=50, seed=0):
+    """
+    Создает count заказов, распределенных по клиентам, курьерам, ресторанам и последним 90 дням;
+    почти все доставлены, как в реальной базе. Возвращает Sample для запросов.
+    """
+    rnd = random.Random(seed)
+    prefix = f'plan{rnd.randrange(10 ** 6):06d}'
+    clients = User.objects.bulk_create(
+        [User(phone=f'+{prefix}c{i}', role='client') for i in range(users)]
+    )
+    riders = User.objects.bulk_create(
+        [User(phone=f'+{prefix}r{i}', role='courier') for i in range(couriers)]
+    )
+    owner = User.objects.create(phone=f'+{prefix}o', role='restaurant')
+    places = Restaurant.objects.bulk_create(
+        [Restaurant(owner=owner, name=f'{prefix} {i}', description='', address='') for i in range(restaurants)]
+    )
+
+    statuses = ['delivered'] * 90 + ['cancelled'] * 4 + ['pending', 'accepted', 'preparing', 'ready_for_pickup',
+                                                           'on_the_way', 'ready_for_pickup']
+    now = timezone.now()
+    orders = []
+    for i in range(count):
+        status = rnd.choice(statuses)
+        has_courier = status in ('on_the_way', 'delivered')
+        orders.append(Order(
+            code=f'{prefix}-{i}', user=rnd.choice(clients), restaurant=rnd.choice(places), status=status,
+            courier=rnd.choice(riders) if has_courier else None,
+        ))
+    Order.objects.bulk_create(orders, batch_size=1000)
+
+    # created_at заполняется auto_now_add, поэтому "старим" заказы отдельным шагом
+    created = list(Order.objects.filter(code__startswith=f'{prefix}-').only('id'))
+    for order in created:
+        order.created_at = now - timedelta(minutes=rnd.randrange(90 * 24 * 60))
+    Order.objects.bulk_update(created, ['created_at'], batch_size=1000)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return Sample(user_id=clients[0].pk, courier_id=riders[0].pk, restaurant_id=places[0].pk)
+
+
+def explain_hot_queries(sample):
+    """Возвращает {имя запроса: план} для всех зарегистрированных запросов."""
+    return {name: build(sample).explain() for name, build in HOT_QUERIES.items()}
@@ -1,13 +1,14 @@
 # orders/serializers.py
 
+from django.conf import settings
 from django.db import transaction
 from rest_framework import serializers
 from .models import Order, OrderItem
-from menu.models import Dish
 from core.models import Address
 from restaurants.serializers import RestaurantSerializer
 from menu.serializers import DishSerializer
-from .services import calculate_delivery_fee
+from .services import resolve_cart, price_cart
+from promos import engine as promo_engine
 
 class OrderItemSerializer(serializers.ModelSerializer):
     """Сериализатор для чтения ОДНОГО товара в заказе."""
@@ -30,109 +31,82 @@ class CreateOrderSerializer(serializers.Serializer):
     promo_code = serializers.CharField(required=False, allow_blank=True, write_only=True)
 
     def validate_items(self, items):
-        if not items:
-            raise serializers.ValidationError("Корзина не может быть пустой.")
-        
-        # Проверяем, что все товары из одного ресторана
-        restaurant_id = None
-        for item_data in items:
-            dish_id = item_data.get('dish_id')
-            if not dish_id:
-                raise serializers.ValidationError("Каждый товар должен содержать 'dish_id'.")
-            
-            dish = Dish.objects.filter(id=dish_id).first()
-            if not dish:
-                raise serializers.ValidationError(f"Блюдо с ID {dish_id} не найдено.")
-            
-            if restaurant_id is None:
-                restaurant_id = dish.restaurant.id
-            elif restaurant_id != dish.restaurant.id:
-                raise serializers.ValidationError("Все товары в заказе должны быть из одного ресторана.")
+        # Разбираем корзину один раз: блюда, ресторан и тарифы одним запросом.
+        # Результат используют и create(), и CalculateOrderCostView.
+        self.cart = resolve_cart(items)
         return items
 
+    def get_address(self, address_id):
+        user = self.context['request'].user
+        try:
+            return Address.objects.get(id=address_id, user=user)
+        except Address.DoesNotExist:
+            raise serializers.ValidationError("Указанный адрес не найден или не принадлежит вам.")
+
     def create(self, validated_data):
         """
-        Этот метод создает заказ и рассчитывает все стоимости, вызывая сервис доставки.
+        Создает заказ со всеми расчетами. Блюда, ресторан и тарифы уже загружены
+        в validate_items, поэтому число запросов не зависит от размера корзины.
         """
-        items_data = validated_data.pop('items')
-        address_id = validated_data.pop('address_id')
+        validated_data.pop('items')
+        address = self.get_address(validated_data.pop('address_id'))
         promo_code_str = validated_data.pop('promo_code', None)
         user = self.context['request'].user
 
-        try:
-            address = Address.objects.get(id=address_id, user=user)
-        except Address.DoesNotExist:
-            raise serializers.ValidationError("Указанный адрес не найден или не принадлежит вам.")
-
-        first_dish_id = items_data[0]['dish_id']
-        restaurant = Dish.objects.get(id=first_dish_id).restaurant
+        totals = price_cart(self.cart, address, promo_code_str, user)
 
         with transaction.atomic():
-            # Создаем сам заказ
             order = Order.objects.create(
                 user=user,
-                restaurant=restaurant,
+                restaurant=self.cart.restaurant,
                 address_text=f"{address.city}, {address.street}, {address.house_number}",
                 delivery_lat=address.latitude,
                 delivery_lon=address.longitude,
+                items_total_price=totals.items_total_price,
+                delivery_fee=totals.delivery_fee,
+                service_fee=totals.service_fee,
+                discount_amount=totals.discount,
+                promo_code_id=totals.promo_code.id if totals.promo_code else None,
+                total_price=totals.total_price,
+                platform_fee=totals.platform_fee,
+                restaurant_payout=totals.restaurant_payout,
+                courier_payout=totals.courier_payout,
                 **validated_data
             )
+            OrderItem.objects.bulk_create(self.cart.build_order_items(order))
+            if totals.promo_code is not None:
+                # Последним шагом: условный UPDATE счетчика держит строку промокода до коммита
+                promo_engine.redeem(totals.promo_code, user, order, totals.discount)
 
-            # Создаем позиции заказа и считаем итоговую сумму товаров
-            items_total_price = Decimal(0)
-            order_items_to_create = []
-            for item_data in items_data:
-                dish = Dish.objects.get(id=item_data['dish_id'])
-                price = dish.price
-                quantity = item_data['quantity']
-                items_total_price += price * quantity
-                order_items_to_create.append(
-                    OrderItem(order=order, dish=dish, quantity=quantity, price_at_time_of_order=price)
-                )
-            
-            OrderItem.objects.bulk_create(order_items_to_create)
-
-            # --- ЛОГИКА РАСЧЕТОВ ---
-            discount = Decimal(0)
-            if promo_code_str:
-                try:
-                    promo = PromoCode.objects.get(code__iexact=promo_code_str)
-                    if promo.is_valid():
-                        discount = promo.calculate_discount(items_total_price) 
-                        order.promo_code = promo
-                except PromoCode.DoesNotExist:
-                    pass
-            
-            # 👇 2. ВЫЗЫВАЕМ СЕРВИС ДЛЯ РЕАЛЬНОГО РАСЧЕТА ДОСТАВКИ
-            delivery_fee = calculate_delivery_fee(restaurant, address)
-            
-            # 👇 3. РАСЧЕТ СЕРВИСНОГО СБОРА (из вашей логики)
-            service_fee = max(
-                Decimal(settings.MIN_CLIENT_SERVICE_FEE),
-                min(
-                    items_total_price * (Decimal(settings.CLIENT_SERVICE_FEE_PERCENT) / 100),
-                    Decimal(settings.MAX_CLIENT_SERVICE_FEE)
-                )
-            )
+        return order
+
+class DeliveryQuoteRequestSerializer(serializers.Serializer):
+    """
+    Запрос пакетной оценки доставки: одна точка (address_id или latitude/longitude)
+    и набор ресторанов (restaurant_ids или category_id).
+    """
+    address_id = serializers.IntegerField(required=False)
+    latitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False)
+    longitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False)
+    restaurant_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    category_id = serializers.IntegerField(required=False)
 
-            # 👇 4. РАСЧЕТ ВЫПЛАТ И КОМИССИЙ (из вашей логики)
-            platform_commission = items_total_price * (Decimal(settings.RESTAURANT_COMMISSION_PERCENT) / 100)
-            
-            # Рассчитываем финальную стоимость
-            total_price = items_total_price + delivery_fee + service_fee - discount
-
-            # Сохраняем все рассчитанные значения в заказ
-            order.items_total_price = items_total_price
-            order.delivery_fee = delivery_fee
-            order.service_fee = service_fee
-            order.discount_amount = discount
-            order.total_price = total_price
-            order.platform_fee = platform_commission + service_fee
-            order.restaurant_payout = items_total_price - platform_commission
-            order.courier_payout = delivery_fee
-            order.save()
+    def validate_restaurant_ids(self, value):
+        limit = settings.DELIVERY_QUOTE_MAX_RESTAURANTS
+        if len(value) > limit:
+            raise serializers.ValidationError(f"Можно запросить не более {limit} ресторанов за раз.")
+        return list(dict.fromkeys(value))
+
+    def validate(self, data):
+        has_coords = data.get('latitude') is not None and data.get('longitude') is not None
+        if data.get('address_id') is None and not has_coords:
+            raise serializers.ValidationError("Укажите address_id или latitude и longitude.")
+        if not data.get('restaurant_ids') and data.get('category_id') is None:
+            raise serializers.ValidationError("Укажите restaurant_ids или category_id.")
+        return data
 
-        return order
 
 class OrderSerializer(serializers.ModelSerializer):
     """Полный сериализатор для отображения информации о заказе."""
@@ -150,6 +124,24 @@ class OrderSerializer(serializers.ModelSerializer):
             'is_paid', 'restaurant', 'items', 'user'
         ]
 
+class OrderListSerializer(serializers.ModelSerializer):
+    """
+    Краткая карточка заказа для списка (истории): без вложенных ресторана и блюд.
+    Полные данные — в OrderDetailSerializer. items_count аннотируется во view.
+    """
+    restaurant_id = serializers.IntegerField(read_only=True)
+    restaurant_name = serializers.CharField(source='restaurant.name', default=None, read_only=True)
+    restaurant_logo = serializers.ImageField(source='restaurant.logo', default=None, read_only=True)
+    items_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'code', 'status', 'created_at', 'total_price', 'is_paid',
+            'restaurant_id', 'restaurant_name', 'restaurant_logo', 'items_count',
+        ]
+
+
 class OrderDetailSerializer(OrderSerializer):
     """Детальный сериализатор, наследует все от OrderSerializer."""
 
@@ -0,0 +1,125 @@
+# orders/state.py
+"""
+Машина состояний заказа.
+
+Все смены статуса идут через transition(): один условный
+UPDATE ... WHERE id = %s AND status IN (<разрешенные исходные статусы>),
+который сам сообщает, выиграл ли он гонку (обновлена ли строка). Чтение
+заказа перед записью не нужно. Примененный переход пишется в журнал
+OrderStatusEvent и рассылается сигналом order_status_changed.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Order, OrderStatusEvent
+
+# Из какого статуса в какие можно перейти
+TRANSITIONS = {
+    'pending': {'accepted', 'cancelled'},
+    'accepted': {'preparing', 'cancelled'},
+    'preparing': {'ready_for_pickup', 'cancelled'},
+    'ready_for_pickup': {'on_the_way', 'cancelled'},
+    'on_the_way': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+# Обратная таблица: в какой статус из каких можно попасть
+SOURCES = {
+    status: {source for source, targets in TRANSITIONS.items() if status in targets}
+    for status, _ in Order.STATUS_CHOICES
+}
+
+FINAL_STATUSES = frozenset(status for status, targets in TRANSITIONS.items() if not targets)
+
+# Отправляется после примененного перехода (внутри транзакции перехода).
+# Аргументы: order_id, from_status ('' если неизвестен), to_status, fields, actor,
+# courier_id (курьер заказа после перехода или COURIER_UNKNOWN).
+order_status_changed = Signal()
+
+# courier_id перехода, который не назначал и не проверял курьера: без лишнего
+# SELECT в транзакции перехода его не узнать, получатель читает его сам
+COURIER_UNKNOWN = 'unknown'
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def _courier_id(fields, filters):
+    for values in (fields, filters):
+        for name in ('courier', 'courier_id'):
+            if name in values:
+                return getattr(values[name], 'pk', values[name])
+    return COURIER_UNKNOWN
+
+
+def _allowed_sources(to_status, from_statuses):
+    if to_status not in SOURCES:
+        raise InvalidTransition(f"Неизвестный статус заказа: {to_status}")
+    sources = SOURCES[to_status]
+    if from_statuses is not None:
+        unknown = set(from_statuses) - sources
+        if unknown:
+            raise InvalidTransition(f"Переход {', '.join(sorted(unknown))} → {to_status} запрещен")
+        sources = set(from_statuses)
+    return sources
+
+
+def transition(order_id, to_status, *, from_statuses=None, actor=None, fields=None, **filters) -> bool:
+    """
+    Переводит заказ в статус to_status, если он сейчас в одном из разрешенных
+    статусов (пересечение таблицы переходов и from_statuses) и подходит под
+    дополнительные условия filters (например, courier=...). Вместе со статусом
+    атомарно записываются fields. Возвращает True, если переход применен.
+    """
+    sources = _allowed_sources(to_status, from_statuses)
+    fields = fields or {}
+
+    with transaction.atomic():
+        updated = Order.objects.filter(id=order_id, status__in=sources, **filters).update(
+            status=to_status, updated_at=timezone.now(), **fields
+        )
+        if not updated:
+            return False
+        from_status = next(iter(sources)) if len(sources) == 1 else ''
+        OrderStatusEvent.objects.create(
+            order_id=order_id, from_status=from_status, to_status=to_status, actor=actor
+        )
+        order_status_changed.send(
+            sender=Order, order_id=order_id, from_status=from_status, to_status=to_status,
+            fields=fields, actor=actor, courier_id=_courier_id(fields, filters),
+        )
+    return True
+
+
+def transition_many(order_ids, to_status, *, from_statuses=None, actor=None, **filters) -> list:
+    """
+    Пакетный переход: блокирует подходящие заказы (SELECT ... FOR UPDATE),
+    переводит их одним UPDATE и пишет журнал одним INSERT. Заказы, которые
+    нельзя перевести (другой статус, чужие), пропускаются.
+    Возвращает id примененных переходов.
+    """
+    sources = _allowed_sources(to_status, from_statuses)
+
+    with transaction.atomic():
+        rows = list(
+            Order.objects.select_for_update()
+            .filter(id__in=order_ids, status__in=sources, **filters)
+            .order_by('id').values_list('id', 'status', 'courier_id')
+        )
+        if not rows:
+            return []
+        ids = [order_id for order_id, _, _ in rows]
+        Order.objects.filter(id__in=ids).update(status=to_status, updated_at=timezone.now())
+        OrderStatusEvent.objects.bulk_create([
+            OrderStatusEvent(order_id=order_id, from_status=status, to_status=to_status, actor=actor)
+            for order_id, status, _ in rows
+        ])
+        for order_id, status, courier_id in rows:
+            order_status_changed.send(
+                sender=Order, order_id=order_id, from_status=status, to_status=to_status, fields={}, actor=actor,
+                courier_id=courier_id,
+            )
+    return ids
@@ -1,3 +1,521 @@
-from django.test import TestCase
+import math
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import User, Address
+from payments.models import PaymentLinkOutbox
+from menu.models import MenuCategory, Dish
+from restaurants.models import Restaurant, DeliveryTariff
+from .models import IdempotencyKey, Order, OrderStatusEvent, RestaurantPrepStats, TravelSpeedStats
+from .serializers import CreateOrderSerializer
+from . import eta, idempotency, pricing
+from .query_plans import sequential_scans
+from .state import InvalidTransition, transition
+
+
+class OrderTestData:
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.user = User.objects.create_user(phone='+77000000002', password='pass')
+        category = MenuCategory.objects.create(name='Пицца', image='categories/pizza.png')
+        cls.restaurant = Restaurant.objects.create(
+            owner=owner, name='Ресторан', description='', address='Алматы',
+            latitude=Decimal('43.238949'), longitude=Decimal('76.889709'), is_approved=True,
+        )
+        DeliveryTariff.objects.create(
+            restaurant=cls.restaurant, name='Круглосуточно', start_time=time(0, 0), end_time=time(23, 59),
+            base_fee=Decimal('300.00'), fee_per_km=Decimal('100.00'),
+        )
+        cls.dishes = [
+            Dish.objects.create(restaurant=cls.restaurant, category=category, name=f'Блюдо {i}', price=Decimal('1000.00'))
+            for i in range(10)
+        ]
+        cls.address = Address.objects.create(
+            user=cls.user, city='Алматы', street='Абая', house_number='1',
+            latitude=Decimal('43.250000'), longitude=Decimal('76.950000'),
+        )
+
+    def cart(self, size):
+        return {
+            'items': [{'dish_id': dish.id, 'quantity': 2} for dish in self.dishes[:size]],
+            'address_id': self.address.id,
+        }
+
+
+class CartPricingQueryCountTests(OrderTestData, TestCase):
+    """
+    Число запросов при расчете и создании заказа не должно зависеть от размера корзины.
+    """
+
+    def test_calculate_cost_query_count_is_constant(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        def calculate(size):
+            response = client.post('/api/orders/calculate-cost/', self.cart(size), format='json')
+            self.assertEqual(response.status_code, 200)
+            return response
+
+        # Блюда с рестораном, тарифы, адрес
+        for size in (1, 10):
+            with self.assertNumQueries(3):
+                response = calculate(size)
+        self.assertEqual(response.json()['items_total_price'], '20000.00')
+
+    def test_create_order_query_count_is_constant(self):
+        request = APIRequestFactory().post('/api/orders/create/')
+        request.user = self.user
+
+        def create(size):
+            serializer = CreateOrderSerializer(data=self.cart(size), context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            return serializer.save()
+
+        # Блюда с рестораном, тарифы, адрес, SAVEPOINT, заказ, позиции, RELEASE
+        for size in (1, 10):
+            with self.assertNumQueries(7):
+                order = create(size)
+
+        self.assertEqual(order.items.count(), 10)
+        self.assertEqual(order.items_total_price, Decimal('20000.00'))
+
+    def test_dishes_from_different_restaurants_are_rejected(self):
+        other = Restaurant.objects.create(owner=self.restaurant.owner, name='Другой', description='', address='Алматы')
+        foreign_dish = Dish.objects.create(
+            restaurant=other, category=self.dishes[0].category, name='Чужое', price=Decimal('500.00')
+        )
+        data = self.cart(1)
+        data['items'].append({'dish_id': foreign_dish.id, 'quantity': 1})
+
+        request = APIRequestFactory().post('/api/orders/create/')
+        request.user = self.user
+        serializer = CreateOrderSerializer(data=data, context={'request': request})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('items', serializer.errors)
+
+
+def legacy_distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, map(float, (lat1, lon1, lat2, lon2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(a))
+
+
+def legacy_delivery_fee(restaurant, address, now):
+    """Прежний расчет по одному ресторану (до orders.pricing) — эталон для тестов."""
+    tariffs = sorted(restaurant.tariffs.all(), key=lambda t: t.id)
+    if not all([restaurant.latitude, restaurant.longitude, address.latitude, address.longitude]):
+        return tariffs[0].base_fee if tariffs else Decimal('500.00')
+    active = None
+    for tariff in tariffs:
+        if tariff.start_time > tariff.end_time:
+            if now >= tariff.start_time or now <= tariff.end_time:
+                active = tariff
+                break
+        elif tariff.start_time <= now < tariff.end_time:
+            active = tariff
+            break
+    active = active or (tariffs[0] if tariffs else None)
+    if active is None:
+        return Decimal('500.00')
+    distance = legacy_distance_km(restaurant.latitude, restaurant.longitude, address.latitude, address.longitude)
+    return Decimal(round((float(active.base_fee) + distance * float(active.fee_per_km)) / 50) * 50)
+
+
+class DeliveryPricingTests(OrderTestData, TestCase):
+    """orders.pricing должен давать те же суммы, что прежний расчет по одному ресторану."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        owner = cls.restaurant.owner
+
+        def restaurant(name, lat='43.200000', lon='76.850000', tariffs=()):
+            obj = Restaurant.objects.create(
+                owner=owner, name=name, description='', address='Алматы',
+                latitude=Decimal(lat) if lat else None, longitude=Decimal(lon) if lon else None,
+            )
+            for start, end, base, per_km in tariffs:
+                DeliveryTariff.objects.create(
+                    restaurant=obj, name=f'{start}-{end}', start_time=start, end_time=end,
+                    base_fee=Decimal(base), fee_per_km=Decimal(per_km),
+                )
+            return obj
+
+        cls.night = restaurant('Ночной', tariffs=[
+            (time(22, 0), time(6, 0), '900.00', '150.00'),
+            (time(6, 0), time(22, 0), '300.00', '100.00'),
+        ])
+        # Пересекающиеся тарифы: выигрывает меньший id (созданный первым)
+        cls.overlap = restaurant('Пересечение', lat='43.300000', lon='76.900000', tariffs=[
+            (time(12, 0), time(14, 0), '700.00', '120.00'),
+            (time(10, 0), time(20, 0), '200.00', '80.00'),
+        ])
+        cls.gap = restaurant('С перерывом', lat='43.260000', lon='76.990000', tariffs=[
+            (time(9, 0), time(12, 0), '400.00', '90.00'),
+            (time(15, 0), time(18, 0), '600.00', '110.00'),
+        ])
+        cls.no_tariff = restaurant('Без тарифов')
+        cls.no_coords = restaurant('Без координат', lat=None, lon=None, tariffs=[
+            (time(0, 0), time(23, 59), '350.00', '100.00'),
+        ])
+        cls.moments = [
+            time(0, 0), time(3, 0), time(5, 59, 59), time(6, 0), time(9, 30), time(11, 0), time(12, 0),
+            time(13, 0), time(14, 0), time(16, 0), time(19, 59), time(21, 59, 59), time(22, 0), time(23, 30),
+        ]
+
+    def restaurants(self):
+        return [self.night, self.overlap, self.gap, self.no_tariff, self.no_coords, self.restaurant]
+
+    def test_tariff_index_matches_legacy_selection(self):
+        for restaurant in self.restaurants():
+            for moment in self.moments:
+                with self.subTest(restaurant=restaurant.name, at=moment):
+                    self.assertEqual(
+                        pricing.calculate_delivery_fee(restaurant, self.address, at=moment),
+                        legacy_delivery_fee(restaurant, self.address, moment),
+                    )
+
+    def test_midnight_and_overlap_resolution(self):
+        index = pricing.TariffIndex(self.night.tariffs.all())
+        self.assertEqual(index.active_tariff(time(23, 30)).base_fee, Decimal('900.00'))
+        self.assertEqual(index.active_tariff(time(3, 0)).base_fee, Decimal('900.00'))
+        self.assertEqual(index.active_tariff(time(12, 0)).base_fee, Decimal('300.00'))
+
+        index = pricing.TariffIndex(self.overlap.tariffs.all())
+        self.assertEqual(index.active_tariff(time(13, 0)).base_fee, Decimal('700.00'))
+        self.assertEqual(index.active_tariff(time(11, 0)).base_fee, Decimal('200.00'))
+        # Вне всех интервалов — тариф по умолчанию (первый по id)
+        self.assertEqual(index.active_tariff(time(21, 0)).base_fee, Decimal('700.00'))
+
+        self.assertIsNone(pricing.TariffIndex([]).active_tariff(time(12, 0)))
+
+    def test_quote_restaurants_matches_per_restaurant_calculation(self):
+        restaurants = self.restaurants()
+        for moment in self.moments:
+            quotes = pricing.quote_restaurants(
+                restaurants, self.address.latitude, self.address.longitude, at=moment
+            )
+            self.assertEqual([quote.restaurant_id for quote in quotes], [r.id for r in restaurants])
+            for restaurant, quote in zip(restaurants, quotes):
+                with self.subTest(restaurant=restaurant.name, at=moment):
+                    self.assertEqual(quote.fee, legacy_delivery_fee(restaurant, self.address, moment))
+
+        quotes = {quote.restaurant_id: quote for quote in pricing.quote_restaurants(
+            restaurants, self.address.latitude, self.address.longitude, at=time(12, 0)
+        )}
+        self.assertEqual(quotes[self.no_tariff.id].fee, Decimal('500.00'))
+        self.assertIsNone(quotes[self.no_coords.id].distance_km)
+        for restaurant in (self.night, self.overlap, self.gap):
+            self.assertAlmostEqual(
+                quotes[restaurant.id].distance_km,
+                legacy_distance_km(restaurant.latitude, restaurant.longitude,
+                                   self.address.latitude, self.address.longitude),
+                places=6,
+            )
+
+
+class DeliveryQuoteViewTests(OrderTestData, TestCase):
+    url = '/api/orders/delivery-quotes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.category = cls.dishes[0].category
+        owner = cls.restaurant.owner
+        cls.restaurant.categories.add(cls.category)
+        cls.others = []
+        for i, flags in enumerate([{}, {}, {'is_approved': False}, {'is_active': False}, {}]):
+            restaurant = Restaurant.objects.create(
+                owner=owner, name=f'Ресторан {i}', description='', address='Алматы',
+                latitude=Decimal('43.240000'), longitude=Decimal('76.900000'),
+                **{'is_approved': True, **flags},
+            )
+            restaurant.categories.add(cls.category)
+            cls.others.append(restaurant)
+        cls.visible = sorted([cls.restaurant.id] + [r.id for i, r in enumerate(cls.others) if i not in (2, 3)])
+
+    def post(self, data, client=None):
+        return (client or APIClient()).post(self.url, data, format='json')
+
+    def point(self, **data):
+        return {'latitude': '43.250000', 'longitude': '76.950000', **data}
+
+    def test_category_mode_returns_visible_restaurants_in_id_order(self):
+        response = self.post(self.point(category_id=self.category.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([quote['restaurant_id'] for quote in response.json()], self.visible)
+
+    def test_id_mode_skips_hidden_and_unknown_restaurants(self):
+        ids = [self.others[1].id, self.others[2].id, self.restaurant.id, 999999]
+        response = self.post(self.point(restaurant_ids=ids))
+        self.assertEqual(response.status_code, 200)
+        quotes = response.json()
+        self.assertEqual([quote['restaurant_id'] for quote in quotes], sorted([self.others[1].id, self.restaurant.id]))
+        self.assertEqual(set(quotes[0]), {'restaurant_id', 'delivery_fee', 'distance_km', 'eta_minutes'})
+
+    def test_saved_address_requires_authentication(self):
+        data = {'address_id': self.address.id, 'category_id': self.category.id}
+        self.assertEqual(self.post(data).status_code, 401)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(self.post(data, client).status_code, 200)
+
+    @override_settings(DELIVERY_QUOTE_MAX_RESTAURANTS=2)
+    def test_results_are_capped(self):
+        response = self.post(self.point(category_id=self.category.id))
+        self.assertEqual([quote['restaurant_id'] for quote in response.json()], self.visible[:2])
+
+        ids = [r.id for r in self.others[:3]]
+        self.assertEqual(self.post(self.point(restaurant_ids=ids)).status_code, 400)
+
+
+@override_settings(PAYLINK_API_KEY='test-key', PAYLINK_WORKER_THREADS=0, PAYLINK_LINK_WAIT_SECONDS=1)
+@mock.patch('payments.outbox.PayLinkService')
+class IdempotentOrderCreationTests(OrderTestData, TransactionTestCase):
+    """
+    TransactionTestCase: ссылку на оплату создает on_commit-обработчик,
+    поэтому нужны настоящие коммиты.
+    """
+
+    def setUp(self):
+        self.setUpTestData()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, data, key):
+        return self.client.post('/api/orders/create/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_original_payment_url(self, paylink):
+        paylink.return_value.create_payment.return_value = 'https://pay.example/1'
+
+        first = self.create(self.cart(2), 'checkout-1')
+        second = self.create(self.cart(2), 'checkout-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()['payment_url'], 'https://pay.example/1')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        paylink.return_value.create_payment.assert_called_once()
+
+    def test_same_key_with_different_body_is_rejected(self, paylink):
+        paylink.return_value.create_payment.return_value = 'https://pay.example/1'
+
+        self.create(self.cart(2), 'checkout-2')
+        response = self.create(self.cart(3), 'checkout-2')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_replay_reports_current_payment_link_status(self, paylink):
+        paylink.return_value.create_payment.side_effect = RuntimeError('timeout')
+
+        with self.assertLogs('payments.outbox', 'WARNING'):
+            first = self.create(self.cart(1), 'checkout-3')
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.json()['status'], 'pending')
+
+        PaymentLinkOutbox.objects.update(status='ready', payment_url='https://pay.example/3')
+        second = self.create(self.cart(1), 'checkout-3')
+
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json()['payment_url'], 'https://pay.example/3')
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class IdempotencyKeyPurgeTests(TestCase):
+    def test_purge_removes_only_expired_keys(self):
+        user = User.objects.create_user(phone='+77000000031', password='pass')
+        old = IdempotencyKey.objects.create(user=user, key='old', request_fingerprint='x')
+        fresh = IdempotencyKey.objects.create(user=user, key='fresh', request_fingerprint='x')
+        IdempotencyKey.objects.filter(pk=old.pk).update(created_at=datetime.now(dt_timezone.utc) - timedelta(hours=25))
+
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('pk', flat=True)), [fresh.pk])
+
+
+class IdempotencyKeyClaimTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone='+77000000032', password='pass')
+
+    def test_key_released_between_insert_and_read_is_claimed_again(self):
+        create = IdempotencyKey.objects.create
+        attempts = []
+
+        def create_after_conflict(**kwargs):
+            # Первая вставка проиграла гонку, а владелец ключа тут же удалил запись после ошибки
+            attempts.append(kwargs)
+            if len(attempts) == 1:
+                raise IntegrityError
+            return create(**kwargs)
+
+        with mock.patch.object(IdempotencyKey.objects, 'create', create_after_conflict):
+            record, claimed = idempotency._claim(self.user, 'retry', 'x')
+        self.assertTrue(claimed)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(IdempotencyKey.objects.get().pk, record.pk)
+
+    def test_key_that_keeps_disappearing_answers_conflict(self):
+        with mock.patch.object(IdempotencyKey.objects, 'create', side_effect=IntegrityError):
+            self.assertEqual(idempotency._claim(self.user, 'busy', 'x'), (None, False))
+
+
+class OrderStateMachineTests(OrderTestData, TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(user=self.user, restaurant=self.restaurant, status='pending')
+
+    def test_only_first_concurrent_transition_applies(self):
+        self.assertTrue(transition(self.order.id, 'accepted', actor=self.restaurant.owner))
+        # Второй запрос со "старым" представлением о статусе проигрывает гонку
+        self.assertFalse(transition(self.order.id, 'accepted', from_statuses={'pending'}))
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'accepted')
+        event = OrderStatusEvent.objects.get(order=self.order)
+        self.assertEqual((event.from_status, event.to_status), ('pending', 'accepted'))
+        self.assertEqual(event.actor, self.restaurant.owner)
+
+    def test_transition_is_a_single_update(self):
+        # SAVEPOINT, UPDATE, запись в журнал, RELEASE
+        with self.assertNumQueries(4):
+            transition(self.order.id, 'accepted')
+
+    def test_forbidden_transition_is_rejected(self):
+        with self.assertRaises(InvalidTransition):
+            transition(self.order.id, 'delivered', from_statuses={'pending'})
+
+    def test_client_cancels_order(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post(f'/api/orders/{self.order.id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'cancelled')
+
+        Order.objects.filter(id=self.order.id).update(status='preparing')
+        response = client.post(f'/api/orders/{self.order.id}/cancel/')
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryPlanTests(TestCase):
+    def test_sequential_scan_detection(self):
+        self.assertEqual(sequential_scans('Seq Scan on orders_order  (cost=0.00..1.01 rows=1)'),
+                         ['Seq Scan on orders_order  (cost=0.00..1.01 rows=1)'])
+        self.assertEqual(len(sequential_scans('2 0 0 SCAN orders_order')), 1)
+        self.assertEqual(sequential_scans('2 0 0 SCAN orders_order USING INDEX order_on_the_way_idx'), [])
+        self.assertEqual(sequential_scans('Seq Scan on orders_orderitem'), [])
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', orders=2000, stdout=out)
+        self.assertIn('Проверено запросов', out.getvalue())
+        # Тестовые данные откатываются
+        self.assertFalse(Order.objects.exists())
+
+
+class EtaStatsTests(OrderTestData, TestCase):
+    def setUp(self):
+        eta.reset_eta_table()
+        self.addCleanup(eta.reset_eta_table)
+        self.distance = eta.geo.distance_km(
+            self.restaurant.latitude, self.restaurant.longitude, self.address.latitude, self.address.longitude
+        )
+
+    def deliver(self, start, preparation_minutes, speed_kmh):
+        order = Order.objects.create(
+            user=self.user, restaurant=self.restaurant, status='delivered',
+            delivery_lat=self.address.latitude, delivery_lon=self.address.longitude,
+        )
+        travel = self.distance / speed_kmh * 60
+        for status, minutes in (('accepted', 0), ('ready_for_pickup', preparation_minutes),
+                                ('on_the_way', preparation_minutes + 2),
+                                ('delivered', preparation_minutes + 2 + travel)):
+            event = OrderStatusEvent.objects.create(order=order, to_status=status)
+            OrderStatusEvent.objects.filter(id=event.id).update(created_at=start + timedelta(minutes=minutes))
+        return order
+
+    def test_refresh_learns_preparation_and_speed(self):
+        start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        with mock.patch('orders.eta.timezone.now', return_value=start + timedelta(days=1)):
+            for preparation, speed in ((10, 10), (20, 15), (40, 30)):
+                order = self.deliver(start, preparation, speed)
+            self.assertEqual(eta.refresh_eta_stats(min_samples=1), (1, 1))
+
+        stats = RestaurantPrepStats.objects.get(restaurant=self.restaurant)
+        self.assertEqual((stats.median_minutes, stats.sample_size), (20, 3))
+        speed = TravelSpeedStats.objects.get()
+        self.assertEqual(speed.distance_from_km, eta.distance_bucket(self.distance))
+        self.assertAlmostEqual(speed.speed_kmh, 15, places=3)
+
+        # Оценка читает таблицу в памяти без запросов к БД
+        eta.get_eta_table()
+        with self.assertNumQueries(0):
+            minutes = eta.estimate_delivery_minutes(self.restaurant.id, self.distance)
+        self.assertEqual(minutes, math.ceil(20 + self.distance / 15 * 60))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get(f'/api/courier/track/{order.id}/').json()
+        self.assertEqual(
+            datetime.fromisoformat(data['estimated_delivery_time']), order.created_at + timedelta(minutes=minutes)
+        )
+
+    def test_defaults_without_statistics(self):
+        self.assertEqual(eta.estimate_delivery_minutes(self.restaurant.id, None), 15)
+        self.assertEqual(eta.estimate_delivery_minutes(self.restaurant.id, 10), 15 + 30)
+
+
+@override_settings(ORDER_HISTORY_PAGE_SIZE=3)
+class OrderHistoryTests(OrderTestData, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_orders(self, count):
+        request = APIRequestFactory().post('/api/orders/create/')
+        request.user = self.user
+        for _ in range(count):
+            serializer = CreateOrderSerializer(data=self.cart(2), context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+    def test_history_is_cursor_paginated_with_constant_queries(self):
+        self.create_orders(7)
+        seen = []
+        url = '/api/orders/'
+        while url:
+            # Одна страница — один запрос (ресторан через JOIN, число позиций подзапросом)
+            with self.assertNumQueries(1):
+                page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 3)
+            seen.extend(order['id'] for order in page['results'])
+            url = page['next']
+
+        self.assertEqual(seen, list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+        first = page['results'][0]
+        self.assertEqual(first['items_count'], 2)
+        self.assertEqual(first['restaurant_name'], 'Ресторан')
+        self.assertNotIn('items', first)
+
+    def test_detail_has_nested_items_with_constant_queries(self):
+        self.create_orders(1)
+        order = Order.objects.get()
+        # Заказ с рестораном, позиции, блюда, категории и тарифы ресторана
+        with self.assertNumQueries(5):
+            data = self.client.get(f'/api/orders/{order.id}/').json()
+        self.assertEqual(len(data['items']), 2)
+        self.assertEqual(data['items'][0]['menu']['name'], 'Блюдо 0')
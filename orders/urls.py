@@ -10,6 +10,7 @@ urlpatterns = [
     # 👇 ИЗМЕНЕНО: Теперь этот путь использует нашу новую view для создания заказа и оплаты
     path("create/", views.CreateOrderAndPayView.as_view(), name="create-and-pay"),
     path("calculate-cost/", views.CalculateOrderCostView.as_view(), name="calculate"),
+    path("delivery-quotes/", views.DeliveryQuoteView.as_view(), name="delivery-quotes"),
 
     path("<int:pk>/", views.OrderDetailView.as_view(), name="detail"),
     path("<int:order_id>/cancel/", views.CancelOrderView.as_view(), name="cancel"),
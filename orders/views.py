@@ -1,85 +1,105 @@
+from django.conf import settings
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from decimal import Decimal
 
 # Импорты вашего проекта
 from .models import Order
-from .serializers import OrderSerializer, OrderDetailSerializer, CreateOrderSerializer
+from .serializers import (
+    OrderListSerializer, OrderDetailSerializer, CreateOrderSerializer, DeliveryQuoteRequestSerializer
+)
+from .pagination import OrderHistoryPagination
 from .permissions import IsClientOwnerOfOrder
-from .services import calculate_delivery_cost # Сервис для расчета доставки
-from payments.services import PayLinkService  # Сервис для оплаты
+from .services import price_cart, with_items_count
+from . import pricing
+from .eta import estimate_delivery_minutes
+from .idempotency import idempotent
+from .state import transition
+from payments.models import PaymentLinkOutbox
+from payments.outbox import enqueue_payment_link, wait_for_payment_link
+from payments.serializers import PaymentLinkSerializer
 from core.models import Address
-from menu.models import Dish
-from promos.models import PromoCode
+from restaurants.models import Restaurant
 
 
 class OrderListView(generics.ListAPIView):
-    """Для клиента: получение списка всех своих заказов."""
-    serializer_class = OrderSerializer
+    """
+    Для клиента: история своих заказов — краткие карточки, постранично
+    (курсор ?cursor=, см. OrderHistoryPagination). Подробности — в OrderDetailView.
+    """
+    serializer_class = OrderListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderHistoryPagination
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).select_related('restaurant').prefetch_related(
-            'items__dish').order_by('-created_at')
+        return with_items_count(
+            Order.objects.filter(user=self.request.user).select_related('restaurant')
+        )
 
 
 class OrderDetailView(generics.RetrieveAPIView):
     """Для клиента: получение деталей одного конкретного заказа."""
     serializer_class = OrderDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsClientOwnerOfOrder]
-    queryset = Order.objects.select_related('restaurant').prefetch_related('items__dish').all()
+    queryset = Order.objects.select_related('restaurant', 'user').prefetch_related(
+        'items__menu', 'restaurant__categories', 'restaurant__tariffs'
+    )
 
 
 class CreateOrderAndPayView(APIView):
     """
     Принимает данные заказа, создает его в базе данных со всеми расчетами
-    и сразу возвращает ссылку на оплату через PayLink.
+    и возвращает ссылку на оплату через PayLink.
+
+    Сам запрос в PayLink выполняет фоновый воркер после коммита транзакции
+    (см. payments.outbox), поэтому транзакция не держится открытой на время
+    HTTP-вызова. Если ссылка не готова за ?wait= секунд (по умолчанию
+    PAYLINK_LINK_WAIT_SECONDS), возвращаем 202 со статусом "pending" —
+    клиент дожидается ссылки через /api/payments/orders/<id>/payment-link/.
     """
     permission_classes = [permissions.IsAuthenticated]
 
-    @transaction.atomic # Гарантирует, что если что-то пойдет не так, заказ не создастся
+    @idempotent  # Повтор с тем же Idempotency-Key вернет исходный заказ и ссылку
     def post(self, request, *args, **kwargs):
         # 1. Валидируем входящие данные (корзина, адрес, промокод)
         serializer = CreateOrderSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        
-        # 2. Создаем заказ в базе данных, вызывая метод .save() из сериализатора.
-        # Внутри этого метода у вас происходит вся основная бизнес-логика.
-        order = serializer.save()
-
-        # 3. Проверяем, что заказ был создан и у него есть итоговая цена
-        if not order or not getattr(order, 'total_price', None):
-            return Response(
-                {"error": "Не удалось создать заказ или рассчитать итоговую стоимость."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-            
-        # 4. Вызываем сервис PayLink для создания ссылки на оплату
+
+        # 2. Создаем заказ и outbox-строку в одной транзакции
+        with transaction.atomic():
+            order = serializer.save()
+            payment_link = enqueue_payment_link(order)
+
+        # 3. Уже вне транзакции недолго ждем ссылку от воркера
+        payment_link = wait_for_payment_link(payment_link, self.get_wait_timeout(request))
+        return self.payment_link_response(payment_link)
+
+    def get_wait_timeout(self, request):
         try:
-            paylink_service = PayLinkService()
-            payment_url = paylink_service.create_payment(
-                amount=float(order.total_price),
-                order_id=str(order.id),
-                description=f"Оплата заказа №{order.id} в JetFood",
-                user_id=request.user.id # Передаем ID пользователя для привязки карт
-            )
-
-            if not payment_url:
-                raise Exception("Сервис оплаты не вернул URL.")
-            
-            # 5. Возвращаем ссылку на оплату во Flutter-приложение
-            return Response({"payment_url": payment_url}, status=status.HTTP_201_CREATED)
-
-        except Exception as e:
-            # Если на этапе создания платежа произошла ошибка, откатываем создание заказа
-            transaction.set_rollback(True)
-            return Response(
-                {"error": f"Ошибка при создании платежа: {e}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            wait = float(request.query_params.get('wait', settings.PAYLINK_LINK_WAIT_SECONDS))
+        except ValueError:
+            wait = settings.PAYLINK_LINK_WAIT_SECONDS
+        return min(max(wait, 0), settings.PAYLINK_LINK_WAIT_SECONDS)
+
+    def payment_link_response(self, payment_link):
+        data = PaymentLinkSerializer(payment_link).data
+        if payment_link.status == 'ready':
+            return Response(data, status=status.HTTP_201_CREATED)
+        if payment_link.status == 'failed':
+            data['error'] = f"Ошибка при создании платежа: {payment_link.last_error}"
+            return Response(data, status=status.HTTP_502_BAD_GATEWAY)
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    def idempotent_replay(self, request, cached_body, cached_status):
+        """При повторе отдаем актуальный статус ссылки, а не закэшированный pending."""
+        payment_link = PaymentLinkOutbox.objects.filter(
+            order_id=cached_body.get('order_id'), order__user=request.user
+        ).first()
+        if payment_link is None:
+            return Response(cached_body, status=cached_status)
+        return self.payment_link_response(payment_link)
 
 
 class CalculateOrderCostView(APIView):
@@ -93,41 +113,66 @@ class CalculateOrderCostView(APIView):
         serializer = CreateOrderSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         validated_data = serializer.validated_data
-        
-        # 1. Расчет стоимости товаров
-        items_data = validated_data['items']
-        items_total_price = Decimal(0)
-        for item_data in items_data:
-            dish = Dish.objects.get(id=item_data['dish_id'])
-            items_total_price += dish.price * item_data['quantity']
-
-        # 2. Расчет доставки
-        address = get_object_or_404(Address, id=validated_data['address_id'])
-        restaurant = Dish.objects.get(id=items_data[0]['dish_id']).restaurant
-        delivery_fee = calculate_delivery_cost(restaurant, address)
-
-        # 3. Расчет скидки по промокоду
-        discount = Decimal(0)
-        promo_code_str = validated_data.get('promo_code')
-        if promo_code_str:
-            try:
-                promo = PromoCode.objects.get(code__iexact=promo_code_str)
-                if promo.is_valid():
-                    discount = promo.calculate_discount(items_total_price)
-            except PromoCode.DoesNotExist:
-                pass
-        
-        # 4. Расчет итоговой суммы
-        total_price = items_total_price + delivery_fee - discount
+
+        # Корзина уже разобрана сериализатором, адрес и промокод — по одному запросу
+        address = serializer.get_address(validated_data['address_id'])
+        totals = price_cart(serializer.cart, address, validated_data.get('promo_code'), request.user)
 
         return Response({
-            'items_total_price': f"{items_total_price:.2f}",
-            'delivery_fee': f"{delivery_fee:.2f}",
-            'discount': f"{discount:.2f}",
-            'total_price': f"{total_price:.2f}"
+            'items_total_price': f"{totals.items_total_price:.2f}",
+            'delivery_fee': f"{totals.delivery_fee:.2f}",
+            'service_fee': f"{totals.service_fee:.2f}",
+            'discount': f"{totals.discount:.2f}",
+            'total_price': f"{totals.total_price:.2f}"
         })
 
 
+class DeliveryQuoteView(APIView):
+    """
+    Пакетная оценка доставки: стоимость, расстояние и ETA сразу для многих
+    ресторанов до одной точки. Один запрос за ресторанами, один за тарифами
+    и один векторный расчет расстояний вместо десятков отдельных вызовов.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = DeliveryQuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if data.get('address_id') is not None:
+            if not request.user.is_authenticated:
+                return Response(
+                    {"error": "Для расчета по сохраненному адресу нужна авторизация."},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+            address = get_object_or_404(Address, id=data['address_id'], user=request.user)
+            latitude, longitude = address.latitude, address.longitude
+        else:
+            latitude, longitude = data['latitude'], data['longitude']
+
+        restaurants = Restaurant.objects.filter(is_approved=True, is_active=True)
+        if data.get('restaurant_ids'):
+            restaurants = restaurants.filter(id__in=data['restaurant_ids'])
+        else:
+            restaurants = restaurants.filter(categories__id=data['category_id'])
+        # distinct + порядок: срез должен быть стабильным и без повторов из-за JOIN по категориям
+        restaurants = restaurants.distinct().order_by('id').prefetch_related('tariffs')[
+            :settings.DELIVERY_QUOTE_MAX_RESTAURANTS
+        ]
+
+        quotes = pricing.quote_restaurants(restaurants, latitude, longitude)
+        return Response([
+            {
+                'restaurant_id': quote.restaurant_id,
+                'delivery_fee': f"{quote.fee:.2f}",
+                'distance_km': round(quote.distance_km, 2) if quote.distance_km is not None else None,
+                'eta_minutes': estimate_delivery_minutes(quote.restaurant_id, quote.distance_km),
+            }
+            for quote in quotes
+        ])
+
+
 class CancelOrderView(APIView):
     """Для клиента: отмена своего заказа."""
     permission_classes = [permissions.IsAuthenticated, IsClientOwnerOfOrder]
@@ -135,10 +180,11 @@ class CancelOrderView(APIView):
     def post(self, request, order_id):
         order = get_object_or_404(Order, id=order_id, user=request.user)
         self.check_object_permissions(request, order)
-        
-        if order.status not in [Order.Status.PENDING, Order.Status.ACCEPTED]:
+
+        # Клиент может отменить заказ, только пока ресторан не начал готовить
+        cancelled = transition(
+            order.id, 'cancelled', from_statuses={'pending', 'accepted'}, actor=request.user, user=request.user
+        )
+        if not cancelled:
             return Response({'error': 'Этот заказ уже нельзя отменить.'}, status=status.HTTP_400_BAD_REQUEST)
-            
-        order.status = Order.Status.CANCELLED
-        order.save(update_fields=['status'])
         return Response({'status': 'Заказ успешно отменен'}, status=status.HTTP_200_OK)
\ No newline at end of file
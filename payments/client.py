@@ -0,0 +1,223 @@
+# payments/client.py
+"""
+HTTP-клиент для PayLink, общий для всего процесса.
+
+* Пул keep-alive соединений (TLS-рукопожатие не повторяется на каждый платеж).
+* Таймауты на соединение и чтение.
+* Повторы с "полным джиттером": для идемпотентных запросов — при сетевых ошибках,
+  таймаутах и 502/503/504; для неидемпотентных — только если запрос точно
+  не ушел (не удалось установить соединение).
+* Circuit breaker: после серии ошибок клиент какое-то время сразу отказывает,
+  не нагружая деградировавший PayLink и не держа воркеры на таймаутах.
+* Гистограммы задержек по каждому вызову (см. metrics_snapshot()).
+"""
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from urllib3.exceptions import NewConnectionError
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRYABLE_STATUSES = frozenset({502, 503, 504})
+
+# Границы корзин гистограммы, в секундах (последняя корзина — "+Inf")
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """PayLink считается недоступным — запрос не отправлялся."""
+
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        # Через сколько секунд breaker снова пропустит запрос
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Классический трехпозиционный автомат: closed → open → half_open → closed.
+    В состоянии half_open пропускается ровно один пробный запрос.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == 'open':
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError("PayLink временно недоступен (circuit breaker открыт).", remaining)
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open':
+                if self._trial_in_flight:
+                    raise CircuitOpenError("PayLink проверяется пробным запросом, повторите позже.", 1.0)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class LatencyHistogram:
+    """Накопительная гистограмма задержек (в формате, привычном для Prometheus)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+            self.counts[index] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {'buckets': buckets, 'sum': round(self.total, 6), 'count': self.count}
+
+
+class PayLinkClient:
+    def __init__(self, pool_maxsize=None, connect_timeout=None, read_timeout=None, max_retries=None,
+                 backoff=None, failure_threshold=None, reset_timeout=None):
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else settings.PAYLINK_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else settings.PAYLINK_READ_TIMEOUT,
+        )
+        self.max_retries = max_retries if max_retries is not None else settings.PAYLINK_MAX_RETRIES
+        self.backoff = backoff if backoff is not None else settings.PAYLINK_RETRY_BACKOFF
+        self.breaker = CircuitBreaker(
+            failure_threshold or settings.PAYLINK_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout if reset_timeout is not None else settings.PAYLINK_BREAKER_RESET_SECONDS,
+        )
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_maxsize or settings.PAYLINK_POOL_MAXSIZE
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._histograms = {}
+        self._histograms_lock = threading.Lock()
+
+    def _observe(self, operation, outcome, seconds):
+        key = (operation, outcome)
+        with self._histograms_lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def _should_retry(self, method, error=None, response=None):
+        if error is not None:
+            if isinstance(error, requests.exceptions.ConnectTimeout):
+                return True  # Соединение не установлено — запрос точно не ушел
+            if isinstance(error, requests.exceptions.ConnectionError):
+                reason = getattr(error.args[0], 'reason', None) if error.args else None
+                if isinstance(reason, NewConnectionError):
+                    return True
+            return method in IDEMPOTENT_METHODS and isinstance(error, requests.exceptions.RequestException)
+        return method in IDEMPOTENT_METHODS and response.status_code in RETRYABLE_STATUSES
+
+    def request(self, method, url, operation=None, **kwargs):
+        """
+        Выполняет запрос с повторами и учетом circuit breaker.
+        Ответы 5xx и сетевые ошибки считаются отказом PayLink; 4xx — нет.
+        """
+        method = method.upper()
+        operation = operation or method.lower()
+        kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self._observe(operation, 'error', time.monotonic() - started)
+                self.breaker.record_failure()
+                if attempt < self.max_retries and self._should_retry(method, error=e):
+                    attempt += 1
+                    self._sleep(attempt)
+                    continue
+                raise
+            except BaseException:
+                # Любой другой сбой тоже отказ: иначе пробный запрос half_open
+                # так и остался бы "в полете", и breaker не закрылся бы никогда
+                self.breaker.record_failure()
+                raise
+
+            self._observe(operation, str(response.status_code), time.monotonic() - started)
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+                if attempt < self.max_retries and self._should_retry(method, response=response):
+                    attempt += 1
+                    self._sleep(attempt)
+                    continue
+            else:
+                self.breaker.record_success()
+            return response
+
+    def _sleep(self, attempt):
+        # "Полный джиттер": случайная пауза от 0 до backoff * 2^attempt
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def metrics_snapshot(self):
+        with self._histograms_lock:
+            histograms = list(self._histograms.items())
+        latency = {}
+        for (operation, outcome), histogram in histograms:
+            latency.setdefault(operation, {})[outcome] = histogram.snapshot()
+        return {
+            'circuit_breaker': {'state': self.breaker.state, 'failures': self.breaker.failures},
+            'latency_seconds': latency,
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_paylink_client() -> PayLinkClient:
+    """Единственный на процесс экземпляр клиента (и, значит, пула соединений)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PayLinkClient()
+    return _client
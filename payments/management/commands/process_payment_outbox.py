@@ -0,0 +1,24 @@
+# payments/management/commands/process_payment_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.outbox import process_due_entries
+
+
+class Command(BaseCommand):
+    help = "Создает ссылки на оплату для outbox-строк, которым пора повториться, и подбирает зависшие."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Работать постоянно (режим воркера).")
+        parser.add_argument('--interval', type=float, default=2.0, help="Пауза между проходами, сек.")
+        parser.add_argument('--limit', type=int, default=100, help="Максимум строк за один проход.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_due_entries(limit=options['limit'])
+            if processed:
+                self.stdout.write(f"Обработано строк: {processed}")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
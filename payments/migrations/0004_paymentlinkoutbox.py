@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_idempotencykey'),
+        ('payments', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentLinkOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('processing', 'Отправляется'), ('ready', 'Ссылка получена'), ('failed', 'Ошибка')], default='pending', max_length=20)),
+                ('payment_url', models.URLField(blank=True, default='', max_length=1024)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payment_link', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'Ссылка на оплату (outbox)',
+                'verbose_name_plural': 'Ссылки на оплату (outbox)',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='paylink_outbox_due_idx')],
+            },
+        ),
+    ]
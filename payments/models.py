@@ -1,6 +1,7 @@
 # payments/models.py
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class SavedUserCard(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='saved_cards')
@@ -13,4 +14,36 @@ class SavedUserCard(models.Model):
 
     class Meta:
         verbose_name = "Сохраненная карта"
-        verbose_name_plural = "Сохраненные карты"
\ No newline at end of file
+        verbose_name_plural = "Сохраненные карты"
+
+class PaymentLinkOutbox(models.Model):
+    """
+    Транзакционный outbox для ссылок на оплату. Строка пишется в той же
+    транзакции, что и заказ, а сам запрос в PayLink выполняет фоновый воркер
+    уже после коммита — транзакция не держится открытой на время HTTP-вызова.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает отправки'),
+        ('processing', 'Отправляется'),
+        ('ready', 'Ссылка получена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    order = models.OneToOneField('orders.Order', on_delete=models.CASCADE, related_name='payment_link')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    payment_url = models.URLField(max_length=1024, blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ссылка на оплату заказа {self.order_id} ({self.status})"
+
+    class Meta:
+        verbose_name = "Ссылка на оплату (outbox)"
+        verbose_name_plural = "Ссылки на оплату (outbox)"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='paylink_outbox_due_idx'),
+        ]
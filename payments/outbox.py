@@ -0,0 +1,171 @@
+# payments/outbox.py
+"""
+Фоновое создание ссылок на оплату через транзакционный outbox.
+
+1. enqueue_payment_link() пишет строку PaymentLinkOutbox в транзакции заказа
+   и после коммита отдает ее воркеру.
+2. Воркер (ограниченный пул потоков) атомарно "забирает" строку условным UPDATE,
+   ходит в PayLink и сохраняет результат. Неудачные попытки повторяются с
+   экспоненциальной задержкой, а зависшие строки подбирает команда
+   process_payment_outbox.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .client import CircuitOpenError
+from .models import PaymentLinkOutbox
+from .services import PayLinkService
+
+logger = logging.getLogger(__name__)
+
+# Через сколько "processing"-строка считается брошенной (воркер упал)
+STALE_PROCESSING_AFTER = timedelta(minutes=5)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PAYLINK_WORKER_THREADS, thread_name_prefix='paylink'
+                )
+    return _executor
+
+
+def enqueue_payment_link(order) -> PaymentLinkOutbox:
+    """
+    Создает outbox-строку для заказа. Вызывать внутри транзакции, создающей заказ:
+    воркер получит задачу только после успешного коммита.
+    """
+    entry = PaymentLinkOutbox.objects.create(order=order)
+    entry.future = Future()
+    transaction.on_commit(lambda: _chain(dispatch(entry.pk), entry.future))
+    return entry
+
+
+def _chain(source: Future, target: Future):
+    def copy_result(done):
+        if done.exception() is not None:
+            target.set_exception(done.exception())
+        else:
+            target.set_result(done.result())
+    source.add_done_callback(copy_result)
+
+
+def dispatch(entry_id) -> Future:
+    """Отдает строку воркеру. При PAYLINK_WORKER_THREADS = 0 выполняет ее сразу."""
+    if settings.PAYLINK_WORKER_THREADS <= 0:
+        future = Future()
+        try:
+            future.set_result(process_entry(entry_id))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return _get_executor().submit(_process_in_worker, entry_id)
+
+
+def _process_in_worker(entry_id):
+    close_old_connections()
+    try:
+        return process_entry(entry_id)
+    finally:
+        close_old_connections()
+
+
+def process_entry(entry_id) -> PaymentLinkOutbox:
+    """
+    Забирает строку и создает для нее ссылку на оплату. Если строку уже забрал
+    другой воркер (или она не готова к повтору) — ничего не делает.
+    """
+    now = timezone.now()
+    claimed = PaymentLinkOutbox.objects.filter(
+        pk=entry_id, status='pending', next_attempt_at__lte=now
+    ).update(status='processing', attempts=F('attempts') + 1, updated_at=now)
+    entry = PaymentLinkOutbox.objects.select_related('order').get(pk=entry_id)
+    if not claimed:
+        return entry
+
+    order = entry.order
+    try:
+        payment_url = PayLinkService().create_payment(
+            amount=float(order.total_price),
+            order_id=str(order.id),
+            description=f"Оплата заказа №{order.id} в JetFood",
+            user_id=order.user_id,
+        )
+        if not payment_url:
+            raise ValueError("Сервис оплаты не вернул URL.")
+    except CircuitOpenError as e:
+        # Запрос не отправлялся: попытку не засчитываем и ждем, пока breaker
+        # снова пропустит запросы. Иначе сбой PayLink длиной в
+        # PAYLINK_BREAKER_RESET_SECONDS съел бы все PAYLINK_OUTBOX_MAX_ATTEMPTS
+        entry.status = 'pending'
+        entry.attempts -= 1
+        entry.last_error = str(e)
+        entry.next_attempt_at = timezone.now() + timedelta(seconds=e.retry_after)
+        entry.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'updated_at'])
+        return entry
+    except Exception as e:
+        logger.warning("Не удалось создать ссылку на оплату заказа %s: %s", order.id, e)
+        entry.last_error = str(e)
+        if entry.attempts >= settings.PAYLINK_OUTBOX_MAX_ATTEMPTS:
+            entry.status = 'failed'
+        else:
+            entry.status = 'pending'
+            entry.next_attempt_at = timezone.now() + timedelta(seconds=2 ** entry.attempts)
+        entry.save(update_fields=['status', 'last_error', 'next_attempt_at', 'updated_at'])
+        return entry
+
+    entry.status = 'ready'
+    entry.payment_url = payment_url
+    entry.last_error = ''
+    entry.save(update_fields=['status', 'payment_url', 'last_error', 'updated_at'])
+    return entry
+
+
+def wait_for_payment_link(entry: PaymentLinkOutbox, timeout: float) -> PaymentLinkOutbox:
+    """Ждет результат воркера не дольше timeout секунд и возвращает актуальную строку."""
+    future = getattr(entry, 'future', None)
+    if future is not None and timeout > 0:
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            pass
+        except Exception as e:
+            logger.warning("Воркер ссылки на оплату завершился с ошибкой: %s", e)
+    entry.refresh_from_db()
+    return entry
+
+
+def process_due_entries(limit=100) -> int:
+    """
+    Подбирает строки, которым пора повториться, и "брошенные" processing-строки.
+    Используется командой process_payment_outbox. Возвращает число отправленных задач.
+    """
+    now = timezone.now()
+    PaymentLinkOutbox.objects.filter(
+        status='processing', updated_at__lt=now - STALE_PROCESSING_AFTER
+    ).update(status='pending', updated_at=now)
+
+    due_ids = list(
+        PaymentLinkOutbox.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+    )
+    futures = [dispatch(entry_id) for entry_id in due_ids]
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            logger.warning("Ошибка обработки outbox: %s", e)
+    return len(due_ids)
@@ -1,7 +1,7 @@
 # payments/serializers.py
 from rest_framework import serializers
 # 👇 ИСПРАВЛЯЕМ ИМПОРТ: используем правильное имя модели
-from .models import SavedUserCard 
+from .models import SavedUserCard, PaymentLinkOutbox
 
 class SavedUserCardSerializer(serializers.ModelSerializer):
     """Сериализатор для чтения данных о сохраненной карте."""
@@ -17,4 +17,12 @@ class SavedUserCardSerializer(serializers.ModelSerializer):
 class CardCreateSerializer(serializers.Serializer):
     """Сериализатор для ПРИЕМА токена от фронтенда."""
     card_token = serializers.CharField(required=True, write_only=True)
-    name = serializers.CharField(required=False, allow_blank=True)
\ No newline at end of file
+    name = serializers.CharField(required=False, allow_blank=True)
+
+class PaymentLinkSerializer(serializers.ModelSerializer):
+    """Статус создания ссылки на оплату заказа."""
+    order_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = PaymentLinkOutbox
+        fields = ('order_id', 'status', 'payment_url')
@@ -1,6 +1,13 @@
+import logging
+
 import requests
 from django.conf import settings
 
+from .client import get_paylink_client
+
+logger = logging.getLogger(__name__)
+
+
 class PayLinkService:
     """
     Сервис для взаимодействия с API PayLink.kz.
@@ -8,7 +15,8 @@ class PayLinkService:
     def __init__(self):
         # Берем ключи из настроек вашего проекта (settings.py или .env)
         self.api_key = getattr(settings, 'PAYLINK_API_KEY', None)
-        self.api_url = "https://api.paylink.kz/v1/payments"
+        self.api_url = settings.PAYLINK_API_URL
+        self.client = get_paylink_client()
         if not self.api_key:
             raise ValueError("Ключ PAYLINK_API_KEY не настроен в настройках Django.")
 
@@ -44,11 +52,11 @@ class PayLinkService:
         }
 
         try:
-            response = requests.post(self.api_url, headers=headers, json=payload)
+            response = self.client.post(self.api_url, headers=headers, json=payload, operation='create_payment')
             response.raise_for_status() # Вызовет ошибку, если статус не 2xx
             data = response.json()
             return data.get("url") # Возвращаем саму ссылку на оплату
         except requests.exceptions.RequestException as e:
             # Логируем ошибку и пробрасываем ее дальше
-            print(f"Ошибка при обращении к PayLink API: {e}")
+            logger.warning("Ошибка при обращении к PayLink API: %s", e)
             raise
\ No newline at end of file
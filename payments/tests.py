@@ -1,3 +1,173 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import User
+from orders.models import Order
+from .client import CircuitOpenError, PayLinkClient, get_paylink_client
+from .models import PaymentLinkOutbox
+from .outbox import process_entry
+
+
+class StubPayLinkHandler(BaseHTTPRequestHandler):
+    """Локальная заглушка PayLink: отвечает заранее заданными кодами."""
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        server.requests.append(json.loads(self.rfile.read(length) or b'{"orderId": "get"}'))
+        status_code = server.responses.pop(0) if server.responses else 200
+        body = json.dumps({'url': f"https://pay.example/{server.requests[-1]['orderId']}"}).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubPayLinkServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.paylink = ThreadingHTTPServer(('127.0.0.1', 0), StubPayLinkHandler)
+        cls.paylink.requests, cls.paylink.responses = [], []
+        threading.Thread(target=cls.paylink.serve_forever, daemon=True).start()
+        cls.paylink_settings = override_settings(
+            PAYLINK_API_KEY='test-key',
+            PAYLINK_API_URL=f"http://127.0.0.1:{cls.paylink.server_port}/v1/payments",
+        )
+        cls.paylink_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.paylink_settings.disable()
+        cls.paylink.shutdown()
+        cls.paylink.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.paylink.requests.clear()
+        self.paylink.responses.clear()
+
+
+class PaymentLinkOutboxTests(StubPayLinkServerMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user(phone='+77000000010', password='pass')
+        self.order = Order.objects.create(user=user, total_price=Decimal('2500.00'))
+        self.entry = PaymentLinkOutbox.objects.create(order=self.order)
+
+    def test_worker_stores_payment_url(self):
+        entry = process_entry(self.entry.id)
+
+        self.assertEqual(entry.status, 'ready')
+        self.assertEqual(entry.payment_url, f"https://pay.example/{self.order.id}")
+        self.assertEqual(self.paylink.requests[0]['amount'], 2500.0)
+
+    def test_failed_call_is_rescheduled(self):
+        self.paylink.responses.append(503)
+
+        with self.assertLogs('payments', 'WARNING'):
+            entry = process_entry(self.entry.id)
+
+        self.assertEqual(entry.status, 'pending')
+        self.assertEqual(entry.attempts, 1)
+        self.assertGreater(entry.next_attempt_at, entry.created_at)
+        # До наступления next_attempt_at строку никто не заберет
+        self.assertEqual(process_entry(self.entry.id).attempts, 1)
+        self.assertEqual(len(self.paylink.requests), 1)
+
+    def test_open_breaker_does_not_use_up_attempts(self):
+        breaker = get_paylink_client().breaker
+        self.addCleanup(breaker.record_success)
+        breaker.state, breaker.opened_at = 'open', time.monotonic()
+
+        with self.assertLogs('payments', 'WARNING'):
+            entry = process_entry(self.entry.id)
+
+        self.assertEqual((entry.status, entry.attempts), ('pending', 0))
+        self.assertGreater(entry.next_attempt_at, timezone.now() + timedelta(seconds=breaker.reset_timeout - 5))
+        self.assertEqual(self.paylink.requests, [])
+
+    def test_entry_is_processed_once(self):
+        process_entry(self.entry.id)
+        process_entry(self.entry.id)
+
+        self.assertEqual(len(self.paylink.requests), 1)
+
+
+class PayLinkClientTests(StubPayLinkServerMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f"http://127.0.0.1:{self.paylink.server_port}/v1/payments"
+        self.client_ = PayLinkClient(max_retries=2, backoff=0, failure_threshold=3, reset_timeout=60)
+
+    def test_idempotent_request_is_retried_on_503(self):
+        self.paylink.responses.extend([503, 503])
+
+        response = self.client_.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.paylink.requests), 3)
+
+    def test_post_is_not_retried_after_it_was_sent(self):
+        self.paylink.responses.append(503)
+
+        response = self.client_.post(self.url, json={'orderId': '1'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.paylink.requests), 1)
+
+    def test_breaker_opens_and_fails_fast(self):
+        self.paylink.responses.extend([500, 500, 500])
+        for _ in range(3):
+            self.client_.post(self.url, json={'orderId': '1'})
+
+        with self.assertRaises(CircuitOpenError):
+            self.client_.post(self.url, json={'orderId': '1'})
+        self.assertEqual(len(self.paylink.requests), 3)
+        self.assertEqual(self.client_.metrics_snapshot()['circuit_breaker']['state'], 'open')
+
+    def test_breaker_closes_after_successful_trial(self):
+        self.client_.breaker.reset_timeout = 0
+        self.paylink.responses.extend([500, 500, 500])
+        for _ in range(3):
+            self.client_.post(self.url, json={'orderId': '1'})
+
+        self.assertEqual(self.client_.post(self.url, json={'orderId': '1'}).status_code, 200)
+        self.assertEqual(self.client_.breaker.state, 'closed')
+
+    def test_unexpected_error_in_trial_does_not_wedge_breaker(self):
+        self.client_.breaker.reset_timeout = 0
+        self.paylink.responses.extend([500, 500, 500])
+        for _ in range(3):
+            self.client_.post(self.url, json={'orderId': '1'})
+
+        with mock.patch.object(self.client_.session, 'request', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.client_.post(self.url, json={'orderId': '1'})
+        self.assertEqual(self.client_.post(self.url, json={'orderId': '1'}).status_code, 200)
+        self.assertEqual(self.client_.breaker.state, 'closed')
+
+    def test_latency_is_recorded_per_outcome(self):
+        self.client_.post(self.url, json={'orderId': '1'}, operation='create_payment')
+
+        latency = self.client_.metrics_snapshot()['latency_seconds']['create_payment']['200']
+        self.assertEqual(latency['count'], 1)
+        self.assertEqual(latency['buckets']['+Inf'], 1)
@@ -1,9 +1,11 @@
 # payments/urls.py
 from django.urls import path
-from .views import CreateOrderAndPaymentView, SavedCardListView, PayLinkWebhookView
+from .views import CreateOrderAndPaymentView, SavedCardListView, PayLinkWebhookView, PaymentLinkStatusView, PayLinkMetricsView
 
 urlpatterns = [
     path('create-order/', CreateOrderAndPaymentView.as_view(), name='create-order-payment'),
+    path('orders/<int:order_id>/payment-link/', PaymentLinkStatusView.as_view(), name='payment-link-status'),
     path('cards/', SavedCardListView.as_view(), name='saved-cards-list'),
+    path('metrics/', PayLinkMetricsView.as_view(), name='paylink-metrics'),
     path('webhook/', PayLinkWebhookView.as_view(), name='paylink-webhook'),
 ]
\ No newline at end of file
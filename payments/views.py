@@ -1,55 +1,51 @@
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from django.db import transaction
-import uuid
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
 # Наши модели и сервисы
-from .models import SavedUserCard
-from orders.models import Order, OrderItem
-from core.models import Address
-from promos.models import PromoCode
-from .services import PayLinkService 
+from .models import SavedUserCard, PaymentLinkOutbox
+from .client import get_paylink_client
+from orders.models import Order
 
 # Наши сериализаторы
-from .serializers import SavedUserCardSerializer
-# 👇 ИСПРАВЛЯЕМ ИМПОРТ: используем правильное имя класса
-from orders.serializers import CreateOrderSerializer 
+from .serializers import SavedUserCardSerializer, PaymentLinkSerializer
+from orders.views import CreateOrderAndPayView
 
 
-class CreateOrderAndPaymentView(APIView):
+class CreateOrderAndPaymentView(CreateOrderAndPayView):
     """
     Главная view для оформления заказа.
-    Она создает заказ в БД и возвращает ссылку на оплату.
+    Она создает заказ в БД и возвращает ссылку на оплату — так же, как
+    orders.views.CreateOrderAndPayView (общая логика, outbox и Idempotency-Key).
     """
+
+
+class PaymentLinkStatusView(generics.RetrieveAPIView):
+    """
+    Статус ссылки на оплату заказа: pending / processing / ready / failed.
+    Клиент опрашивает его, если при создании заказа получил 202.
+    """
+    serializer_class = PaymentLinkSerializer
     permission_classes = [IsAuthenticated]
 
-    @transaction.atomic
-    def post(self, request, *args, **kwargs):
-        # 👇 ИСПРАВЛЯЕМ ИМЯ КЛАССА ЗДЕСЬ
-        serializer = CreateOrderSerializer(data=request.data, context={'request': request})
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-        # Ваш CreateOrderSerializer уже делает всю работу по созданию заказа
-        # и расчету суммы, поэтому мы просто вызываем его метод save().
-        order = serializer.save()
-
-        # --- Создание платежа через PayLink ---
-        try:
-            paylink_service = PayLinkService()
-            payment_url = paylink_service.create_payment(
-                amount=float(order.total_price),
-                order_id=str(order.id),
-                description=f"Оплата заказа №{order.id}",
-                # enable_apple_pay и enable_google_pay теперь внутри сервиса
-            )
-            return Response({"payment_url": payment_url}, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            # Если оплата не удалась, откатываем создание заказа
-            transaction.set_rollback(True)
-            return Response({"error": f"Ошибка создания платежа: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    def get_object(self):
+        return get_object_or_404(
+            PaymentLinkOutbox, order_id=self.kwargs['order_id'], order__user=self.request.user
+        )
+
+
+class PayLinkMetricsView(APIView):
+    """
+    Для администраторов: гистограммы задержек вызовов PayLink и состояние
+    circuit breaker в текущем процессе.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_paylink_client().metrics_snapshot())
 
 
 class SavedCardListView(generics.ListAPIView):
@@ -74,13 +70,10 @@ class PayLinkWebhookView(APIView):
 
         if event_type == "payment.success":
             order_id = data.get("order_id")
-            # Находим заказ в нашей БД и помечаем его как оплаченный
-            try:
-                order = Order.objects.get(id=order_id)
-                order.status = 'PAID' # или ваш статус 'Оплачен'
-                order.save()
-            except Order.DoesNotExist:
-                pass # Игнорируем или логируем ошибку
+            # Помечаем заказ оплаченным одним условным UPDATE: статус заказа
+            # оплата не меняет, а повторное уведомление ничего не перезапишет
+            if order_id:
+                Order.objects.filter(id=order_id, is_paid=False).update(is_paid=True, updated_at=timezone.now())
 
         elif event_type == "card.tokenized":
             user_id = data.get("user_id")
@@ -3,5 +3,6 @@ from .models import PromoCode
 
 @admin.register(PromoCode)
 class PromoCodeAdmin(admin.ModelAdmin):
-    list_display = ("code", "discount", "expires_at", "used_count", "max_uses")
+    list_display = ("code", "discount", "is_active", "restaurant", "expires_at", "used_count", "max_uses", "counter_shards")
+    list_filter = ("is_active",)
     search_fields = ("code",)
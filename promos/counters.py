@@ -0,0 +1,122 @@
+# promos/counters.py
+"""
+Шардированные счетчики использований промокода.
+
+Обычный промокод считает использования условным UPDATE своей строки
+(PromoCode.apply): во время массовой акции все оформления заказов с этим
+кодом выстраиваются в очередь за блокировкой одной строки до коммита.
+У промокода с counter_shards = N > 1 счетчиков N (PromoCounterShard), и
+каждое использование обновляет случайный из них, так что пропускная
+способность растет с числом счетчиков.
+
+max_uses соблюдается точно: счетчик тратит только свой остаток remaining,
+а остаток пополняет пачкой (PROMO_COUNTER_RESERVATION_BATCH) из общего
+бюджета — условным UPDATE reserved_count промокода, то есть строку
+промокода трогает лишь одно использование из пачки. Когда общий бюджет
+кончился, добираются остатки других счетчиков. Откат транзакции заказа
+откатывает и списание, и резерв.
+
+used_count у такого промокода — сумма used счетчиков, обновляемая лениво
+(sync_used_counts, команда sync_promo_counters). При первом включении
+шардирования уже сделанные использования переносятся в счетчик 0. Число
+счетчиков потом можно менять, но вернуться к одному нельзя
+(PromoCode.drops_counter_shards).
+"""
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import PromoCode, PromoCounterShard
+
+
+def ensure_shards(promo: PromoCode):
+    """Создает недостающие счетчики промокода (вызывается из promos.signals)."""
+    with transaction.atomic():
+        first_time = not PromoCounterShard.objects.filter(promo_code=promo).exists()
+        PromoCounterShard.objects.bulk_create(
+            [
+                PromoCounterShard(promo_code=promo, slot=slot, used=promo.used_count if first_time and slot == 0 else 0)
+                for slot in range(promo.counter_shards)
+            ],
+            ignore_conflicts=True,
+        )
+        if first_time:
+            PromoCode.objects.filter(pk=promo.pk, reserved_count__lt=F('used_count')).update(
+                reserved_count=F('used_count')
+            )
+
+
+def _reserve(promo_id, max_uses) -> int:
+    """Берет из общего бюджета пачку (или то, что осталось). Возвращает ее размер."""
+    batch = max(settings.PROMO_COUNTER_RESERVATION_BATCH, 1)
+    promos = PromoCode.objects.filter(pk=promo_id)
+    if promos.filter(reserved_count__lte=max_uses - batch).update(reserved_count=F('reserved_count') + batch):
+        return batch
+    # Хвост бюджета меньше пачки: забираем ровно остаток
+    for _ in range(3):
+        reserved = promos.values_list('reserved_count', flat=True).first()
+        if reserved is None or reserved >= max_uses:
+            return 0
+        left = min(batch, max_uses - reserved)
+        if promos.filter(reserved_count=reserved).update(reserved_count=reserved + left):
+            return left
+    return 0
+
+
+def _update_slot(promo, slot, **changes) -> bool:
+    """UPDATE счетчика; если его строки нет (промокод создан в обход сигналов) — создает их."""
+    shards = PromoCounterShard.objects.filter(promo_code_id=promo.id, slot=slot)
+    if shards.update(**changes):
+        return True
+    ensure_shards(PromoCode.objects.get(pk=promo.id))
+    return bool(shards.update(**changes))
+
+
+def consume(promo) -> bool:
+    """
+    Засчитывает одно использование промокода (CompiledPromo). Вызывать в
+    транзакции заказа. False — лимит max_uses исчерпан.
+    """
+    if promo.counter_shards <= 1:
+        return PromoCode(pk=promo.id).apply()
+
+    shards = PromoCounterShard.objects.filter(promo_code_id=promo.id)
+    slot = random.randrange(promo.counter_shards)
+    if promo.max_uses is None:
+        return _update_slot(promo, slot, used=F('used') + 1)
+
+    if shards.filter(slot=slot, remaining__gt=0).update(used=F('used') + 1, remaining=F('remaining') - 1):
+        return True
+    reserved = _reserve(promo.id, promo.max_uses)
+    if reserved:
+        return _update_slot(promo, slot, used=F('used') + 1, remaining=F('remaining') + reserved - 1)
+    # Общий бюджет исчерпан, но у других счетчиков мог остаться резерв
+    for other in shards.filter(remaining__gt=0).values_list('slot', flat=True):
+        if shards.filter(slot=other, remaining__gt=0).update(used=F('used') + 1, remaining=F('remaining') - 1):
+            return True
+    return False
+
+
+def is_exhausted(promo: PromoCode) -> bool:
+    if promo.max_uses is None:
+        return False
+    if promo.counter_shards <= 1:
+        return promo.used_count >= promo.max_uses
+    return (
+        promo.reserved_count >= promo.max_uses
+        and not PromoCounterShard.objects.filter(promo_code=promo, remaining__gt=0).exists()
+    )
+
+
+def sync_used_counts() -> int:
+    """Записывает в used_count шардированных промокодов сумму их счетчиков."""
+    totals = (
+        PromoCounterShard.objects.filter(promo_code__counter_shards__gt=1)
+        .values('promo_code').annotate(total=Sum('used')).values_list('promo_code', 'total')
+    )
+    updated = 0
+    for promo_id, total in totals:
+        updated += PromoCode.objects.filter(pk=promo_id).exclude(used_count=total).update(used_count=total)
+    return updated
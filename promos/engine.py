@@ -0,0 +1,169 @@
+# promos/engine.py
+"""
+Проверка и погашение промокодов.
+
+Определения промокодов читаются постоянно (расчет стоимости, оформление
+заказа), а меняются редко. Поэтому промокод "компилируется" в неизменяемый
+CompiledPromo и кладется в кэш под ключом с версией, как снимки меню
+(menu.snapshots). Неизвестные коды тоже кэшируются, чтобы перебор кодов не
+доходил до БД. Версию увеличивают сигналы promos.signals после коммита.
+
+Погашение — один условный UPDATE ... WHERE used_count < max_uses: без
+select_for_update и перечитывания строки (для массовых акций — по одному из
+шардированных счетчиков, см. promos.counters). Счетчик used_count в кэш не
+попадает; когда UPDATE не срабатывает (лимит исчерпан), версия сбрасывается,
+и новые проверки видят код как недействительный. Лимит на клиента держит
+такой же условный UPDATE строки PromoUserUsage.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import counters
+from .models import PromoCode, PromoRedemption, PromoUserUsage, normalize_code
+
+# Значение в кэше для несуществующего кода (None означает промах кэша)
+UNKNOWN = 'unknown'
+VERSION_KEY = 'promos:version'
+
+
+@dataclass(frozen=True)
+class CompiledPromo:
+    id: int
+    code: str
+    discount: Decimal  # процент
+    is_active: bool
+    exhausted: bool
+    max_uses: int | None
+    counter_shards: int
+    expires_at: datetime | None
+    per_user_limit: int | None
+    min_order_amount: Decimal | None
+    restaurant_id: int | None
+
+    @classmethod
+    def compile(cls, promo: PromoCode):
+        return cls(
+            id=promo.id, code=promo.code, discount=promo.discount, is_active=promo.is_active,
+            exhausted=counters.is_exhausted(promo), max_uses=promo.max_uses,
+            counter_shards=promo.counter_shards, expires_at=promo.expires_at, per_user_limit=promo.per_user_limit,
+            min_order_amount=promo.min_order_amount, restaurant_id=promo.restaurant_id,
+        )
+
+    def is_valid(self):
+        """Действует ли промокод вообще (без учета заказа и клиента)."""
+        if not self.is_active or self.exhausted:
+            return False
+        return self.expires_at is None or timezone.now() <= self.expires_at
+
+    def rejection(self, amount=None, restaurant_id=None):
+        """Причина, по которой промокод нельзя применить к заказу, или None."""
+        if not self.is_valid():
+            return "Срок действия промокода истек или он больше недействителен."
+        if self.restaurant_id is not None and restaurant_id is not None and restaurant_id != self.restaurant_id:
+            return "Промокод не действует для этого ресторана."
+        if self.min_order_amount is not None and amount is not None and amount < self.min_order_amount:
+            return f"Промокод действует для заказов от {self.min_order_amount} тг."
+        return None
+
+    def calculate_discount(self, amount):
+        """Размер скидки (в тенге) для указанной суммы."""
+        discount = amount * self.discount / 100
+        return min(discount, amount).quantize(Decimal('0.01'))
+
+
+def _new_version() -> int:
+    return time.time_ns() // 1000
+
+
+def get_promo_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_promo_version():
+    """Инвалидирует все закэшированные определения промокодов."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _new_version(), timeout=None)
+
+
+def get_promo(code) -> CompiledPromo | None:
+    """Промокод по строке, введенной клиентом (регистр и пробелы не важны)."""
+    key = normalize_code(code or '')
+    if not key:
+        return None
+    cache_key = f"promos:def:{get_promo_version()}:{key}"
+    compiled = cache.get(cache_key)
+    if compiled is None:
+        promo = PromoCode.objects.filter(code_key=key).first()
+        compiled = CompiledPromo.compile(promo) if promo is not None else UNKNOWN
+        cache.set(cache_key, compiled, timeout=settings.PROMO_CACHE_TTL_SECONDS)
+    return None if compiled == UNKNOWN else compiled
+
+
+def user_redemptions(promo: CompiledPromo, user) -> int:
+    usage = PromoUserUsage.objects.filter(promo_code_id=promo.id, user_id=user.pk)
+    return usage.values_list('used', flat=True).first() or 0
+
+
+def _count_user_use(promo: CompiledPromo, user) -> bool:
+    """Засчитывает использование клиенту. False — его per_user_limit исчерпан."""
+    PromoUserUsage.objects.bulk_create(
+        [PromoUserUsage(promo_code_id=promo.id, user_id=user.pk)], ignore_conflicts=True
+    )
+    usage = PromoUserUsage.objects.filter(promo_code_id=promo.id, user_id=user.pk)
+    if promo.per_user_limit is not None:
+        usage = usage.filter(used__lt=promo.per_user_limit)
+    return bool(usage.update(used=F('used') + 1))
+
+
+def check(promo: CompiledPromo, amount, restaurant_id, user=None):
+    """Бросает ValidationError, если промокод нельзя применить к заказу этого клиента."""
+    reason = promo.rejection(amount, restaurant_id)
+    if reason is None and promo.per_user_limit is not None and user is not None:
+        if user_redemptions(promo, user) >= promo.per_user_limit:
+            reason = "Вы уже использовали этот промокод."
+    if reason:
+        raise ValidationError(reason)
+
+
+def find_applicable(code, amount, restaurant_id, user=None) -> CompiledPromo | None:
+    """Промокод для расчета стоимости; неподходящий код молча не применяется."""
+    promo = get_promo(code)
+    if promo is None:
+        return None
+    try:
+        check(promo, amount, restaurant_id, user)
+    except ValidationError:
+        return None
+    return promo
+
+
+def redeem(promo: CompiledPromo, user, order, discount_amount) -> PromoRedemption:
+    """
+    Погашает промокод для заказа. Вызывать в транзакции, создающей заказ, и как
+    можно ближе к ее концу: UPDATE держит блокировку строки до коммита.
+    """
+    # Отказ откатывает и уже засчитанное клиенту использование
+    with transaction.atomic():
+        if not _count_user_use(promo, user):
+            raise ValidationError("Вы уже использовали этот промокод.")
+        if not counters.consume(promo):
+            bump_promo_version()
+            raise ValidationError("Промокод больше недействителен.")
+        return PromoRedemption.objects.create(
+            promo_code_id=promo.id, user=user, order=order, discount_amount=discount_amount
+        )
@@ -0,0 +1,12 @@
+# promos/management/commands/sync_promo_counters.py
+from django.core.management.base import BaseCommand
+
+from promos.counters import sync_used_counts
+
+
+class Command(BaseCommand):
+    help = "Записывает в used_count шардированных промокодов сумму их счетчиков (для админки и отчетов)."
+
+    def handle(self, *args, **options):
+        count = sync_used_counts()
+        self.stdout.write(self.style.SUCCESS(f"Обновлено промокодов: {count}"))
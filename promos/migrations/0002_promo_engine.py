@@ -0,0 +1,78 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_code_keys(apps, schema_editor):
+    PromoCode = apps.get_model('promos', 'PromoCode')
+    codes = {}
+    for pk, code in PromoCode.objects.values_list('id', 'code').iterator():
+        codes.setdefault(code.strip().casefold(), []).append((pk, code))
+    # Какой из кодов-дублей оставить, решает человек: молча отключать акции нельзя
+    duplicates = [', '.join(sorted(code for _, code in same)) for same in codes.values() if len(same) > 1]
+    if duplicates:
+        raise RuntimeError(
+            "Промокоды отличаются только регистром или пробелами, переименуйте или удалите лишние "
+            "и повторите миграцию: " + '; '.join(duplicates)
+        )
+    for key, [(pk, _)] in codes.items():
+        PromoCode.objects.filter(pk=pk).update(code_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_eta_stats'),
+        ('promos', '0001_initial'),
+        ('restaurants', '0006_restaurant_geo_cell'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocode',
+            name='code_key',
+            field=models.CharField(default='', editable=False, max_length=50),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_code_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='promocode',
+            name='code_key',
+            field=models.CharField(editable=False, max_length=50, unique=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='min_order_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Минимальная сумма товаров в заказе', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='per_user_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='Сколько раз один клиент может использовать код', null=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='restaurant',
+            field=models.ForeignKey(blank=True, help_text='Только для заказов из этого ресторана', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promo_codes', to='restaurants.restaurant'),
+        ),
+        migrations.CreateModel(
+            name='PromoRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('discount_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='promo_redemptions', to='orders.order')),
+                ('promo_code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='promos.promocode')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promo_redemptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['promo_code', 'user'], name='promo_redemption_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promos', '0002_promo_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocode',
+            name='counter_shards',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Строк-счетчиков для массовых акций (1 — счетчик прямо в промокоде, см. promos.counters)'),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='reserved_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Сколько использований из max_uses роздано счетчикам'),
+        ),
+        migrations.CreateModel(
+            name='PromoCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('used', models.PositiveIntegerField(default=0)),
+                ('remaining', models.PositiveIntegerField(default=0)),
+                ('promo_code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shard_rows', to='promos.promocode')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('promo_code', 'slot'), name='unique_promo_counter_slot')],
+            },
+        ),
+    ]
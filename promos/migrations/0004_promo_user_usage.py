@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_past_redemptions(apps, schema_editor):
+    PromoRedemption = apps.get_model('promos', 'PromoRedemption')
+    PromoUserUsage = apps.get_model('promos', 'PromoUserUsage')
+    totals = PromoRedemption.objects.values('promo_code', 'user').annotate(used=Count('id')).order_by()
+    PromoUserUsage.objects.bulk_create(
+        (PromoUserUsage(promo_code_id=row['promo_code'], user_id=row['user'], used=row['used']) for row in totals),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promos', '0003_promo_counter_shards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromoUserUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('used', models.PositiveIntegerField(default=0)),
+                ('promo_code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_usages', to='promos.promocode')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promo_usages', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('promo_code', 'user'), name='unique_promo_user_usage')],
+            },
+        ),
+        migrations.RunPython(count_past_redemptions, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 # promos/models.py (ОБНОВЛЕННАЯ ВЕРСИЯ)
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models, transaction
 from django.utils import timezone
 from django.db.models import F # 👈 1. Импортируем F-выражения
@@ -17,32 +19,142 @@ class PromoBanner(models.Model):
         return self.title
 
 
+def normalize_code(code):
+    """Ключ промокода: без пробелов по краям и без учета регистра (поиск идет по уникальному индексу)."""
+    return code.strip().casefold()
+
+
+COUNTER_SHARDS_LOCKED = "У промокода уже есть строки-счетчики: число счетчиков можно менять, но не меньше 2."
+
+
+class PromoCodeQuerySet(models.QuerySet):
+    def redeemable(self):
+        """Промокоды, которые еще можно использовать (лимит проверяется в том же UPDATE)."""
+        return self.filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=timezone.now()),
+            models.Q(max_uses__isnull=True) | models.Q(used_count__lt=F('max_uses')),
+            is_active=True,
+        )
+
+
 class PromoCode(models.Model):
     code = models.CharField(max_length=50, unique=True)
+    code_key = models.CharField(max_length=50, unique=True, editable=False)
     discount = models.DecimalField(max_digits=5, decimal_places=2, help_text="Например: 10.0 = 10%")
+    is_active = models.BooleanField(default=True)
     expires_at = models.DateTimeField(null=True, blank=True)
     max_uses = models.PositiveIntegerField(null=True, blank=True, help_text="Максимальное количество использований")
     used_count = models.PositiveIntegerField(default=0)
+    per_user_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Сколько раз один клиент может использовать код")
+    min_order_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                           help_text="Минимальная сумма товаров в заказе")
+    restaurant = models.ForeignKey('restaurants.Restaurant', on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='promo_codes', help_text="Только для заказов из этого ресторана")
+    counter_shards = models.PositiveSmallIntegerField(
+        default=1, help_text="Строк-счетчиков для массовых акций (1 — счетчик прямо в промокоде, см. promos.counters)"
+    )
+    reserved_count = models.PositiveIntegerField(default=0, editable=False,
+                                                 help_text="Сколько использований из max_uses роздано счетчикам")
+
+    objects = PromoCodeQuerySet.as_manager()
 
-    def is_valid(self):
-        """Проверяет, можно ли использовать промокод."""
-        if self.expires_at and timezone.now() > self.expires_at:
-            return False
-        if self.max_uses is not None and self.used_count >= self.max_uses:
-            return False
-        return True
+    def drops_counter_shards(self):
+        """
+        Возврат к counter_shards = 1 после включения шардирования: использования
+        остались в строках-счетчиках, а заказы с закэшированным определением
+        еще списывают по ним (promos.counters) — поэтому это запрещено.
+        """
+        return (
+            self.counter_shards <= 1 and not self._state.adding
+            and PromoCounterShard.objects.filter(promo_code_id=self.pk).exists()
+        )
+
+    def clean(self):
+        super().clean()
+        if self.drops_counter_shards():
+            raise ValidationError({'counter_shards': COUNTER_SHARDS_LOCKED})
+
+    def save(self, *args, **kwargs):
+        self.code_key = normalize_code(self.code)
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'counter_shards' in update_fields) and self.drops_counter_shards():
+            raise ValueError(COUNTER_SHARDS_LOCKED)
+        if update_fields is not None and 'code' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'code_key'}
+        elif update_fields is None and not self._state.adding:
+            # Счетчики меняются только условными UPDATE (PromoCode.apply,
+            # promos.counters) — сохранение из админки не должно затирать их
+            # устаревшими значениями
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('used_count', 'reserved_count')
+            ]
+        super().save(*args, **kwargs)
 
     def apply(self):
         """
-        Атомарно увеличивает счетчик использования промокода.
-        Безопасно для использования в конкурентной среде.
+        Атомарно увеличивает счетчик использования промокода, если лимит не исчерпан.
+        Один условный UPDATE, без блокировки и перечитывания строки.
+        Возвращает False, если промокод уже израсходован или отключен.
         """
-        # 2. 👇 ИСПОЛЬЗУЕМ F() ДЛЯ АТОМАРНОГО ОБНОВЛЕНИЯ
-        # Это гарантирует, что даже при одновременных запросах
-        # счетчик обновится корректно на уровне базы данных.
-        self.used_count = F('used_count') + 1
-        self.save(update_fields=['used_count'])
-        self.refresh_from_db() # Обновляем объект из БД
+        return bool(PromoCode.objects.redeemable().filter(pk=self.pk).update(used_count=F('used_count') + 1))
+
+    def __str__(self):
+        return self.code
+
+
+class PromoCounterShard(models.Model):
+    """
+    Один из counter_shards счетчиков промокода: used — использования через эту
+    строку, remaining — зарезервированный из max_uses остаток (promos.counters).
+    """
+    promo_code = models.ForeignKey(PromoCode, on_delete=models.CASCADE, related_name='counter_shard_rows')
+    slot = models.PositiveSmallIntegerField()
+    used = models.PositiveIntegerField(default=0)
+    remaining = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['promo_code', 'slot'], name='unique_promo_counter_slot'),
+        ]
+
+    def __str__(self):
+        return f"{self.promo_code} #{self.slot}"
+
+
+class PromoUserUsage(models.Model):
+    """
+    Сколько раз клиент использовал промокод. per_user_limit соблюдается
+    условным UPDATE этой строки (promos.engine.redeem): параллельные заказы
+    одного клиента выстраиваются за ее блокировкой, а не считают
+    PromoRedemption каждый сам по себе.
+    """
+    promo_code = models.ForeignKey(PromoCode, on_delete=models.CASCADE, related_name='user_usages')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='promo_usages')
+    used = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['promo_code', 'user'], name='unique_promo_user_usage'),
+        ]
+
+    def __str__(self):
+        return f"{self.promo_code} — {self.user_id}: {self.used}"
+
+
+class PromoRedemption(models.Model):
+    """Использование промокода клиентом (для лимита на клиента и отчетности)."""
+    promo_code = models.ForeignKey(PromoCode, on_delete=models.CASCADE, related_name='redemptions')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='promo_redemptions')
+    order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='promo_redemptions')
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['promo_code', 'user'], name='promo_redemption_user_idx'),
+        ]
 
     def __str__(self):
-        return self.code
\ No newline at end of file
+        return f"{self.promo_code} — {self.user_id}"
@@ -1,11 +1,10 @@
 # promos/services.py (НОВЫЙ ФАЙЛ)
 
 from django.db import transaction
-from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
 from orders.models import Order
-from .models import PromoCode
+from . import engine
 
 @transaction.atomic
 def apply_promo_code_to_order(promo_code_str: str, order: Order):
@@ -17,31 +16,27 @@ def apply_promo_code_to_order(promo_code_str: str, order: Order):
     - Помечает промокод как использованный.
     Все операции выполняются в рамках одной транзакции.
     """
-    if order.promo_code:
+    if order.promo_code_id:
         raise ValidationError("К этому заказу уже применен промокод.")
     
     if order.is_paid:
         raise ValidationError("Нельзя применить промокод к уже оплаченному заказу.")
 
-    try:
-        # Блокируем строку промокода, чтобы избежать гонки состояний
-        promo_code = PromoCode.objects.select_for_update().get(code__iexact=promo_code_str)
-    except PromoCode.DoesNotExist:
+    promo_code = engine.get_promo(promo_code_str)
+    if promo_code is None:
         raise ValidationError("Промокод не найден.")
+    engine.check(promo_code, order.items_total_price, order.restaurant_id, order.user)
 
-    if not promo_code.is_valid():
-        raise ValidationError("Срок действия промокода истек или он больше недействителен.")
+    # Скидка считается от суммы товаров, как при оформлении заказа (orders.services.price_cart)
+    discount_amount = promo_code.calculate_discount(order.items_total_price)
 
-    # Вычисляем скидку
-    discount_amount = (order.total_price * promo_code.discount) / 100
-    
     # Применяем скидку, но не даем цене уйти в минус
+    order.discount_amount = discount_amount
     order.total_price = max(0, order.total_price - discount_amount)
-    order.promo_code = promo_code # Сохраняем связь
-    
-    # Атомарно увеличиваем счетчик использования
-    promo_code.apply() 
-    
+    order.promo_code_id = promo_code.id # Сохраняем связь
     order.save()
 
-    return order, discount_amount
\ No newline at end of file
+    # Атомарно увеличиваем счетчик использования (условный UPDATE, без блокировки заранее)
+    engine.redeem(promo_code, order.user, order, discount_amount)
+
+    return order, discount_amount
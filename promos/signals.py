@@ -0,0 +1,21 @@
+# promos/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import ensure_shards
+from .engine import bump_promo_version
+from .models import PromoCode
+
+
+@receiver([post_save, post_delete], sender=PromoCode)
+def promo_changed(sender, instance, raw=False, **kwargs):
+    # После коммита: иначе параллельный запрос закэширует старое определение под новой версией
+    if not raw:
+        transaction.on_commit(bump_promo_version)
+
+
+@receiver(post_save, sender=PromoCode)
+def promo_saved(sender, instance, raw=False, **kwargs):
+    if not raw and instance.counter_shards > 1:
+        ensure_shards(instance)
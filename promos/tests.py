@@ -1,3 +1,193 @@
-from django.test import TestCase
+from datetime import time
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Address, User
+from menu.models import Dish, MenuCategory
+from orders.serializers import CreateOrderSerializer
+from restaurants.models import DeliveryTariff, Restaurant
+from . import counters, engine
+from .models import PromoCode, PromoCounterShard, PromoRedemption, PromoUserUsage
+
+
+class PromoEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(phone='+77000000011', password='pass', role='restaurant')
+        cls.user = User.objects.create_user(phone='+77000000012', password='pass')
+        cls.restaurant = Restaurant.objects.create(
+            owner=owner, name='Ресторан', description='', address='Алматы',
+            latitude=Decimal('43.238949'), longitude=Decimal('76.889709'), is_approved=True,
+        )
+        DeliveryTariff.objects.create(
+            restaurant=cls.restaurant, name='Круглосуточно', start_time=time(0, 0), end_time=time(23, 59),
+            base_fee=Decimal('300.00'), fee_per_km=Decimal('100.00'),
+        )
+        category = MenuCategory.objects.create(name='Пицца', image='categories/pizza.png')
+        cls.dish = Dish.objects.create(
+            restaurant=cls.restaurant, category=category, name='Блюдо', price=Decimal('1000.00')
+        )
+        cls.address = Address.objects.create(
+            user=cls.user, city='Алматы', street='Абая', house_number='1',
+            latitude=Decimal('43.250000'), longitude=Decimal('76.950000'),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def order_data(self, code, quantity=2):
+        return {
+            'items': [{'dish_id': self.dish.id, 'quantity': quantity}],
+            'address_id': self.address.id, 'promo_code': code,
+        }
+
+    def create_order(self, code):
+        request = APIRequestFactory().post('/api/orders/create/')
+        request.user = self.user
+        serializer = CreateOrderSerializer(data=self.order_data(code), context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_lookup_is_case_insensitive_and_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            promo = PromoCode.objects.create(code='Summer10', discount=Decimal('10'))
+        with self.assertNumQueries(2):
+            self.assertEqual(engine.get_promo(' SUMMER10 ').id, promo.id)
+            self.assertIsNone(engine.get_promo('nope'))
+        # И найденный, и несуществующий код дальше читаются из кэша
+        with self.assertNumQueries(0):
+            self.assertEqual(engine.get_promo('summer10').id, promo.id)
+            self.assertIsNone(engine.get_promo('nope'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promo.is_active = False
+            promo.save()
+        self.assertFalse(engine.get_promo('summer10').is_valid())
+
+    def test_validate_endpoint(self):
+        PromoCode.objects.create(code='Summer10', discount=Decimal('10'), min_order_amount=Decimal('1500'))
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        def validate(**data):
+            return client.post('/api/promos/validate/', {'code': 'summer10', **data}, format='json')
+
+        response = validate()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['code'], 'Summer10')
+        self.assertEqual(validate(amount='1000').status_code, 400)
+        self.assertEqual(validate(amount='2000').status_code, 200)
+        # Нечисловые и бесконечные суммы игнорируются, а не роняют запрос
+        for amount in ('NaN', 'sNaN', 'Infinity', 'abc'):
+            self.assertEqual(validate(amount=amount).status_code, 200)
+        self.assertEqual(client.post('/api/promos/validate/', {'code': 'nope'}, format='json').status_code, 404)
+
+    def test_calculate_cost_respects_restaurant_and_minimum(self):
+        other = Restaurant.objects.create(owner=self.restaurant.owner, name='Другой', description='', address='Алматы')
+        PromoCode.objects.create(code='HERE', discount=Decimal('10'), min_order_amount=Decimal('1500'))
+        PromoCode.objects.create(code='THERE', discount=Decimal('10'), restaurant=other)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        def discount(code, quantity=2):
+            response = client.post('/api/orders/calculate-cost/', self.order_data(code, quantity), format='json')
+            return response.json()['discount']
+
+        self.assertEqual(discount('here'), '200.00')
+        self.assertEqual(discount('here', quantity=1), '0.00')
+        self.assertEqual(discount('there'), '0.00')
+
+    def test_order_redeems_promo_until_limit(self):
+        promo = PromoCode.objects.create(code='ONCE', discount=Decimal('50'), max_uses=1)
+        order = self.create_order('once')
+        self.assertEqual(order.promo_code_id, promo.id)
+        self.assertEqual(order.discount_amount, Decimal('1000.00'))
+        promo.refresh_from_db()
+        self.assertEqual(promo.used_count, 1)
+        self.assertEqual(PromoRedemption.objects.get().order, order)
+
+        # Определение из кэша еще считает код действующим — лимит держит условный UPDATE
+        self.assertTrue(engine.get_promo('once').is_valid())
+        with self.assertRaises(ValidationError):
+            engine.redeem(engine.get_promo('once'), self.user, None, Decimal('1'))
+        self.assertFalse(engine.get_promo('once').is_valid())
+
+    def test_per_user_limit(self):
+        PromoCode.objects.create(code='MINE', discount=Decimal('10'), per_user_limit=1)
+        self.assertIsNotNone(self.create_order('mine').promo_code_id)
+        self.assertIsNone(self.create_order('mine').promo_code_id)
+        self.assertEqual(PromoRedemption.objects.count(), 1)
+        self.assertEqual(PromoUserUsage.objects.get(user=self.user).used, 1)
+
+        # Проверка прошла по устаревшим данным — лимит держит UPDATE счетчика клиента
+        promo = engine.get_promo('mine')
+        with self.assertRaises(ValidationError):
+            engine.redeem(promo, self.user, None, Decimal('1'))
+        self.assertEqual(PromoUserUsage.objects.get(user=self.user).used, 1)
+
+    def test_full_save_keeps_counters(self):
+        promo = PromoCode.objects.create(code='KEEP', discount=Decimal('10'))
+        stale = PromoCode.objects.get(pk=promo.pk)
+        self.assertTrue(promo.apply())
+        stale.discount = Decimal('15')
+        stale.save()
+        promo.refresh_from_db()
+        self.assertEqual((promo.discount, promo.used_count), (Decimal('15'), 1))
+
+
+@override_settings(PROMO_COUNTER_RESERVATION_BATCH=10)
+class PromoCounterShardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def consume(self, code, times):
+        return [counters.consume(engine.get_promo(code)) for _ in range(times)].count(True)
+
+    def test_max_uses_is_exact_across_shards(self):
+        promo = PromoCode.objects.create(code='FLASH', discount=Decimal('10'), max_uses=25, counter_shards=4)
+        self.assertEqual(PromoCounterShard.objects.filter(promo_code=promo).count(), 4)
+
+        self.assertEqual(self.consume('flash', 40), 25)
+        promo.refresh_from_db()
+        self.assertEqual(promo.reserved_count, 25)
+        self.assertEqual(PromoCounterShard.objects.aggregate(total=Sum('used'))['total'], 25)
+
+        counters.sync_used_counts()
+        promo.refresh_from_db()
+        self.assertEqual(promo.used_count, 25)
+        self.assertTrue(counters.is_exhausted(promo))
+
+    def test_enabling_shards_keeps_previous_uses(self):
+        promo = PromoCode.objects.create(code='LATE', discount=Decimal('10'), max_uses=7)
+        self.assertEqual(self.consume('late', 5), 5)
+        promo.refresh_from_db()
+        promo.counter_shards = 3
+        promo.save()
+        cache.clear()
+
+        self.assertEqual(self.consume('late', 5), 2)
+        counters.sync_used_counts()
+        promo.refresh_from_db()
+        self.assertEqual(promo.used_count, 7)
+
+    def test_shards_cannot_be_turned_off(self):
+        promo = PromoCode.objects.create(code='MASS', discount=Decimal('10'), max_uses=10, counter_shards=3)
+        self.assertEqual(self.consume('mass', 4), 4)
+        promo.counter_shards = 1
+        with self.assertRaises(DjangoValidationError):
+            promo.full_clean()
+        with self.assertRaises(ValueError):
+            promo.save()
+
+        promo.counter_shards = 2
+        promo.save()
+        cache.clear()
+        self.assertEqual(self.consume('mass', 10), 6)
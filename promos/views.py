@@ -1,11 +1,13 @@
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import generics, status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 
-from .models import PromoBanner, PromoCode
+from .models import PromoBanner
 from .serializers import PromoBannerSerializer, PromoCodeSerializer
-from . import services 
+from . import engine, services
 from orders.models import Order
 from orders.permissions import IsClientOwnerOfOrder 
 
@@ -26,22 +28,40 @@ class ValidatePromoCodeView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        code = request.data.get("code", "").strip().upper() # Приводим код к верхнему регистру для надежности
-        try:
-            # Используем менеджер модели или метод для проверки валидности
-            # (предполагается, что is_valid() проверяет дату и лимиты)
-            promo = PromoCode.objects.get(code__iexact=code)
-            
-            if not promo.is_valid():
-                return Response({"error": "Промокод недействителен или истек."}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Если все в порядке, возвращаем данные о промокоде
-            serializer = PromoCodeSerializer(promo)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-            
-        except PromoCode.DoesNotExist:
+        code = request.data.get("code", "")
+        # Определение берется из кэша (promos.engine), регистр и пробелы не важны
+        promo = engine.get_promo(code)
+        if promo is None:
             return Response({"error": "Промокод не найден"}, status=status.HTTP_404_NOT_FOUND)
 
+        # Если приложение передало ресторан и сумму — проверяем и их
+        reason = promo.rejection(
+            amount=_decimal_or_none(request.data.get("amount")),
+            restaurant_id=_int_or_none(request.data.get("restaurant_id")),
+        )
+        if reason:
+            return Response({"error": reason}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Если все в порядке, возвращаем данные о промокоде
+        serializer = PromoCodeSerializer(promo)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+def _decimal_or_none(value):
+    try:
+        amount = Decimal(str(value)) if value not in (None, '') else None
+    except InvalidOperation:
+        return None
+    # NaN и Infinity сравнивать с min_order_amount нельзя — считаем, что суммы нет
+    return amount if amount is not None and amount.is_finite() else None
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
 
 class ApplyPromoCodeView(APIView):
     """
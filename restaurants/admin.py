@@ -9,7 +9,7 @@ class RestaurantAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "owner", "robokassa_login", "is_approved", "created_at")
     list_filter = ("is_approved", "created_at")
     search_fields = ("name", "address", "owner__phone")
-    readonly_fields = ("created_at", "average_rating", "review_count")
+    readonly_fields = ("created_at", "average_rating", "review_count", "rating_sum")
 
     fieldsets = (
         ("Основная информация", {
@@ -20,7 +20,7 @@ class RestaurantAdmin(admin.ModelAdmin):
         }),
         ("Финансы", {
             # 👇 ИСПРАВЛЕНИЕ: Заменяем 'robokassa_shop_code' на 'robokassa_login'
-            "fields": ("robokassa_login", "average_rating", "review_count")
+            "fields": ("robokassa_login", "average_rating", "review_count", "rating_sum")
         }),
         ("Изображения", {
             "fields": ("logo", "banner")
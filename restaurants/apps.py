@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RestaurantsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurants'
+
+    def ready(self):
+        # Подключаем сигналы поискового индекса
+        import restaurants.signals
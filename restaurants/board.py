@@ -0,0 +1,92 @@
+# restaurants/board.py
+"""
+Доска заказов ресторана (планшет на кухне).
+
+Планшет один раз получает активные заказы, а дальше запрашивает только
+изменения: ?since=<курсор>, где курсор — ключ (updated_at, id) последнего
+увиденного заказа. Запрос идет по индексу (restaurant, updated_at) и
+возвращает лишь заказы, изменившиеся после курсора.
+
+Транзакция может закоммититься позже, чем выставила updated_at, поэтому
+курсор не продвигается дальше now() - RESTAURANT_BOARD_SETTLE_SECONDS:
+свежие заказы могут прийти повторно (планшет обновляет их по id), но не
+теряются.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from courier.tracking import publish, restaurant_channel
+from orders.models import Order
+
+# Заказы, которые показываются на доске при первой загрузке
+ACTIVE_STATUSES = ('pending', 'accepted', 'preparing', 'ready_for_pickup')
+# Статусы, в которые заказ может перевести ресторан
+RESTAURANT_STATUSES = ('accepted', 'preparing', 'ready_for_pickup', 'cancelled')
+
+
+@dataclass
+class BoardPage:
+    orders: list
+    cursor: str | None
+    has_more: bool
+
+
+def encode_cursor(updated_at, order_id):
+    raw = json.dumps([updated_at.isoformat(), order_id]).encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(encoded):
+    try:
+        updated_at, order_id = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        return datetime.fromisoformat(updated_at), int(order_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValidationError({'since': "Неверный курсор."})
+
+
+def board_queryset(restaurant_id):
+    return Order.objects.filter(restaurant_id=restaurant_id).prefetch_related('items__menu')
+
+
+def board_feed(restaurant_id, since=None, limit=None):
+    """
+    Без курсора — активные заказы, с курсором — все заказы, изменившиеся после него
+    (включая доставленные и отмененные, чтобы планшет убрал их с доски).
+    """
+    limit = limit or settings.RESTAURANT_BOARD_PAGE_SIZE
+    orders = board_queryset(restaurant_id)
+    if since is None:
+        orders = orders.filter(status__in=ACTIVE_STATUSES)
+    else:
+        updated_at, order_id = decode_cursor(since)
+        orders = orders.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=order_id))
+    orders = list(orders.order_by('updated_at', 'id')[:limit + 1])
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+
+    settled_before = timezone.now() - timedelta(seconds=settings.RESTAURANT_BOARD_SETTLE_SECONDS)
+    if since is None and not has_more:
+        # Доска загружена целиком: лента продолжается с последнего изменения любого заказа,
+        # иначе завершенные ранее заказы пришли бы потом как "изменения"
+        last = (
+            Order.objects.filter(restaurant_id=restaurant_id, updated_at__lte=settled_before)
+            .order_by('-updated_at', '-id').values_list('updated_at', 'id').first()
+        )
+    else:
+        settled = [order for order in orders if order.updated_at <= settled_before]
+        last = (settled[-1].updated_at, settled[-1].id) if settled else None
+    cursor = encode_cursor(*last) if last else since
+    return BoardPage(orders=orders, cursor=cursor, has_more=has_more)
+
+
+def notify_board(restaurant_id):
+    """Будит SSE-потоки доски ресторана после коммита (сами изменения они читают из ленты)."""
+    transaction.on_commit(lambda: publish(restaurant_channel(restaurant_id), {'type': 'changed'}))
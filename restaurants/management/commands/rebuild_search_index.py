@@ -0,0 +1,12 @@
+# restaurants/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from restaurants.search import refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = "Пересобирает поисковые документы всех ресторанов."
+
+    def handle(self, *args, **options):
+        count = refresh_search_documents()
+        self.stdout.write(self.style.SUCCESS(f"Документов пересобрано: {count}"))
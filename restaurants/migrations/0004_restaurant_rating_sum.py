@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:42
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_sum(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Review = apps.get_model('reviews', 'Review')
+    rows = (
+        Review.objects.filter(order__restaurant__isnull=False)
+        .values('order__restaurant_id').annotate(total=Sum('rating'), count=Count('id')).order_by()
+    )
+    for row in rows:
+        Restaurant.objects.filter(pk=row['order__restaurant_id']).update(
+            rating_sum=row['total'], review_count=row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0003_remove_restaurant_robokassa_shop_code_and_more'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# На PostgreSQL поиск идет по tsvector-колонке (GIN) и trigram-индексу;
+# на остальных БД эти объекты не нужны (см. restaurants.search).
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE restaurants_restaurantsearchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', name), 'A') || setweight(to_tsvector('simple', body), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX restaurant_search_vector_idx ON restaurants_restaurantsearchdocument USING gin (search_vector)",
+    """
+    CREATE INDEX restaurant_search_trgm_idx ON restaurants_restaurantsearchdocument
+    USING gin ((name || ' ' || body) gin_trgm_ops)
+    """,
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS restaurant_search_trgm_idx",
+    "DROP INDEX IF EXISTS restaurant_search_vector_idx",
+    "ALTER TABLE restaurants_restaurantsearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+def backfill_documents(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Dish = apps.get_model('menu', 'Dish')
+    RestaurantSearchDocument = apps.get_model('restaurants', 'RestaurantSearchDocument')
+
+    def normalize(text):
+        return (text or '').lower().replace('ё', 'е')
+
+    phrases = {}
+    for restaurant_id, dish_name, category_name in Dish.objects.values_list('restaurant_id', 'name', 'category__name'):
+        phrases.setdefault(restaurant_id, {}).update(dict.fromkeys([dish_name, category_name]))
+    for restaurant_id, category_name in Restaurant.categories.through.objects.values_list(
+            'restaurant_id', 'menucategory__name'):
+        phrases.setdefault(restaurant_id, {})[category_name] = None
+
+    RestaurantSearchDocument.objects.bulk_create([
+        RestaurantSearchDocument(
+            restaurant_id=restaurant_id, name=normalize(name),
+            body=' '.join(normalize(phrase) for phrase in phrases.get(restaurant_id, {}) if phrase),
+        )
+        for restaurant_id, name in Restaurant.objects.values_list('id', 'name')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_initial'),
+        ('restaurants', '0004_restaurant_rating_sum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantSearchDocument',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='restaurants.restaurant')),
+                ('name', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(run_postgres(POSTGRES_FORWARD), run_postgres(POSTGRES_BACKWARD)),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+from core.geo import encode_geohash
+
+
+def backfill_geo_cell(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    restaurants = list(Restaurant.objects.filter(latitude__isnull=False, longitude__isnull=False))
+    for restaurant in restaurants:
+        restaurant.geo_cell = encode_geohash(restaurant.latitude, restaurant.longitude, 9)
+    Restaurant.objects.bulk_update(restaurants, ['geo_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0005_restaurantsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=9, verbose_name='Geohash'),
+        ),
+        migrations.RunPython(backfill_geo_cell, migrations.RunPython.noop),
+    ]
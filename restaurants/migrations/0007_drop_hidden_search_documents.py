@@ -0,0 +1,21 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def drop_hidden_documents(apps, schema_editor):
+    # Скрытые рестораны больше не индексируются (restaurants.search.build_documents)
+    RestaurantSearchDocument = apps.get_model('restaurants', 'RestaurantSearchDocument')
+    RestaurantSearchDocument.objects.filter(
+        Q(restaurant__is_approved=False) | Q(restaurant__is_active=False)
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0006_restaurant_geo_cell'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_hidden_documents, migrations.RunPython.noop),
+    ]
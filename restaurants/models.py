@@ -1,6 +1,11 @@
 from django.db import models
 from django.conf import settings
 
+from core.geo import encode_geohash
+
+# Длина geohash ресторана (~5 м); для поиска используются его префиксы
+GEO_CELL_PRECISION = 9
+
 
 class Restaurant(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='restaurants')
@@ -26,7 +31,21 @@ class Restaurant(models.Model):
 
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00, verbose_name="Средний рейтинг")
     review_count = models.PositiveIntegerField(default=0, verbose_name="Количество отзывов")
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Сумма оценок")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    # Geohash координат — индекс для поиска "рядом с точкой" (см. core.geo)
+    geo_cell = models.CharField(max_length=GEO_CELL_PRECISION, blank=True, default='', db_index=True,
+                                editable=False, verbose_name="Geohash")
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = encode_geohash(self.latitude, self.longitude, GEO_CELL_PRECISION)
+        else:
+            self.geo_cell = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geo_cell'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -41,4 +60,19 @@ class DeliveryTariff(models.Model):
     fee_per_km = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Стоимость за км")
 
     def __str__(self):
-        return f"{self.restaurant.name} - {self.name}"
\ No newline at end of file
+        return f"{self.restaurant.name} - {self.name}"
+
+class RestaurantSearchDocument(models.Model):
+    """
+    Денормализованный поисковый документ ресторана: название, блюда и категории
+    в нормализованном виде (см. restaurants.search). На PostgreSQL к таблице
+    добавляются tsvector-колонка и trigram-индекс (миграция 0005).
+    """
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE, primary_key=True,
+                                      related_name='search_document')
+    name = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
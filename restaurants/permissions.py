@@ -11,5 +11,5 @@ class IsRestaurantOwner(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # `obj` здесь - это экземпляр ресторана (Restaurant).
-        # Мы просто проверяем, совпадает ли владелец объекта с текущим пользователем.
-        return obj.owner == request.user
\ No newline at end of file
+        # Сравниваем id, чтобы не загружать владельца (и не обращаться к полям request.user).
+        return obj.owner_id == request.user.id
\ No newline at end of file
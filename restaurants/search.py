@@ -0,0 +1,235 @@
+# restaurants/search.py
+"""
+Поиск ресторанов по названию, блюдам и категориям.
+
+Для каждого видимого клиентам ресторана (одобрен и активен) хранится
+RestaurantSearchDocument (название + названия блюд и категорий, в
+нормализованном виде); сигналы restaurants.signals обновляют его при
+изменении ресторана, блюд и категорий. Скрытые рестораны в индекс не
+попадают: иначе они занимали бы места в RESTAURANT_SEARCH_MAX_RESULTS до
+фильтрации во view.
+
+* PostgreSQL: tsvector-колонка с GIN-индексом (префиксный поиск "слово:*")
+  плюс pg_trgm для опечаток, ранжирование ts_rank + word_similarity.
+* Остальные БД (SQLite в разработке и тестах): инвертированный индекс в памяти
+  процесса с префиксным поиском и допуском опечаток по расстоянию Левенштейна.
+  Индекс перестраивается, когда меняется таблица документов.
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, IntegerField, Max, When
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from menu.models import Dish
+from .models import Restaurant, RestaurantSearchDocument
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Вес совпадения в названии ресторана и в блюдах/категориях
+NAME_WEIGHT = 2.0
+BODY_WEIGHT = 1.0
+# Вес точного совпадения, совпадения по префиксу и с опечаткой
+EXACT_MATCH, PREFIX_MATCH, TYPO_MATCH = 1.0, 0.7, 0.4
+# Опечатки допускаются только для слов не короче этой длины
+MIN_TYPO_TOKEN_LENGTH = 4
+
+
+def normalize(text) -> str:
+    return (text or '').lower().replace('ё', 'е')
+
+
+def tokenize(text) -> list:
+    return TOKEN_RE.findall(normalize(text))
+
+
+def _unique(values):
+    return list(dict.fromkeys(value for value in values if value))
+
+
+# --- Документы -------------------------------------------------------------
+
+def build_documents(restaurant_ids=None) -> list:
+    """Собирает документы для видимых ресторанов (все, если ids не заданы) — три запроса."""
+    restaurants = Restaurant.objects.filter(is_approved=True, is_active=True).only('id', 'name')
+    dishes = Dish.objects.values_list('restaurant_id', 'name', 'category__name')
+    categories = Restaurant.categories.through.objects.values_list('restaurant_id', 'menucategory__name')
+    if restaurant_ids is not None:
+        restaurants = restaurants.filter(pk__in=restaurant_ids)
+        dishes = dishes.filter(restaurant_id__in=restaurant_ids)
+        categories = categories.filter(restaurant_id__in=restaurant_ids)
+
+    phrases = defaultdict(list)
+    for restaurant_id, dish_name, category_name in dishes:
+        phrases[restaurant_id] += [dish_name, category_name]
+    for restaurant_id, category_name in categories:
+        phrases[restaurant_id].append(category_name)
+
+    return [
+        RestaurantSearchDocument(
+            restaurant_id=restaurant.id,
+            name=normalize(restaurant.name),
+            body=' '.join(normalize(phrase) for phrase in _unique(phrases[restaurant.id])),
+        )
+        for restaurant in restaurants
+    ]
+
+
+def refresh_search_documents(restaurant_ids=None) -> int:
+    """Пересобирает документы ресторанов. Удаленные и скрытые рестораны теряют документ."""
+    documents = build_documents(restaurant_ids)
+    stale = RestaurantSearchDocument.objects.all()
+    if restaurant_ids is not None:
+        stale = stale.filter(restaurant_id__in=restaurant_ids)
+    stale.exclude(restaurant_id__in=[document.restaurant_id for document in documents]).delete()
+    RestaurantSearchDocument.objects.bulk_create(
+        documents, update_conflicts=True, unique_fields=['restaurant'], update_fields=['name', 'body', 'updated_at'],
+        batch_size=500,
+    )
+    return len(documents)
+
+
+# --- Инвертированный индекс (не-PostgreSQL) --------------------------------
+
+def levenshtein(a, b, max_distance) -> int:
+    """Расстояние Левенштейна с отсечкой: при превышении max_distance возвращает max_distance + 1."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def max_typos(token) -> int:
+    if len(token) < MIN_TYPO_TOKEN_LENGTH:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+class InvertedIndex:
+    def __init__(self, documents):
+        # термин -> {restaurant_id: вес поля}
+        self.postings = defaultdict(dict)
+        for restaurant_id, name, body in documents:
+            for weight, text in ((BODY_WEIGHT, body), (NAME_WEIGHT, name)):
+                for term in tokenize(text):
+                    postings = self.postings[term]
+                    postings[restaurant_id] = max(postings.get(restaurant_id, 0), weight)
+        self.terms = sorted(self.postings)
+        self.terms_by_length = defaultdict(list)
+        for term in self.terms:
+            self.terms_by_length[len(term)].append(term)
+
+    def _matching_terms(self, token):
+        """(термин, вес совпадения) для слова запроса: точное, по префиксу, с опечаткой."""
+        matches = {}
+        if token in self.postings:
+            matches[token] = EXACT_MATCH
+        start = bisect_left(self.terms, token)
+        for term in self.terms[start:]:
+            if not term.startswith(token):
+                break
+            matches.setdefault(term, PREFIX_MATCH)
+        typos = max_typos(token)
+        for length in range(len(token) - typos, len(token) + typos + 1):
+            for term in self.terms_by_length.get(length, ()):
+                if term not in matches and levenshtein(token, term, typos) <= typos:
+                    matches[term] = TYPO_MATCH
+        return matches.items()
+
+    def search(self, query, limit) -> list:
+        """id ресторанов, подходящих под все слова запроса, по убыванию релевантности."""
+        scores = None
+        for token in _unique(tokenize(query)):
+            token_scores = {}
+            for term, match_weight in self._matching_terms(token):
+                for restaurant_id, field_weight in self.postings[term].items():
+                    score = match_weight * field_weight
+                    if score > token_scores.get(restaurant_id, 0):
+                        token_scores[restaurant_id] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {pk: scores[pk] + score for pk, score in token_scores.items() if pk in scores}
+            if not scores:
+                return []
+        ranked = sorted((scores or {}).items(), key=lambda item: (-item[1], item[0]))
+        return [restaurant_id for restaurant_id, _ in ranked[:limit]]
+
+
+_index = None
+_index_state = None
+_index_lock = threading.Lock()
+
+
+def get_inverted_index() -> InvertedIndex:
+    """Индекс процесса; перестраивается, если документы изменились (один агрегатный запрос)."""
+    global _index, _index_state
+    state = RestaurantSearchDocument.objects.aggregate(count=Count('pk'), updated=Max('updated_at'))
+    state = (state['count'], state['updated'])
+    with _index_lock:
+        if _index is None or _index_state != state:
+            documents = RestaurantSearchDocument.objects.values_list('restaurant_id', 'name', 'body')
+            _index, _index_state = InvertedIndex(documents.iterator()), state
+        return _index
+
+
+# --- PostgreSQL -------------------------------------------------------------
+
+PG_SEARCH_SQL = """
+    SELECT d.restaurant_id
+    FROM {table} d, to_tsquery('simple', %(tsquery)s) AS q
+    WHERE d.search_vector @@ q OR %(text)s <%% (d.name || ' ' || d.body)
+    ORDER BY ts_rank(d.search_vector, q) + word_similarity(%(text)s, d.name || ' ' || d.body) DESC,
+             d.restaurant_id
+    LIMIT %(limit)s
+"""
+
+
+def _search_postgres(tokens, limit) -> list:
+    # Каждое слово ищется как префикс: "пиц" найдет "пицца"
+    tsquery = ' & '.join(f"{token}:*" for token in tokens)
+    sql = PG_SEARCH_SQL.format(table=connection.ops.quote_name(RestaurantSearchDocument._meta.db_table))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'tsquery': tsquery, 'text': ' '.join(tokens), 'limit': limit})
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_restaurant_ids(query, limit=None) -> list:
+    """id ресторанов по запросу, от самых релевантных."""
+    limit = limit or settings.RESTAURANT_SEARCH_MAX_RESULTS
+    tokens = _unique(tokenize(query))
+    if not tokens:
+        return []
+    if connection.vendor == 'postgresql':
+        return _search_postgres(tokens, limit)
+    return get_inverted_index().search(' '.join(tokens), limit)
+
+
+class RestaurantSearchFilter(BaseFilterBackend):
+    """
+    Замена SearchFilter(search_fields=['name', 'dishes__name']): тот же параметр
+    ?search=, но через поисковый индекс и с сортировкой по релевантности.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not tokenize(query):
+            return queryset
+        ids = search_restaurant_ids(query)
+        if not ids:
+            return queryset.none()
+        ranking = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+        return queryset.filter(pk__in=ids).order_by(ranking)
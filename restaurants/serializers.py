@@ -1,10 +1,12 @@
 # app_backend/apps/restaurants/serializers.py (ОБНОВЛЕННАЯ ВЕРСИЯ)
 
+from django.conf import settings
 from rest_framework import serializers
-from django.db.models import Avg # Для подсчета среднего рейтинга
 from .models import Restaurant, DeliveryTariff
 from menu.serializers import MenuCategorySerializer
 from menu.models import MenuCategory
+from orders.models import Order, OrderItem
+from .board import RESTAURANT_STATUSES
 
 
 class DeliveryTariffSerializer(serializers.ModelSerializer):
@@ -17,9 +19,8 @@ class RestaurantSerializer(serializers.ModelSerializer):
     categories = MenuCategorySerializer(many=True, read_only=True)
     tariffs = DeliveryTariffSerializer(many=True, read_only=True)
 
-    # 👇 4. ПРИМЕР ПРОДВИНУТОГО ПОЛЯ: Вычисляемый рейтинг
-    # Это поле не хранится в БД, а считается "на лету".
-    # Для его работы нужна модель Review, которая у вас уже есть.
+    # Рейтинг берется из денормализованного поля average_rating
+    # (его обновляет reviews.signals), поэтому лента не делает запросов на каждую строку.
     rating = serializers.SerializerMethodField()
 
     class Meta:
@@ -38,15 +39,12 @@ class RestaurantSerializer(serializers.ModelSerializer):
             "is_active",
             "phone_number",
             "rating", # 👈 Добавили новое поле в список
+            "review_count",
         ]
 
     def get_rating(self, obj):
-        # `obj` - это экземпляр ресторана.
-        # Находим все заказы этого ресторана, у которых есть отзыв, и считаем средний рейтинг.
-        # Метод aggregate намного эффективнее, чем получать все отзывы и считать среднее в Python.
-        avg_rating = obj.orders.filter(review__isnull=False).aggregate(Avg('review__rating'))['review__rating__avg']
         # Возвращаем 0, если отзывов еще нет.
-        return round(avg_rating, 1) if avg_rating else 0.0
+        return round(float(obj.average_rating), 1) if obj.review_count else 0.0
 
 
 # Сериализатор для записи остается без изменений, он отлично спроектирован.
@@ -82,4 +80,36 @@ class RestaurantWriteSerializer(serializers.ModelSerializer):
         if categories is not None:
             instance.categories.set(categories)
 
-        return instance
\ No newline at end of file
+        return instance
+
+
+class BoardOrderItemSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='menu.name', default='Удаленное блюдо', read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['menu_id', 'name', 'quantity']
+
+
+class BoardOrderSerializer(serializers.ModelSerializer):
+    """Заказ на доске ресторана: только то, что нужно кухне."""
+    items = BoardOrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'code', 'status', 'comment', 'items_total_price', 'restaurant_payout',
+            'is_paid', 'created_at', 'updated_at', 'items',
+        ]
+
+
+class BoardStatusUpdateSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    status = serializers.ChoiceField(choices=RESTAURANT_STATUSES)
+
+    def validate_order_ids(self, order_ids):
+        if len(order_ids) > settings.RESTAURANT_BOARD_MAX_BULK:
+            raise serializers.ValidationError(
+                f"Не больше {settings.RESTAURANT_BOARD_MAX_BULK} заказов за один запрос."
+            )
+        return list(dict.fromkeys(order_ids))
@@ -0,0 +1,66 @@
+# restaurants/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from menu.models import Dish, MenuCategory
+from orders.models import Order
+from .board import notify_board
+from .models import Restaurant
+from .search import refresh_search_documents
+
+
+def schedule_refresh(restaurant_ids):
+    """
+    Документ пересобирается после коммита: так при каскадном удалении ресторана
+    документ не создается заново, а откат транзакции ничего не меняет в индексе.
+    """
+    restaurant_ids = [pk for pk in restaurant_ids if pk is not None]
+    if restaurant_ids:
+        transaction.on_commit(lambda: refresh_search_documents(restaurant_ids))
+
+
+# Поля, от которых зависит поисковый документ (видимость убирает ресторан из индекса)
+SEARCH_FIELDS = {'name', 'is_approved', 'is_active'}
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not SEARCH_FIELDS & set(update_fields)):
+        return
+    schedule_refresh([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Dish)
+def dish_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_refresh([instance.restaurant_id])
+
+
+@receiver(m2m_changed, sender=Restaurant.categories.through)
+def restaurant_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_refresh([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        schedule_refresh(list(pk_set))
+    elif action == 'pre_clear':
+        # После очистки связей уже не узнать, каких ресторанов она касалась
+        schedule_refresh(list(instance.restaurants.values_list('pk', flat=True)))
+
+
+@receiver(post_save, sender=MenuCategory)
+@receiver(pre_delete, sender=MenuCategory)
+def category_changed(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    restaurant_ids = set(instance.restaurants.values_list('pk', flat=True))
+    restaurant_ids.update(instance.dishes.values_list('restaurant_id', flat=True))
+    schedule_refresh(sorted(restaurant_ids))
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, raw=False, **kwargs):
+    """Новый или измененный через save() заказ сразу появляется на доске ресторана."""
+    if not raw and instance.restaurant_id:
+        notify_board(instance.restaurant_id)
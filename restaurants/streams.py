@@ -0,0 +1,71 @@
+# restaurants/streams.py
+"""
+SSE-режим доски заказов ресторана (text/event-stream).
+
+Вместо опроса ленты планшет держит одно соединение: сразу приходит
+событие orders (как ответ RestaurantOrderBoardView), а затем новые порции
+изменений. Поток перечитывает ленту, когда брокер сообщает об изменениях
+(новый заказ, пакетная смена статуса), и не реже раза в
+RESTAURANT_BOARD_POLL_SECONDS — так подхватываются и переходы, сделанные
+курьером. Работает только под ASGI (jetfood_backend.asgi, воркеры uvicorn
+в Procfile): под WSGI каждое соединение занимало бы воркер целиком.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.exceptions import ValidationError
+
+from core.sse import authenticate, event_stream_response, format_event
+from courier.tracking import get_broker, restaurant_channel
+from .board import board_feed
+from .models import Restaurant
+from .serializers import BoardOrderSerializer
+
+
+def _load_page(restaurant_id, since):
+    page = board_feed(restaurant_id, since=since)
+    return page, {
+        'orders': BoardOrderSerializer(page.orders, many=True).data,
+        'cursor': page.cursor,
+        'has_more': page.has_more,
+    }
+
+
+async def restaurant_board_stream(request):
+    user = await sync_to_async(authenticate)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Учетные данные не были предоставлены.'}, status=401)
+    restaurant = await Restaurant.objects.filter(owner=user).afirst()
+    if restaurant is None:
+        return JsonResponse({'detail': 'Ресторан не найден.'}, status=404)
+    # Подписка до чтения первой страницы: изменение между чтением и подпиской
+    # иначе ждало бы следующего опроса
+    subscription = get_broker().subscribe()
+    try:
+        await subscription.add(restaurant_channel(restaurant.id))
+        page, data = await sync_to_async(_load_page)(restaurant.id, request.GET.get('since') or None)
+    except ValidationError as exc:
+        await subscription.close()
+        return JsonResponse(exc.detail, status=400)
+    except BaseException:
+        await subscription.close()
+        raise
+
+    async def events():
+        nonlocal page, data
+        try:
+            yield format_event('orders', data)
+            while True:
+                message = None
+                if not page.has_more:
+                    message = await subscription.get(timeout=settings.RESTAURANT_BOARD_POLL_SECONDS)
+                page, data = await sync_to_async(_load_page)(restaurant.id, page.cursor)
+                if page.orders:
+                    yield format_event('orders', data)
+                elif message is None:
+                    # Комментарий-пинг держит соединение открытым через прокси
+                    yield b": ping\n\n"
+        finally:
+            await subscription.close()
+
+    return event_stream_response(events())
@@ -1,3 +1,207 @@
-from django.test import TestCase
+import asyncio
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import User
+from courier.tracking import get_broker, restaurant_channel
+from menu.models import MenuCategory, Dish
+from orders.models import Order, OrderStatusEvent
+from . import streams
+from .models import Restaurant, RestaurantSearchDocument
+from .search import InvertedIndex, levenshtein, search_restaurant_ids
+
+
+class InvertedIndexTests(TestCase):
+
+    def setUp(self):
+        self.index = InvertedIndex([
+            (1, 'додо пицца', 'маргарита пепперони пицца'),
+            (2, 'суши мастер', 'филадельфия калифорния роллы'),
+            (3, 'бургер кинг', 'воппер чизбургер картофель фри'),
+            (4, 'кафе пепперони', 'лагман плов'),
+        ])
+
+    def test_prefix_and_ranking(self):
+        # Совпадение в названии весит больше, чем в блюдах
+        self.assertEqual(self.index.search('пеппер', 10), [4, 1])
+        self.assertEqual(self.index.search('пиц', 10), [1])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.index.search('пицца маргарита', 10), [1])
+        self.assertEqual(self.index.search('пицца плов', 10), [])
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.index.search('филаделфия', 10), [2])
+        self.assertEqual(self.index.search('бургр', 10), [3])
+
+    def test_levenshtein_cutoff(self):
+        self.assertEqual(levenshtein('пицца', 'пица', 1), 1)
+        self.assertEqual(levenshtein('пицца', 'плов', 1), 2)
+
+
+class RestaurantSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.category = MenuCategory.objects.create(name='Пицца', image='categories/pizza.png')
+
+    def create_restaurant(self, name, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Restaurant.objects.create(owner=self.owner, name=name, description='', address='Алматы',
+                                             is_approved=True, **kwargs)
+
+    def test_documents_follow_dishes_and_categories(self):
+        restaurant = self.create_restaurant('Ёлки')
+        with self.captureOnCommitCallbacks(execute=True):
+            dish = Dish.objects.create(restaurant=restaurant, category=self.category, name='Маргарита', price=1000)
+            restaurant.categories.add(self.category)
+
+        document = RestaurantSearchDocument.objects.get(restaurant=restaurant)
+        self.assertEqual(document.name, 'елки')
+        self.assertEqual(document.body, 'маргарита пицца')
+        self.assertEqual(search_restaurant_ids('ёлки маргарита'), [restaurant.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dish.delete()
+            restaurant.categories.clear()
+        self.assertEqual(search_restaurant_ids('маргарита'), [])
+
+    def test_list_endpoint_filters_and_ranks(self):
+        other = self.create_restaurant('Пиццерия у дома')
+        hidden = self.create_restaurant('Пицца закрыта', is_active=False)
+        best = self.create_restaurant('Пицца Хат')
+        with self.captureOnCommitCallbacks(execute=True):
+            Dish.objects.create(restaurant=other, category=self.category, name='Пицца', price=1000)
+
+        response = APIClient().get('/api/restaurants/', {'search': 'пицца'})
+
+        ids = [item['id'] for item in response.json()]
+        self.assertEqual(ids, [best.id, other.id])
+        self.assertNotIn(hidden.id, ids)
+        self.assertEqual(len(APIClient().get('/api/restaurants/').json()), 2)
+
+    @override_settings(RESTAURANT_SEARCH_MAX_RESULTS=1)
+    def test_hidden_restaurants_do_not_take_result_slots(self):
+        hidden = self.create_restaurant('Пицца Пицца', is_active=False)
+        visible = self.create_restaurant('Пицца')
+        self.assertFalse(RestaurantSearchDocument.objects.filter(restaurant=hidden).exists())
+        self.assertEqual(search_restaurant_ids('пицца'), [visible.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            hidden.is_active = True
+            hidden.save(update_fields=['is_active'])
+            visible.is_approved = False
+            visible.save(update_fields=['is_approved'])
+        response = APIClient().get('/api/restaurants/', {'search': 'пицца'})
+        self.assertEqual([item['id'] for item in response.json()], [hidden.id])
+
+
+@override_settings(RESTAURANT_BOARD_SETTLE_SECONDS=0)
+class RestaurantOrderBoardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        other_owner = User.objects.create_user(phone='+77000000002', password='pass', role='restaurant')
+        cls.restaurant = Restaurant.objects.create(owner=cls.owner, name='Ресторан', description='', address='Алматы')
+        cls.other = Restaurant.objects.create(owner=other_owner, name='Другой', description='', address='Алматы')
+        cls.pending = Order.objects.create(restaurant=cls.restaurant, status='pending')
+        cls.delivered = Order.objects.create(restaurant=cls.restaurant, status='delivered')
+        cls.foreign = Order.objects.create(restaurant=cls.other, status='pending')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def board(self, since=None):
+        response = self.client.get('/api/restaurants/me/orders/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def set_status(self, order_ids, status):
+        return self.client.post(
+            '/api/restaurants/me/orders/status/', {'order_ids': order_ids, 'status': status}, format='json'
+        )
+
+    def test_feed_returns_only_changes_after_cursor(self):
+        first = self.board()
+        self.assertEqual([order['id'] for order in first['orders']], [self.pending.id])
+
+        self.assertEqual(self.board(first['cursor'])['orders'], [])
+
+        new_order = Order.objects.create(restaurant=self.restaurant, status='pending')
+        self.set_status([self.pending.id], 'accepted')
+        delta = self.board(first['cursor'])
+        self.assertEqual([order['id'] for order in delta['orders']], [new_order.id, self.pending.id])
+        self.assertEqual(delta['orders'][1]['status'], 'accepted')
+        self.assertEqual(self.board(delta['cursor'])['orders'], [])
+
+    def test_bulk_status_update_skips_foreign_and_invalid(self):
+        second = Order.objects.create(restaurant=self.restaurant, status='pending')
+        response = self.set_status([self.pending.id, second.id, self.delivered.id, self.foreign.id], 'accepted')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'updated': [self.pending.id, second.id], 'skipped': [self.delivered.id, self.foreign.id],
+        })
+        self.assertEqual(OrderStatusEvent.objects.filter(to_status='accepted', from_status='pending').count(), 2)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, 'pending')
+
+        # Ресторан не может сам отдать заказ курьеру или пропустить этапы
+        self.assertEqual(self.set_status([self.pending.id], 'on_the_way').status_code, 400)
+        self.assertEqual(self.set_status([self.pending.id], 'ready_for_pickup').json()['updated'], [])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/restaurants/me/orders/', {'since': 'bad'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(RESTAURANT_BOARD_POLL_SECONDS=30)
+    async def test_stream_pushes_new_orders(self):
+        token = AccessToken.for_user(self.owner)
+        response = await self.async_client.get(
+            '/api/restaurants/me/orders/stream/', headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        async def read_orders():
+            event, data = (await anext(stream)).decode().strip().split('\n')
+            self.assertEqual(event, 'event: orders')
+            return [order['id'] for order in json.loads(data.removeprefix('data: '))['orders']]
+
+        self.assertEqual(await read_orders(), [self.pending.id])
+        new_order = await sync_to_async(Order.objects.create)(restaurant=self.restaurant, status='pending')
+        get_broker().publish(restaurant_channel(self.restaurant.id), {'type': 'changed'})
+        self.assertEqual(await read_orders(), [new_order.id])
+        await stream.aclose()
+
+    @override_settings(RESTAURANT_BOARD_POLL_SECONDS=30)
+    async def test_stream_sees_changes_made_while_loading_first_page(self):
+        load_page = streams._load_page
+        created = []
+
+        def load_then_change(restaurant_id, since):
+            loaded = load_page(restaurant_id, since)
+            created.append(Order.objects.create(restaurant=self.restaurant, status='pending'))
+            get_broker().publish(restaurant_channel(restaurant_id), {'type': 'changed'})
+            return loaded
+
+        token = AccessToken.for_user(self.owner)
+        with mock.patch.object(streams, '_load_page', load_then_change):
+            response = await self.async_client.get(
+                '/api/restaurants/me/orders/stream/', headers={'Authorization': f'Bearer {token}'}
+            )
+        stream = aiter(response.streaming_content)
+
+        self.assertIn(f'"id": {self.pending.id}', (await anext(stream)).decode())
+        # Уведомление, пришедшее до отправки первой страницы, не потерялось
+        changed = await asyncio.wait_for(anext(stream), timeout=5)
+        self.assertIn(f'"id": {created[0].id}', changed.decode())
+        await stream.aclose()
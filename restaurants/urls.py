@@ -7,8 +7,11 @@ from .views import (
     MyRestaurantView,
     RestaurantCreateView,
     ToggleActiveView,
-    RestaurantMenuView # 👈 ИСПРАВЛЕНО: Импортируем правильный класс
+    RestaurantMenuView, # 👈 ИСПРАВЛЕНО: Импортируем правильный класс
+    RestaurantOrderBoardView,
+    RestaurantOrderStatusView,
 )
+from .streams import restaurant_board_stream
 
 urlpatterns = [
     # Публичные URL для клиентов
@@ -22,6 +25,11 @@ urlpatterns = [
     # ИСПРАВЛЕНО: Используем класс RestaurantMenuView с .as_view()
     path("me/menu/", RestaurantMenuView.as_view(), name="my-restaurant-menu"),
 
+    # Доска заказов ресторана: лента изменений, SSE-поток и пакетная смена статусов
+    path("me/orders/", RestaurantOrderBoardView.as_view(), name="restaurant-order-board"),
+    path("me/orders/stream/", restaurant_board_stream, name="restaurant-order-board-stream"),
+    path("me/orders/status/", RestaurantOrderStatusView.as_view(), name="restaurant-order-status"),
+
     # URL для администраторов
     path("create/", RestaurantCreateView.as_view(), name="restaurant-create"),
 ]
\ No newline at end of file
@@ -1,11 +1,16 @@
-from rest_framework import generics, status, filters # 👈 1. Убеждаемся, что filters импортирован
+from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 
+from orders.state import transition_many
+from .board import board_feed, notify_board
 from .models import Restaurant
-from .serializers import RestaurantSerializer, RestaurantWriteSerializer
+from .search import RestaurantSearchFilter
+from .serializers import (
+    RestaurantSerializer, RestaurantWriteSerializer, BoardOrderSerializer, BoardStatusUpdateSerializer
+)
 from menu.serializers import MenuCategoryWithDishesSerializer
 from .permissions import IsRestaurantOwner
 
@@ -13,14 +18,11 @@ from .permissions import IsRestaurantOwner
 class ApprovedRestaurantListView(generics.ListAPIView):
     """
     Отдает список всех одобренных ресторанов для клиентов.
-    Поддерживает поиск по названию ресторана и названию блюд.
+    Поддерживает поиск (?search=) по названию ресторана, блюдам и категориям
+    с учетом префиксов и опечаток; результаты сортируются по релевантности.
     """
     serializer_class = RestaurantSerializer
-    
-    # 👇 2. ДОБАВЛЯЕМ ФИЛЬТРЫ ДЛЯ ПОИСКА
-    filter_backends = [filters.SearchFilter]
-    # По каким полям будем искать: по названию ресторана и по названиям связанных с ним блюд.
-    search_fields = ['name', 'dishes__name']
+    filter_backends = [RestaurantSearchFilter]
 
     def get_queryset(self):
         # Оптимизация запроса остается, это очень важно для производительности
@@ -97,6 +99,50 @@ class RestaurantMenuView(generics.ListAPIView):
         return context
 
 
+class RestaurantOrderBoardView(APIView):
+    """
+    Для владельца: доска заказов. Без параметров — активные заказы,
+    с ?since=<cursor> — только изменившиеся после курсора (см. restaurants.board).
+    """
+    permission_classes = [IsAuthenticated, IsRestaurantOwner]
+
+    def get(self, request, *args, **kwargs):
+        restaurant = get_object_or_404(Restaurant, owner=request.user)
+        self.check_object_permissions(request, restaurant)
+
+        page = board_feed(restaurant.id, since=request.query_params.get('since') or None)
+        return Response({
+            'orders': BoardOrderSerializer(page.orders, many=True).data,
+            'cursor': page.cursor,
+            'has_more': page.has_more,
+        })
+
+
+class RestaurantOrderStatusView(APIView):
+    """
+    Для владельца: пакетная смена статуса заказов (accepted, preparing,
+    ready_for_pickup, cancelled). Заказы, для которых переход невозможен,
+    возвращаются в skipped.
+    """
+    permission_classes = [IsAuthenticated, IsRestaurantOwner]
+
+    def post(self, request, *args, **kwargs):
+        restaurant = get_object_or_404(Restaurant, owner=request.user)
+        self.check_object_permissions(request, restaurant)
+        serializer = BoardStatusUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_ids = serializer.validated_data['order_ids']
+
+        updated = transition_many(
+            order_ids, serializer.validated_data['status'], actor=request.user, restaurant=restaurant
+        )
+        if updated:
+            notify_board(restaurant.id)
+        applied = set(updated)
+        skipped = [order_id for order_id in order_ids if order_id not in applied]
+        return Response({'updated': updated, 'skipped': skipped}, status=status.HTTP_200_OK)
+
+
 class RestaurantCreateView(generics.CreateAPIView):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantWriteSerializer
@@ -0,0 +1,21 @@
+# reviews/management/commands/reconcile_ratings.py
+from django.core.management.base import BaseCommand
+
+from reviews.services import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рейтинги всех ресторанов по отзывам и показывает расхождения."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Только показать расхождения, ничего не менять.")
+
+    def handle(self, *args, **options):
+        drift = reconcile_ratings(dry_run=options['dry_run'])
+        for item in drift:
+            self.stdout.write(
+                f"Ресторан {item.restaurant_id}: рейтинг {item.stored_rating} → {item.actual_rating}, "
+                f"отзывов {item.stored_count} → {item.actual_count}"
+            )
+        action = "Найдено" if options['dry_run'] else "Исправлено"
+        self.stdout.write(self.style.SUCCESS(f"{action} расхождений: {len(drift)}"))
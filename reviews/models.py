@@ -15,6 +15,16 @@ class Review(models.Model):
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Оценка, сохраненная в БД (для инкрементального пересчета рейтинга, см. signals)
+    saved_rating = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'rating' in field_names:
+            instance.saved_rating = instance.rating
+        return instance
+
     def __str__(self):
         return f'Отзыв от {self.user} на заказ {self.order.id}'
 
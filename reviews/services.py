@@ -0,0 +1,91 @@
+# reviews/services.py
+"""
+Денормализованный рейтинг ресторана.
+
+Restaurant.rating_sum, review_count и average_rating — это "кэш" агрегата
+по отзывам. Сигналы reviews.signals поддерживают его инкрементально: каждое
+изменение отзыва — один атомарный UPDATE с F()-выражениями, независимо от
+числа отзывов у ресторана. Ленты и карточки ресторанов только читают эти поля.
+reconcile_ratings() периодически пересчитывает все рейтинги одним
+сгруппированным запросом и исправляет расхождения.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import NamedTuple
+
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+from django.db.models.lookups import GreaterThan
+
+from restaurants.models import Restaurant
+from .models import Review
+
+RATING_QUANTUM = Decimal('0.01')
+
+
+class RatingDrift(NamedTuple):
+    restaurant_id: int
+    stored_rating: Decimal
+    stored_count: int
+    actual_rating: Decimal
+    actual_count: int
+
+
+def average(rating_sum, review_count) -> Decimal:
+    if not review_count:
+        return Decimal('0.00')
+    return (Decimal(rating_sum) / review_count).quantize(RATING_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def apply_rating_delta(order_id, sum_delta, count_delta) -> int:
+    """
+    Сдвигает сумму оценок и число отзывов ресторана, которому принадлежит заказ.
+    Один UPDATE ... WHERE id IN (SELECT restaurant_id FROM orders ...): в правой
+    части SET видны старые значения, поэтому среднее считается согласованно.
+    """
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('review_count') + count_delta
+    return Restaurant.objects.filter(orders__id=order_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        average_rating=Case(
+            When(GreaterThan(new_count, 0), then=Cast(new_sum, FloatField()) / new_count),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def rating_stats(restaurant_ids=None) -> dict:
+    """
+    {restaurant_id: (сумма оценок, число отзывов)} — один GROUP BY запрос.
+    Рестораны без отзывов в словарь не попадают.
+    """
+    reviews = Review.objects.filter(order__restaurant__isnull=False)
+    if restaurant_ids is not None:
+        reviews = reviews.filter(order__restaurant_id__in=restaurant_ids)
+    rows = reviews.values('order__restaurant_id').annotate(total=Sum('rating'), count=Count('id')).order_by()
+    return {row['order__restaurant_id']: (row['total'], row['count']) for row in rows}
+
+
+def reconcile_ratings(dry_run=False, batch_size=500) -> list:
+    """
+    Сверяет сохраненные рейтинги с отзывами и (если не dry_run) исправляет расхождения.
+    Возвращает список RatingDrift.
+    """
+    stats = rating_stats()
+    drift, to_update = [], []
+    fields = ['rating_sum', 'review_count', 'average_rating']
+    for restaurant in Restaurant.objects.only('id', *fields).iterator():
+        actual_sum, actual_count = stats.get(restaurant.id, (0, 0))
+        actual_rating = average(actual_sum, actual_count)
+        stored_rating = Decimal(restaurant.average_rating).quantize(RATING_QUANTUM)
+        if (restaurant.rating_sum, restaurant.review_count, stored_rating) == (actual_sum, actual_count, actual_rating):
+            continue
+        drift.append(RatingDrift(restaurant.id, stored_rating, restaurant.review_count, actual_rating, actual_count))
+        restaurant.rating_sum, restaurant.review_count = actual_sum, actual_count
+        restaurant.average_rating = actual_rating
+        to_update.append(restaurant)
+
+    if to_update and not dry_run:
+        Restaurant.objects.bulk_update(to_update, fields, batch_size=batch_size)
+    return drift
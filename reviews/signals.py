@@ -1,25 +1,39 @@
-# reviews/signals.py (НОВЫЙ ФАЙЛ)
-from django.db.models import Avg
-from django.db.models.signals import post_save, post_delete
+# reviews/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .models import Review
+from .services import apply_rating_delta
 
-@receiver([post_save, post_delete], sender=Review)
-def update_restaurant_rating(sender, instance, **kwargs):
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    """
+    Для инкрементального пересчета нужна прежняя оценка. Обычно ее помнит
+    Review.from_db(); запрос делаем, только если объект собран вручную.
     """
-    Сигнал, который автоматически обновляет средний рейтинг ресторана
-    при создании, обновлении или удалении отзыва.
+    if raw or instance._state.adding or instance.saved_rating is not None:
+        return
+    instance.saved_rating = Review.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def update_restaurant_rating(sender, instance, created, raw=False, **kwargs):
     """
-    restaurant = instance.order.restaurant
-    
-    # Получаем все отзывы для данного ресторана
-    reviews = Review.objects.filter(order__restaurant=restaurant)
-    
-    # Вычисляем новый средний рейтинг и количество отзывов
-    new_rating = reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-    review_count = reviews.count()
-    
-    # Обновляем поля в модели Restaurant
-    restaurant.average_rating = new_rating
-    restaurant.review_count = review_count
-    restaurant.save(update_fields=['average_rating', 'review_count'])
\ No newline at end of file
+    Сигнал, который обновляет средний рейтинг ресторана при создании
+    и изменении отзыва: O(1), без пересчета по всем отзывам.
+    """
+    if raw:
+        return
+    if created or instance.saved_rating is None:
+        apply_rating_delta(instance.order_id, instance.rating, 1)
+    elif instance.rating != instance.saved_rating:
+        apply_rating_delta(instance.order_id, instance.rating - instance.saved_rating, 0)
+    instance.saved_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def remove_rating_on_delete(sender, instance, **kwargs):
+    # Вычитаем ту оценку, что лежала в БД (если объект меняли в памяти)
+    rating = instance.saved_rating if instance.saved_rating is not None else instance.rating
+    apply_rating_delta(instance.order_id, -rating, -1)
+    instance.saved_rating = None
@@ -1,3 +1,91 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.models import User
+from orders.models import Order
+from restaurants.models import Restaurant
+from .models import Review
+from .services import reconcile_ratings as call_reconcile
+
+
+class RestaurantRatingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone='+77000000001', password='pass', role='restaurant')
+        cls.user = User.objects.create_user(phone='+77000000002', password='pass')
+        cls.restaurants = [
+            Restaurant.objects.create(owner=cls.owner, name=f'Ресторан {i}', description='', address='Алматы',
+                                      is_approved=True)
+            for i in range(5)
+        ]
+
+    def review(self, restaurant, rating):
+        order = Order.objects.create(user=self.user, restaurant=restaurant, status='delivered')
+        return Review.objects.create(user=self.user, order=order, rating=rating)
+
+    def test_signal_keeps_denormalized_rating(self):
+        restaurant = self.restaurants[0]
+        self.review(restaurant, 5)
+        review = self.review(restaurant, 4)
+        restaurant.refresh_from_db()
+        self.assertEqual((restaurant.average_rating, restaurant.review_count), (Decimal('4.50'), 2))
+
+        review.delete()
+        restaurant.refresh_from_db()
+        self.assertEqual((restaurant.average_rating, restaurant.review_count), (Decimal('5.00'), 1))
+
+    def test_rating_edit_and_delete_are_incremental(self):
+        restaurant = self.restaurants[0]
+        reviews = [self.review(restaurant, rating) for rating in (5, 4, 3)]
+
+        # Один UPDATE, сколько бы отзывов ни было у ресторана
+        edited = Review.objects.get(pk=reviews[2].pk)
+        edited.rating = 5
+        with self.assertNumQueries(1 + 1):  # UPDATE отзыва + UPDATE ресторана
+            edited.save()
+        restaurant.refresh_from_db()
+        self.assertEqual((restaurant.rating_sum, restaurant.review_count, restaurant.average_rating),
+                         (14, 3, Decimal('4.67')))
+
+        # Оценка не загружалась из БД: прежнее значение читается отдельным запросом
+        deferred = Review.objects.only('id', 'order').get(pk=reviews[0].pk)
+        deferred.rating = 1
+        deferred.save()
+        Review.objects.get(pk=reviews[1].pk).delete()
+        restaurant.refresh_from_db()
+        self.assertEqual((restaurant.rating_sum, restaurant.review_count, restaurant.average_rating),
+                         (6, 2, Decimal('3.00')))
+        self.assertEqual(call_reconcile(dry_run=True), [])
+
+    def test_restaurant_list_does_not_aggregate_per_row(self):
+        for restaurant in self.restaurants:
+            self.review(restaurant, 4)
+
+        # Рестораны, категории, тарифы
+        with self.assertNumQueries(3):
+            response = APIClient().get('/api/restaurants/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({item['rating'] for item in response.json()}, {4.0})
+
+    def test_reconcile_fixes_drift(self):
+        self.review(self.restaurants[0], 3)
+        self.review(self.restaurants[0], 4)
+        Restaurant.objects.filter(pk=self.restaurants[0].pk).update(average_rating=0, review_count=0)
+        Restaurant.objects.filter(pk=self.restaurants[1].pk).update(average_rating=5, review_count=7, rating_sum=35)
+
+        out = StringIO()
+        call_command('reconcile_ratings', '--dry-run', stdout=out)
+        self.assertIn('Найдено расхождений: 2', out.getvalue())
+        self.assertEqual(Restaurant.objects.get(pk=self.restaurants[0].pk).review_count, 0)
 
-# Create your tests here.
+        call_reconcile()
+        fixed = Restaurant.objects.in_bulk([self.restaurants[0].pk, self.restaurants[1].pk])
+        self.assertEqual((fixed[self.restaurants[0].pk].average_rating, fixed[self.restaurants[0].pk].review_count),
+                         (Decimal('3.50'), 2))
+        self.assertEqual((fixed[self.restaurants[1].pk].average_rating, fixed[self.restaurants[1].pk].review_count),
+                         (Decimal('0.00'), 0))